@@ -1,19 +1,104 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Q
+
+from apps.tareas.cola import encolar
+from . import contadores
+from .busqueda import buscar, indexar_posts_por_id
+from .cache import invalidar_categorias_menu, invalidar_contenido
+from .eliminacion import eliminar_comentarios, eliminar_posts
 from .models import Categoria, Post, Comentario
+from .paginacion import PaginadorCacheado, invalidar_conteos
+from .visitas import invalidar_mas_leidos
+
+
+# ADMINISTRACIÓN
+
+'''Pensada para tablas grandes:
+- Los listados traen autor, categoría y post en la misma consulta (list_select_related).
+- Los ForeignKey se eligen con autocompletar: no se arma un <select> con todos los
+  usuarios o posts.
+- El conteo del paginador se cachea (PaginadorCacheado) y no se hace el segundo
+  COUNT(*) sin filtros (show_full_result_count).
+- Las acciones masivas son un UPDATE o DELETE por lote (ver eliminacion.py); lo que
+  harían las señales (contadores, caches, índice de búsqueda) se hace una vez.'''
+
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
-    list_display = ("nombre",)
+    list_display = ("nombre", "num_posts")
+    search_fields = ("nombre",)
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ("titulo", "categoria", "autor", "publicado", "activo")
-    list_filter = ("categoria", "activo", "publicado")
-    search_fields = ("titulo", "subtitulo", "texto")
+    list_display = ("titulo", "categoria", "autor", "publicado", "activo", "num_comentarios", "num_visitas")
+    list_filter = ("activo", "categoria")
+    list_select_related = ("categoria", "autor")
+    # Título y subtítulo con LIKE; el texto, en el índice de búsqueda (get_search_results)
+    search_fields = ("titulo", "subtitulo")
+    autocomplete_fields = ("categoria", "autor")
+    # Usa el índice (publicado, id, activo)
+    date_hierarchy = "publicado"
+    paginator = PaginadorCacheado
+    show_full_result_count = False
+    actions = ("activar", "desactivar")
+
+    def get_search_results(self, request, queryset, search_term):
+        # Un LIKE sobre el texto completo recorre todos los posts: el texto se busca en
+        # el índice invertido (busqueda.py), que tiene solo los posts activos
+        resultados, duplicados = super().get_search_results(request, queryset, search_term)
+        en_texto = buscar(search_term).ids if search_term else []
+        if en_texto:
+            resultados = resultados | queryset.filter(pk__in=en_texto)
+        return resultados, duplicados
+
+    @admin.action(description="Activar los posts seleccionados", permissions=["change"])
+    def activar(self, request, queryset):
+        self.cambiar_activo(request, queryset, True)
+
+    @admin.action(description="Desactivar los posts seleccionados", permissions=["change"])
+    def desactivar(self, request, queryset):
+        self.cambiar_activo(request, queryset, False)
+
+    def cambiar_activo(self, request, queryset, activo):
+        pks = list(queryset.exclude(activo=activo).values_list("pk", flat=True))
+        if pks:
+            filas = Post.objects.filter(pk__in=pks)
+            with transaction.atomic():
+                categorias = set(filas.exclude(categoria=None).values_list("categoria_id", flat=True).distinct())
+                filas.update(activo=activo)
+                contadores.recalcular_categorias(Q(pk__in=categorias))
+                # Solo los activos están en el índice de búsqueda
+                encolar(indexar_posts_por_id, pks)
+            invalidar_categorias_menu()
+            invalidar_contenido()
+            invalidar_conteos(Post)
+            invalidar_mas_leidos()
+        estado = "activados" if activo else "desactivados"
+        self.message_user(request, f"{len(pks)} posts {estado}.", messages.SUCCESS)
+
+    def delete_queryset(self, request, queryset):
+        # "Eliminar seleccionados": por lotes, sin cargar comentarios ni términos
+        eliminar_posts(queryset)
 
 
 @admin.register(Comentario)
 class ComentarioAdmin(admin.ModelAdmin):
     list_display = ("post", "autor", "creado")
-    list_filter = ("creado", "autor")
+    list_filter = ("creado",)
+    list_select_related = ("post", "autor")
+    # Para filtrar por autor: "=usuario" (sin un <select> con todos los usuarios)
+    search_fields = ("=autor__username", "post__titulo")
+    autocomplete_fields = ("post", "autor")
+    # Usa el índice sobre creado
+    date_hierarchy = "creado"
+    paginator = PaginadorCacheado
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # __str__ usa el título del post y el autor: se traen en la misma consulta, sin el texto del post
+        return super().get_queryset(request).select_related("post", "autor").defer("post__texto")
+
+    def delete_queryset(self, request, queryset):
+        eliminar_comentarios(queryset)
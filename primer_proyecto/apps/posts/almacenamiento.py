@@ -0,0 +1,164 @@
+import hashlib
+import os
+import posixpath
+import uuid
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import FileField
+from django.utils import timezone
+
+from apps.tareas.cola import encolar
+
+
+# ALMACENAMIENTO POR CONTENIDO (SIN DUPLICADOS)
+
+'''Las imágenes de Post y Usuario se guardan con el hash SHA-256 de su contenido como
+nombre: posts/3f/3fa4...e1.jpg. La misma imagen subida cinco veces ocupa un solo
+archivo (y un solo juego de miniaturas), y como un nombre nunca cambia de contenido
+las URLs se pueden cachear para siempre.
+Un archivo puede estar en varias filas: al borrar una fila o cambiarle la imagen, el
+archivo se borra (en la cola de tareas) solo si ya ninguna fila lo referencia. Las
+imágenes por defecto de los campos nunca se borran.
+Una subida que reutiliza un archivo existente recién lo referencia cuando su fila se
+confirma: por eso reutilizarlo renueva la fecha de modificación, y un archivo
+modificado hace menos de MEDIA_GRACIA_HUERFANOS no se borra aunque hoy nadie lo
+use (si quedó huérfano, lo borra después "manage.py limpiar_media").'''
+
+TAMANIO_BLOQUE = 64 * 1024
+
+
+def hash_de(contenido):
+    '''SHA-256 del archivo, leído de a bloques (no se carga entero en memoria)'''
+    sha = hashlib.sha256()
+    for bloque in contenido.chunks(TAMANIO_BLOQUE):
+        sha.update(bloque)
+    return sha.hexdigest()
+
+
+def nombre_por_contenido(nombre, contenido):
+    carpeta = posixpath.dirname(nombre)
+    extension = posixpath.splitext(nombre)[1].lower()
+    digesto = hash_de(contenido)
+    return posixpath.join(carpeta, digesto[:2], digesto + extension)
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+    """
+    FileSystemStorage que nombra cada archivo por su contenido. Si ya existe, no se
+    escribe de nuevo (solo se renueva su fecha de modificación). Si no, se escribe con
+    un nombre temporal y se renombra (atómico): dos subidas simultáneas de la misma
+    imagen dejan un único archivo.
+    """
+
+    def _save(self, name, content):
+        nombre = nombre_por_contenido(name, content)
+        try:
+            os.utime(self.path(nombre))
+            return nombre
+        except FileNotFoundError:
+            pass
+        carpeta = posixpath.dirname(nombre)
+        temporal = super()._save(posixpath.join(carpeta, f"subiendo-{uuid.uuid4().hex}"), content)
+        os.replace(self.path(temporal), self.path(nombre))
+        return nombre
+
+
+# REFERENCIAS
+
+
+def campos_por_contenido():
+    '''[(modelo, campo)] de todos los FileField que usan este almacenamiento'''
+    return [
+        (modelo, campo)
+        for modelo in apps.get_models()
+        for campo in modelo._meta.concrete_fields
+        if isinstance(campo, FileField) and isinstance(campo.storage, AlmacenamientoPorContenido)
+    ]
+
+
+def nombres_por_defecto():
+    return {campo.default for _, campo in campos_por_contenido() if isinstance(campo.default, str)}
+
+
+def contar_referencias(nombre):
+    '''Filas que usan el archivo, en todos los modelos'''
+    return sum(
+        modelo._base_manager.filter(**{campo.name: nombre}).count()
+        for modelo, campo in campos_por_contenido()
+    )
+
+
+def nombres_referenciados():
+    '''Todos los archivos que usa alguna fila (más los por defecto)'''
+    nombres = nombres_por_defecto()
+    for modelo, campo in campos_por_contenido():
+        nombres.update(modelo._base_manager.order_by().values_list(campo.name, flat=True).distinct())
+    nombres.discard("")
+    nombres.discard(None)
+    return nombres
+
+
+def archivos_de(instancia):
+    '''{campo: nombre} de los archivos cargados en la instancia (sin consultar los diferidos)'''
+    return {
+        campo.attname: getattr(instancia, campo.attname).name
+        for campo in instancia._meta.concrete_fields
+        if isinstance(campo, FileField)
+        and isinstance(campo.storage, AlmacenamientoPorContenido)
+        and campo.attname in instancia.__dict__
+    }
+
+
+class ArchivosPorContenidoMixin:
+    '''Recuerda los archivos leídos de la base, para liberar el anterior si cambia'''
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._archivos_guardados = archivos_de(instancia)
+        return instancia
+
+
+def liberar(nombre):
+    '''Una fila dejó de usar el archivo: se borra en la cola si ya nadie lo referencia'''
+    if nombre and nombre not in nombres_por_defecto():
+        encolar(eliminar_si_huerfano, nombre)
+
+
+def archivos_guardados(instancia):
+    '''post_save: libera los archivos reemplazados y devuelve los nuevos (todos, si
+    la instancia no se leyó de la base)'''
+    actuales = archivos_de(instancia)
+    guardados = getattr(instancia, "_archivos_guardados", {})
+    for campo, anterior in guardados.items():
+        if campo in actuales and actuales[campo] != anterior:
+            liberar(anterior)
+    instancia._archivos_guardados = actuales
+    return [nombre for campo, nombre in actuales.items() if nombre and guardados.get(campo) != nombre]
+
+
+def archivos_eliminados(instancia):
+    '''post_delete: libera los archivos de la fila'''
+    for nombre in {**getattr(instancia, "_archivos_guardados", {}), **archivos_de(instancia)}.values():
+        liberar(nombre)
+
+
+# TAREAS (se ejecutan en la cola, fuera del request)
+
+
+def reciente(nombre):
+    '''True si el archivo se escribió o reutilizó hace menos de MEDIA_GRACIA_HUERFANOS'''
+    gracia = timedelta(seconds=getattr(settings, "MEDIA_GRACIA_HUERFANOS", 600))
+    try:
+        return default_storage.get_modified_time(nombre) > timezone.now() - gracia
+    except FileNotFoundError:
+        return False
+
+
+def eliminar_si_huerfano(nombre):
+    from .imagenes import eliminar_imagen
+    if contar_referencias(nombre) == 0 and not reciente(nombre):
+        eliminar_imagen(nombre)
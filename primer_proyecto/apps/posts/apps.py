@@ -3,3 +3,11 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.posts'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401 (registra los chequeos y las señales)
+        from apps.tareas.cola import es_proceso_servidor
+        from .visitas import programar_volcado
+        if es_proceso_servidor():
+            # Las visitas se acumulan en los procesos que atienden requests
+            programar_volcado()
@@ -0,0 +1,319 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from apps.tareas.cola import encolar
+
+
+# BÚSQUEDA DE TEXTO COMPLETO (ÍNDICE INVERTIDO)
+
+'''Los textos se dividen en términos normalizados (minúsculas, sin acentos, sin
+palabras vacías y reducidos a su raíz) y se guardan en TerminoBusqueda.
+La búsqueda suma, por post, el peso de cada término encontrado multiplicado por
+su rareza en el blog (IDF): "bautismo" aporta más al ranking que "dios".'''
+
+# Peso de cada campo del post
+PESOS_CAMPOS = (("titulo", 3.0), ("subtitulo", 2.0), ("texto", 1.0))
+
+# Los términos que aparecen en más de esta fracción de posts no sirven para
+# distinguir resultados y se ignoran si la consulta tiene otros más raros
+# (criterio parecido al de MySQL FULLTEXT)
+UMBRAL_TERMINO_COMUN = 0.5
+
+LARGO_MAXIMO_TERMINO = 40
+
+PALABRAS_VACIAS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun bajo bien cada
+como con contra cual cuales cuando de del desde donde dos el ella ellas ellos en entre
+era eran es esa esas ese eso esos esta estaba estan estar estas este esto estos fue
+fueron ha habia han hasta hay la las le les lo los mas me mi mis mucho muy nada ni no
+nos nosotros o otra otras otro otros para pero poco por porque que quien se sea ser si
+sin sobre son su sus tambien tan te tiene todo todos tu tus un una unas uno unos y ya yo
+""".split())
+
+# Sufijos derivativos, del más largo al más corto
+SUFIJOS = (
+    "amientos", "imientos", "aciones", "uciones", "amiento", "imiento", "idades",
+    "adoras", "adores", "ancias", "encias", "mente", "acion", "ucion", "adora",
+    "ador", "ancia", "encia", "idad", "ismos", "istas", "ables", "ibles", "ismo",
+    "ista", "able", "ible", "osos", "osas", "ivos", "ivas", "oso", "osa", "ivo", "iva",
+)
+
+PATRON_PALABRA = re.compile(r"[a-zñ0-9]+")
+
+
+def normalizar(texto):
+    '''Minúsculas y sin acentos (la ñ se conserva)'''
+    texto = texto.lower().replace("ñ", "\0")
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.replace("\0", "ñ")
+
+
+def raiz(palabra):
+    '''Stemmer liviano para español: quita sufijos, plurales y la vocal final'''
+    for sufijo in SUFIJOS:
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= 3:
+            palabra = palabra[:-len(sufijo)]
+            break
+    if palabra.endswith("es") and len(palabra) > 4:
+        palabra = palabra[:-2]
+    elif palabra.endswith("s") and len(palabra) > 3:
+        palabra = palabra[:-1]
+    if palabra[-1] in "aeo" and len(palabra) > 3:
+        palabra = palabra[:-1]
+    return palabra[:LARGO_MAXIMO_TERMINO]
+
+
+def terminos(texto):
+    '''Devuelve la lista de términos (con repeticiones) de un texto'''
+    return [
+        raiz(palabra)
+        for palabra in PATRON_PALABRA.findall(normalizar(texto or ""))
+        if len(palabra) > 1 and palabra not in PALABRAS_VACIAS
+    ]
+
+
+def pesos_de_post(post):
+    '''Peso de cada término del post: frecuencia saturada y ponderada por campo'''
+    pesos = Counter()
+    for campo, peso_campo in PESOS_CAMPOS:
+        for termino, frecuencia in Counter(terminos(getattr(post, campo))).items():
+            # Saturación tipo BM25: la décima repetición aporta poco más que la segunda
+            pesos[termino] += peso_campo * frecuencia / (frecuencia + 1.2)
+    return pesos
+
+
+# MANTENIMIENTO DEL ÍNDICE
+
+
+def filas_de_post(post):
+    from .models import TerminoBusqueda
+    return [
+        TerminoBusqueda(termino=termino, post_id=post.pk, peso=peso)
+        for termino, peso in pesos_de_post(post).items()
+    ]
+
+
+def indexar_post(post):
+    '''Reemplaza las filas del índice de un post (al crearlo o editarlo).
+    Los posts inactivos quedan fuera del índice.'''
+    from .models import TerminoBusqueda
+    with transaction.atomic():
+        TerminoBusqueda.objects.filter(post_id=post.pk).delete()
+        if post.activo:
+            TerminoBusqueda.objects.bulk_create(filas_de_post(post))
+
+
+def indexar_post_por_id(pk):
+    '''Tarea de la cola: indexa el post guardado (si todavía existe)'''
+    from .cache import invalidar_listados
+    from .models import Post
+    post = Post.objects.filter(pk=pk).only("titulo", "subtitulo", "texto", "activo").first()
+    if post is not None:
+        indexar_post(post)
+        actualizar_total_indexados()
+        # Las búsquedas cacheadas ya pueden mostrar el post
+        invalidar_listados()
+        # Con el índice al día, los relacionados (ver relacionados.py)
+        encolar("apps.posts.relacionados.actualizar_relacionados", pk)
+
+
+def indexar_posts_por_id(pks):
+    '''Tarea de la cola: reindexa varios posts (acciones masivas del admin)'''
+    from .cache import invalidar_listados
+    from .models import Post
+    for post in Post.objects.filter(pk__in=pks).only("titulo", "subtitulo", "texto", "activo"):
+        indexar_post(post)
+    actualizar_total_indexados()
+    invalidar_listados()
+    for pk in pks:
+        encolar("apps.posts.relacionados.actualizar_relacionados", pk)
+
+
+def reindexar_todo(tamanio_lote=500):
+    '''Reconstruye el índice completo en lotes; devuelve la cantidad de posts'''
+    from .models import Post, TerminoBusqueda
+    TerminoBusqueda.objects.all().delete()
+    total = 0
+    filas = []
+    posts = Post.objects.filter(activo=True).only("titulo", "subtitulo", "texto").order_by("pk")
+    for post in posts.iterator(chunk_size=tamanio_lote):
+        filas.extend(filas_de_post(post))
+        total += 1
+        if len(filas) >= tamanio_lote * 20:
+            TerminoBusqueda.objects.bulk_create(filas, batch_size=tamanio_lote * 2)
+            filas = []
+    TerminoBusqueda.objects.bulk_create(filas, batch_size=tamanio_lote * 2)
+    actualizar_total_indexados()
+    return total
+
+
+# CONSULTA
+
+# Cuántas entradas de mayor peso se leen por término. Un post que no está entre los
+# primeros de ningún término de la consulta no podría quedar arriba en el ranking,
+# así que el costo de una búsqueda no crece con el tamaño del blog.
+POSTINGS_POR_TERMINO = 1000
+
+
+# Total de posts indexados (para el IDF). Lo guardan sin vencimiento las tareas que
+# cambian el índice; las búsquedas solo lo leen
+CLAVE_TOTAL_INDEXADOS = "posts:busqueda:total"
+
+
+def actualizar_total_indexados():
+    '''Los indexados son los posts activos: se cuentan esos (no un COUNT DISTINCT
+    sobre todo el índice)'''
+    from .models import Post
+    total = Post.objects.filter(activo=True).count()
+    cache.set(CLAVE_TOTAL_INDEXADOS, total, None)
+    return total
+
+
+def total_posts_indexados():
+    total = cache.get(CLAVE_TOTAL_INDEXADOS)
+    if total is None:
+        # Solo si se vació el cache
+        total = actualizar_total_indexados()
+    return total
+
+
+def frecuencias_de(buscados):
+    '''Cantidad de posts que contienen cada término (cacheada unos minutos)'''
+    claves = {f"posts:busqueda:df:{termino}": termino for termino in buscados}
+    frecuencias = {claves[clave]: n for clave, n in cache.get_many(claves).items()}
+    faltantes = [termino for termino in buscados if termino not in frecuencias]
+    if faltantes:
+        calculadas = dict(consulta_frecuencias(faltantes))
+        frecuencias.update(calculadas)
+        cache.set_many({f"posts:busqueda:df:{t}": n for t, n in calculadas.items()}, 300)
+    return {termino: n for termino, n in frecuencias.items() if n}
+
+
+def consulta_frecuencias(terminos_buscados):
+    from .models import TerminoBusqueda
+    return (
+        TerminoBusqueda.objects
+        .filter(termino__in=terminos_buscados)
+        .values_list("termino")
+        .annotate(n=Count("post"))
+    )
+
+
+def consulta_entradas(termino):
+    '''Entradas de mayor peso de un término (rango del índice, sin leer la tabla)'''
+    from .models import TerminoBusqueda
+    return (
+        TerminoBusqueda.objects
+        .filter(termino=termino)
+        .order_by("-peso")
+        .values_list("post_id", "peso")[:POSTINGS_POR_TERMINO]
+    )
+
+
+class ResultadosBusqueda:
+    """
+    Lista perezosa de resultados: guarda solo los ids ordenados por puntaje y trae
+    de la base únicamente los posts de la página pedida (compatible con Paginator).
+    """
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, indice):
+        ids = self.ids[indice] if isinstance(indice, slice) else [self.ids[indice]]
+        posts = self.consulta(ids).in_bulk()
+        resultado = [posts[pk] for pk in ids if pk in posts]
+        return resultado if isinstance(indice, slice) else resultado[0]
+
+    async def apagina(self, inicio, fin):
+        '''Los posts de self.ids[inicio:fin], con el ORM asíncrono'''
+        ids = self.ids[inicio:fin]
+        posts = {post.pk: post async for post in self.consulta(ids)}
+        return [posts[pk] for pk in ids if pk in posts]
+
+    @staticmethod
+    def consulta(ids):
+        from .models import Post
+        return (
+            Post.objects
+            .filter(pk__in=ids, activo=True)
+            .select_related("categoria")
+            .only("titulo", "extracto", "imagen", "publicado", "categoria__nombre")
+        )
+
+
+def buscar(consulta):
+    """
+    Devuelve los posts activos que contienen algún término de la consulta,
+    ordenados por relevancia (suma de peso × IDF) y, a igualdad, por id descendente.
+    """
+    buscados = list(dict.fromkeys(terminos(consulta)))
+    if not buscados:
+        return ResultadosBusqueda([])
+
+    # 1. IDF de cada término
+    idf = calcular_idf(total_posts_indexados(), frecuencias_de(buscados))
+
+    # 2. Por término, solo las entradas de mayor peso
+    puntajes = Counter()
+    for termino, valor in idf.items():
+        for post_id, peso in consulta_entradas(termino):
+            puntajes[post_id] += peso * valor
+    return ResultadosBusqueda(ordenar(puntajes))
+
+
+async def abuscar(consulta):
+    '''Igual que buscar(), con el cache y el ORM asíncronos (vistas async)'''
+    buscados = list(dict.fromkeys(terminos(consulta)))
+    if not buscados:
+        return ResultadosBusqueda([])
+
+    total = await cache.aget(CLAVE_TOTAL_INDEXADOS)
+    if total is None:
+        from .models import Post
+        total = await Post.objects.filter(activo=True).acount()
+        await cache.aset(CLAVE_TOTAL_INDEXADOS, total, None)
+
+    claves = {f"posts:busqueda:df:{termino}": termino for termino in buscados}
+    frecuencias = {claves[clave]: n for clave, n in (await cache.aget_many(claves)).items()}
+    faltantes = [termino for termino in buscados if termino not in frecuencias]
+    if faltantes:
+        calculadas = {termino: n async for termino, n in consulta_frecuencias(faltantes)}
+        frecuencias.update(calculadas)
+        await cache.aset_many({f"posts:busqueda:df:{t}": n for t, n in calculadas.items()}, 300)
+
+    puntajes = Counter()
+    idf = calcular_idf(total, {termino: n for termino, n in frecuencias.items() if n})
+    for termino, valor in idf.items():
+        async for post_id, peso in consulta_entradas(termino):
+            puntajes[post_id] += peso * valor
+    return ResultadosBusqueda(ordenar(puntajes))
+
+
+def calcular_idf(total, frecuencias):
+    total = max(total, 1)
+    idf = {termino: math.log(1 + total / n) for termino, n in frecuencias.items()}
+    # Si la consulta tiene términos que distinguen, se descartan los muy comunes
+    raros = {
+        termino: valor for termino, valor in idf.items()
+        if frecuencias[termino] <= total * UMBRAL_TERMINO_COMUN
+    }
+    return raros or idf
+
+
+def ordenar(puntajes):
+    '''Ids por puntaje descendente y, a igualdad, por id descendente'''
+    return sorted(puntajes, key=lambda pk: (-puntajes[pk], -pk))
@@ -0,0 +1,150 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+
+from primer_proyecto.replicas import timeout_cache
+
+
+def timeout_contenido():
+    '''Vencimiento de las páginas, fragmentos y el menú cacheados. Se invalidan por
+    versión; el vencimiento (largo) solo libera las entradas de versiones viejas'''
+    return timeout_cache(settings.CACHE_CONTENIDO_TIMEOUT)
+
+
+# CACHE DEL MENÚ DE CATEGORÍAS
+
+'''Las categorías cambian muy poco, pero el menú se dibuja en todas las páginas.
+Se guarda la lista (con la cantidad de posts activos) en el cache de Django; las
+señales de signals.py la borran cuando cambia una Categoria o un Post.'''
+
+CLAVE_CATEGORIAS_MENU = "posts:categorias_menu"
+
+
+def obtener_categorias_menu():
+    categorias = cache.get(CLAVE_CATEGORIAS_MENU)
+    if categorias is None:
+        from .models import Categoria   # Import diferido
+        # num_posts es un contador guardado en la fila (ver contadores.py)
+        categorias = list(Categoria.objects.order_by("nombre").values("pk", "nombre", "num_posts"))
+        cache.set(CLAVE_CATEGORIAS_MENU, categorias, timeout_contenido())
+    return categorias
+
+
+async def aobtener_categorias_menu():
+    categorias = await cache.aget(CLAVE_CATEGORIAS_MENU)
+    if categorias is None:
+        from .models import Categoria
+        categorias = [c async for c in Categoria.objects.order_by("nombre").values("pk", "nombre", "num_posts")]
+        await cache.aset(CLAVE_CATEGORIAS_MENU, categorias, timeout_contenido())
+    return categorias
+
+
+def invalidar_categorias_menu():
+    cache.delete(CLAVE_CATEGORIAS_MENU)
+
+
+# VERSIONES DEL CONTENIDO
+
+'''En lugar de borrar cada página cacheada, las claves incluyen un número de versión:
+- global: la tienen todas las páginas (el menú con la cantidad de posts por
+  categoría); cambia con las categorías o cuando un post entra o sale de una.
+- listados: portada, categorías, búsqueda y feeds; cambia al guardar cualquier post.
+- de cada post: su detalle; cambia con el post, sus comentarios o sus relacionados.
+Las entradas viejas quedan huérfanas y el backend las descarta solo.'''
+
+CLAVE_VERSION_CONTENIDO = "posts:version"
+CLAVE_VERSION_LISTADOS = "posts:version:listados"
+
+
+def clave_version_post(pk):
+    return f"posts:version:post:{pk}"
+
+
+def obtener_versiones(claves):
+    versiones = cache.get_many(claves)
+    for clave in claves:
+        if clave not in versiones:
+            # Valor inicial único: si el cache se vació no se reusan páginas viejas
+            versiones[clave] = time.time_ns()
+            cache.add(clave, versiones[clave], None)
+    return [versiones[clave] for clave in claves]
+
+
+async def aobtener_versiones(claves):
+    versiones = await cache.aget_many(claves)
+    for clave in claves:
+        if clave not in versiones:
+            versiones[clave] = time.time_ns()
+            await cache.aadd(clave, versiones[clave], None)
+    return [versiones[clave] for clave in claves]
+
+
+def invalidar_contenido(post_pk=None):
+    claves = [CLAVE_VERSION_CONTENIDO]
+    if post_pk is not None:
+        claves.append(clave_version_post(post_pk))
+    cache.set_many({clave: time.time_ns() for clave in claves}, None)
+
+
+def invalidar_listados(post_pk=None):
+    '''Cambió algo que se ve en los listados, pero no el menú'''
+    claves = [CLAVE_VERSION_LISTADOS]
+    if post_pk is not None:
+        claves.append(clave_version_post(post_pk))
+    cache.set_many({clave: time.time_ns() for clave in claves}, None)
+
+
+def invalidar_post(post_pk):
+    cache.set(clave_version_post(post_pk), time.time_ns(), None)
+
+
+def invalidar_posts(post_pks):
+    cache.set_many({clave_version_post(pk): time.time_ns() for pk in post_pks}, None)
+
+
+# CACHE DE PÁGINAS COMPLETAS PARA ANÓNIMOS
+
+
+def clave_pagina(request, versiones):
+    return "posts:pagina:" + hashlib.md5(f"{request.get_full_path()}|{versiones}".encode()).hexdigest()
+
+
+class CacheAnonimoMixin:
+    """
+    Guarda la respuesta completa de la vista para visitantes anónimos.
+    - Los usuarios autenticados (saludo, botones de edición) siempre ven la página en vivo.
+    - Si hay mensajes flash pendientes tampoco se usa el cache.
+    - La clave incluye la URL completa y las versiones de get_claves_version().
+    """
+    cache_anonimo_timeout = None # None: CACHE_CONTENIDO_TIMEOUT (además se invalida por versión)
+
+    def get_claves_version(self):
+        return [CLAVE_VERSION_CONTENIDO]
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            request.method not in ("GET", "HEAD")
+            or request.user.is_authenticated
+            or len(get_messages(request))
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        clave = clave_pagina(request, obtener_versiones(self.get_claves_version()))
+        respuesta = cache.get(clave)
+        if respuesta is not None:
+            return respuesta
+
+        respuesta = super().dispatch(request, *args, **kwargs)
+        if respuesta.status_code == 200:
+            def guardar(respuesta):
+                # Una página con token CSRF es personal: no se comparte
+                if not request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+                    cache.set(clave, respuesta, timeout_cache(self.cache_anonimo_timeout or settings.CACHE_CONTENIDO_TIMEOUT))
+            if hasattr(respuesta, "add_post_render_callback"):
+                respuesta.add_post_render_callback(guardar)
+            else:
+                guardar(respuesta)
+        return respuesta
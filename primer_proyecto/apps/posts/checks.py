@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+# CHEQUEOS DE CONFIGURACIÓN ("manage.py check --deploy")
+
+
+@register(Tags.caches, deploy=True)
+def cache_compartido(app_configs, **kwargs):
+    '''Las páginas cacheadas se invalidan cambiando versiones en el cache (ver cache.py):
+    con un cache en memoria cada proceso solo ve las invalidaciones hechas en él'''
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if backend.endswith("LocMemCache"):
+        return [Warning(
+            "El cache es local de cada proceso (LocMemCache): con varios procesos, o con la "
+            "cola de tareas en otro, las invalidaciones no llegan a los demás y las páginas "
+            f"cacheadas quedan viejas hasta CACHE_CONTENIDO_TIMEOUT ({settings.CACHE_CONTENIDO_TIMEOUT} s).",
+            hint="Configurar CACHE_BACKEND/CACHE_LOCATION con un cache compartido (Redis, Memcached).",
+            id="posts.W001",
+        )]
+    return []
@@ -0,0 +1,134 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+# CONTADORES DESNORMALIZADOS
+
+'''Post.num_comentarios, Categoria.num_posts (solo activos) y Usuario.num_posts se
+guardan en la propia fila para no hacer un COUNT por tarjeta, categoría o autor.
+Las señales (signals.py) los ajustan con UPDATE ... SET n = n ± 1, que es atómico
+aunque dos requests comenten a la vez. Si alguna vez se desfasan (cambios hechos
+con .update() o directo en la base), "manage.py recalcular_contadores" los repara.'''
+
+
+class ContadoresMixin:
+    """
+    Evita que un save() común pise los contadores con el valor viejo que tenía
+    la instancia en memoria: al editar una fila existente, los campos de
+    campos_contadores no se escriben (solo los cambian las señales con F()).
+    Como hace Django, una instancia con campos diferidos (only/defer) escribe
+    solo los cargados: los diferidos no se leen ni se pisan.
+    """
+    campos_contadores = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            diferidos = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key
+                and campo.name not in self.campos_contadores
+                and campo.attname not in diferidos
+            ]
+        super().save(*args, **kwargs)
+
+
+def sumar(modelo, pk, campo, cantidad):
+    if pk is not None and cantidad:
+        valor = F(campo) + cantidad
+        if cantidad < 0:
+            # Un contador desfasado en 0 no baja de 0: sería un error de la base
+            # (PositiveIntegerField) en medio del request
+            valor = Greatest(valor, Value(0))
+        modelo.objects.filter(pk=pk).update(**{campo: valor})
+
+
+# ESTADO DE UN POST QUE AFECTA A LOS CONTADORES
+
+
+def estado_contado(post):
+    '''(categoria_id, activo, autor_id) tal como está en la base, o None si no se conoce'''
+    valores = post.__dict__
+    if not all(campo in valores for campo in ("categoria_id", "activo", "autor_id")):
+        return None
+    return valores["categoria_id"], valores["activo"], valores["autor_id"]
+
+
+def post_guardado(post, creado):
+    from apps.usuarios.models import Usuario
+    from .models import Categoria
+
+    anterior = None if creado else getattr(post, "_estado_contado", None)
+    actual = (post.categoria_id, post.activo, post.autor_id)
+
+    if not creado and anterior is None:
+        # No se sabe cómo estaba antes (instancia con campos diferidos): se recalcula
+        recalcular_categorias(Q(pk=post.categoria_id))
+        recalcular_usuarios(Q(pk=post.autor_id))
+        categorias_cambiadas = True
+    else:
+        categoria_antes, activo_antes, autor_antes = anterior or (None, False, None)
+        categorias_cambiadas = (categoria_antes, activo_antes) != (post.categoria_id, post.activo)
+        if categorias_cambiadas:
+            sumar(Categoria, categoria_antes, "num_posts", -1 if activo_antes else 0)
+            sumar(Categoria, post.categoria_id, "num_posts", 1 if post.activo else 0)
+        if autor_antes != post.autor_id:
+            sumar(Usuario, autor_antes, "num_posts", -1)
+            sumar(Usuario, post.autor_id, "num_posts", 1)
+    post._estado_contado = actual
+    # Lo miran las señales que invalidan el menú y las páginas cacheadas
+    post._categorias_cambiadas = categorias_cambiadas
+
+
+def post_eliminado(post):
+    from apps.usuarios.models import Usuario
+    from .models import Categoria
+
+    categoria_id, activo, autor_id = (
+        getattr(post, "_estado_contado", None) or (post.categoria_id, post.activo, post.autor_id)
+    )
+    if activo:
+        sumar(Categoria, categoria_id, "num_posts", -1)
+    sumar(Usuario, autor_id, "num_posts", -1)
+
+
+# RECÁLCULO COMPLETO (un UPDATE por tabla)
+
+
+def _conteo(queryset, campo_relacion):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{campo_relacion: OuterRef("pk")})
+            .order_by()
+            .values(campo_relacion)
+            .annotate(n=Count("pk"))
+            .values("n"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def _recalcular(modelo, campo, conteo, filtro, corregir):
+    '''Corrige las filas desfasadas y devuelve cuántas había'''
+    filas = modelo.objects.filter(filtro)
+    desfasadas = filas.annotate(real=conteo).exclude(**{campo: F("real")}).count()
+    if desfasadas and corregir:
+        filas.update(**{campo: conteo})
+    return desfasadas
+
+
+def recalcular_posts(filtro=Q(), corregir=True):
+    from .models import Comentario, Post
+    return _recalcular(Post, "num_comentarios", _conteo(Comentario.objects.all(), "post"), filtro, corregir)
+
+
+def recalcular_categorias(filtro=Q(), corregir=True):
+    from .models import Categoria, Post
+    return _recalcular(Categoria, "num_posts", _conteo(Post.objects.filter(activo=True), "categoria"), filtro, corregir)
+
+
+def recalcular_usuarios(filtro=Q(), corregir=True):
+    from apps.usuarios.models import Usuario
+    from .models import Post
+    return _recalcular(Usuario, "num_posts", _conteo(Post.objects.all(), "autor"), filtro, corregir)
@@ -1,5 +1,22 @@
+from django.utils.functional import SimpleLazyObject
+
+
 def categorias_nav(request):
-    from .models import Categoria   # Import diferido
+    from .cache import obtener_categorias_menu   # Import diferido
+    from primer_proyecto.replicas import en_replica
+    # Lista cacheada: se lee del cache solo si el template usa el menú
+    # (y, si no está en el cache, de una réplica)
     return {
-        "categorias_menu": Categoria.objects.all()
-    }
\ No newline at end of file
+        "categorias_menu": SimpleLazyObject(en_replica(obtener_categorias_menu))
+    }
+
+
+def version_contenido(request):
+    from .cache import CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, obtener_versiones, timeout_contenido
+    # Versiones para las claves de los fragmentos cacheados ({% cache %}); además vencen
+    # a los CACHE_CONTENIDO_TIMEOUT (o antes, si el contenido se lee de una réplica)
+    return {
+        "version_contenido": SimpleLazyObject(lambda: obtener_versiones([CLAVE_VERSION_CONTENIDO])[0]),
+        "version_listados": SimpleLazyObject(lambda: obtener_versiones([CLAVE_VERSION_LISTADOS])[0]),
+        "timeout_fragmentos": timeout_contenido(),
+    }
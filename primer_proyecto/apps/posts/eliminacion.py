@@ -0,0 +1,110 @@
+from django.db import models, router, transaction
+from django.db.models import Q
+
+from . import contadores
+from .almacenamiento import liberar
+from .busqueda import actualizar_total_indexados
+from .cache import invalidar_categorias_menu, invalidar_contenido
+from .models import Comentario, Post
+from .paginacion import invalidar_conteos
+from .visitas import invalidar_mas_leidos
+
+
+# BORRADOS MASIVOS POR LOTES
+
+'''Borrar un usuario con .delete() hace que el colector de Django cargue en memoria
+todos sus posts, los comentarios de esos posts y sus términos de búsqueda, y mande
+una señal por cada fila. Con miles de filas el request se queda sin memoria o vence.
+Acá se borra de a TAMANIO_LOTE filas: se leen solo los ids (y las imágenes), se borra
+con un DELETE ... WHERE id IN (...) por tabla, y lo que hacían las señales se hace
+una vez por lote: recalcular los contadores afectados, invalidar los caches y liberar
+las imágenes (se borran en la cola si ya nadie las usa, ver almacenamiento.py).
+Cada lote es una transacción: si se corta a la mitad, volver a llamar continúa.'''
+
+TAMANIO_LOTE = 500
+
+
+def _lotes(queryset, tamanio_lote):
+    '''Ids del queryset de a tamanio_lote. Se vuelve a consultar cada vez: los del lote anterior ya no están'''
+    while True:
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True)[:tamanio_lote])
+        if not pks:
+            return
+        yield pks
+
+
+def _borrar_dependientes(modelo, pks, db):
+    '''Hace lo que harían los on_delete de las filas que apuntan a estas. Las tablas
+    dependientes (comentarios, términos de búsqueda) no tienen a su vez dependientes.'''
+    for relacion in modelo._meta.related_objects:
+        if relacion.many_to_many:
+            continue
+        filas = relacion.related_model._base_manager.using(db).filter(**{f"{relacion.field.name}__in": pks})
+        if relacion.on_delete is models.CASCADE:
+            filas._raw_delete(db)
+        elif relacion.on_delete is models.SET_NULL:
+            filas.update(**{relacion.field.name: None})
+        else:
+            raise ValueError(f"{relacion.related_model.__name__}.{relacion.field.name}: on_delete no soportado")
+
+
+def eliminar_comentarios(queryset, tamanio_lote=TAMANIO_LOTE):
+    '''Borra los comentarios del queryset por lotes y devuelve cuántos'''
+    db = router.db_for_write(Comentario)
+    queryset = queryset.using(db)
+    total = 0
+    posts = set()
+    for pks in _lotes(queryset, tamanio_lote):
+        with transaction.atomic(using=db):
+            filas = Comentario.objects.using(db).filter(pk__in=pks)
+            comentados = set(filas.values_list("post_id", flat=True))
+            total += filas._raw_delete(db)
+            contadores.recalcular_posts(Q(pk__in=comentados))
+        posts |= comentados
+    if posts:
+        # Cambia el detalle de varios posts: una sola invalidación general
+        invalidar_contenido()
+        invalidar_conteos(Comentario)
+    return total
+
+
+def eliminar_posts(queryset, tamanio_lote=TAMANIO_LOTE):
+    '''Borra los posts del queryset por lotes (con sus comentarios y términos de
+    búsqueda) y devuelve cuántos'''
+    db = router.db_for_write(Post)
+    queryset = queryset.using(db)
+    total = 0
+    for pks in _lotes(queryset, tamanio_lote):
+        with transaction.atomic(using=db):
+            filas = Post.objects.using(db).filter(pk__in=pks)
+            valores = list(filas.values_list("imagen", "categoria_id", "autor_id"))
+            imagenes = {imagen for imagen, _, _ in valores}
+            categorias = {categoria for _, categoria, _ in valores if categoria is not None}
+            autores = {autor for _, _, autor in valores}
+            _borrar_dependientes(Post, pks, db)
+            total += filas._raw_delete(db)
+            contadores.recalcular_categorias(Q(pk__in=categorias))
+            contadores.recalcular_usuarios(Q(pk__in=autores))
+            for nombre in imagenes:
+                liberar(nombre)
+    if total:
+        invalidar_categorias_menu()
+        invalidar_contenido()
+        invalidar_conteos(Post)
+        invalidar_conteos(Comentario)
+        invalidar_mas_leidos()
+        actualizar_total_indexados()
+    return total
+
+
+def eliminar_usuario(usuario, tamanio_lote=TAMANIO_LOTE):
+    """
+    Borra un usuario con sus posts y comentarios por lotes. Al final el usuario se
+    borra con .delete() (sus señales siguen corriendo: roles, imagen de perfil,
+    conteo del panel), pero el colector ya no encuentra posts ni comentarios.
+    Devuelve (posts, comentarios) borrados.
+    """
+    comentarios = eliminar_comentarios(Comentario.objects.filter(autor=usuario), tamanio_lote)
+    posts = eliminar_posts(Post.objects.filter(autor=usuario), tamanio_lote)
+    usuario.delete()
+    return posts, comentarios
@@ -0,0 +1,183 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, obtener_versiones, timeout_contenido
+from .models import Categoria, Post
+
+
+# FEEDS RSS, ATOM Y JSON
+
+'''Los lectores de feeds consultan cada pocos minutos. En lugar de rasparlos de la
+portada, tienen /feed/ (RSS), /feed/atom/ y /feed/json/ (JSON Feed 1.1), y los mismos
+por categoría en /feed/categoria/<pk>/...
+Cada feed se genera una vez por versión del contenido (la que cambian las señales al
+guardar un Post o una Categoría) y se guarda en el cache ya serializado. Las respuestas
+llevan ETag y Last-Modified: un lector que pregunta con If-None-Match o
+If-Modified-Since recibe un 304 sin que se toque la base. Last-Modified es el momento
+en que cambió la versión (no la fecha del último post): avanza con cualquier cambio
+del contenido del feed, y nunca hacia atrás si se desactiva el post más nuevo.'''
+
+POSTS_POR_FEED = 20
+
+
+class JSONFeed(feedgenerator.SyndicationFeed):
+    '''Generador de JSON Feed 1.1 (https://jsonfeed.org/version/1.1)'''
+    content_type = "application/feed+json; charset=utf-8"
+
+    def write(self, outfile, encoding):
+        datos = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": self.feed["title"],
+            "home_page_url": self.feed["link"],
+            "feed_url": self.feed["feed_url"],
+            "description": self.feed["description"],
+            "language": self.feed["language"],
+            "items": [self.item_json(item) for item in self.items],
+        }
+        outfile.write(json.dumps(datos, ensure_ascii=False))
+
+    def item_json(self, item):
+        datos = {
+            "id": item["unique_id"] or item["link"],
+            "url": item["link"],
+            "title": item["title"],
+            "summary": item["description"],
+            "content_text": item["description"],
+            "date_published": item["pubdate"].isoformat(),
+        }
+        if item["updateddate"]:
+            datos["date_modified"] = item["updateddate"].isoformat()
+        if item["author_name"]:
+            datos["authors"] = [{"name": item["author_name"]}]
+        if item["categories"]:
+            datos["tags"] = list(item["categories"])
+        return datos
+
+
+class PostsFeed(Feed):
+    '''Últimos posts activos del sitio, con el extracto guardado (sin leer el texto)'''
+    feed_type = feedgenerator.Rss201rev2Feed
+    description = "Últimas publicaciones"
+
+    def title(self):
+        return settings.SITE_NAME
+
+    def link(self):
+        return reverse("index")
+
+    def items(self, obj):
+        return self.posts(obj).order_by("-publicado", "-pk")[:POSTS_POR_FEED]
+
+    def posts(self, obj):
+        return (
+            Post.objects
+            .filter(activo=True)
+            .select_related("categoria", "autor")
+            .only("titulo", "extracto", "publicado", "categoria__nombre",
+                  "autor__username", "autor__nombre", "autor__apellido")
+        )
+
+    def item_title(self, item):
+        return item.titulo
+
+    def item_description(self, item):
+        return item.extracto
+
+    def item_link(self, item):
+        return reverse("posts:detalle_post", kwargs={"pk": item.pk})
+
+    def item_pubdate(self, item):
+        return item.publicado
+
+    def item_author_name(self, item):
+        return f"{item.autor.nombre} {item.autor.apellido}".strip() or item.autor.username
+
+    def item_categories(self, item):
+        return [item.categoria.nombre] if item.categoria else []
+
+
+class PostsAtomFeed(PostsFeed):
+    feed_type = feedgenerator.Atom1Feed
+    subtitle = PostsFeed.description
+
+
+class PostsJSONFeed(PostsFeed):
+    feed_type = JSONFeed
+
+
+class CategoriaFeedMixin:
+
+    def get_object(self, request, pk):
+        return get_object_or_404(Categoria, pk=pk)
+
+    def title(self, categoria):
+        return f"{settings.SITE_NAME} - {categoria.nombre}"
+
+    def link(self, categoria):
+        return reverse("posts:posts_por_categoria", kwargs={"pk": categoria.pk})
+
+    def description(self, categoria):
+        return f"Últimas publicaciones en {categoria.nombre}"
+
+    def posts(self, categoria):
+        return super().posts(categoria).filter(categoria=categoria)
+
+
+class CategoriaFeed(CategoriaFeedMixin, PostsFeed):
+    pass
+
+
+class CategoriaAtomFeed(CategoriaFeedMixin, PostsAtomFeed):
+
+    def subtitle(self, categoria):
+        return self.description(categoria)
+
+
+class CategoriaJSONFeed(CategoriaFeedMixin, PostsJSONFeed):
+    pass
+
+
+# CACHE Y GET CONDICIONAL
+
+
+def feed_cacheado(feed):
+    """
+    Vista que sirve el feed desde el cache (una entrada por URL y versión del
+    contenido) y responde 304 si el cliente ya tiene la versión actual.
+    """
+    def vista(request, *args, **kwargs):
+        versiones = obtener_versiones([CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS])
+        # Los parámetros de la URL no cambian el feed: no entran en la clave
+        clave = "feeds:" + hashlib.md5(f"{request.build_absolute_uri(request.path)}|{versiones}".encode()).hexdigest()
+        guardado = cache.get(clave)
+        if guardado is None:
+            respuesta = feed(request, *args, **kwargs)
+            guardado = {
+                "contenido": respuesta.content,
+                "tipo": respuesta["Content-Type"],
+                "etag": '"%s"' % hashlib.md5(respuesta.content).hexdigest(),
+            }
+            cache.set(clave, guardado, timeout_contenido())
+
+        # Las versiones son el momento (time.time_ns) en que se invalidó el contenido
+        modificado = max(versiones) // 10**9
+        condicional = get_conditional_response(request, etag=guardado["etag"], last_modified=modificado)
+        respuesta = condicional or HttpResponse(guardado["contenido"], content_type=guardado["tipo"])
+        respuesta["ETag"] = guardado["etag"]
+        respuesta["Last-Modified"] = http_date(modificado)
+        # Los lectores pueden revalidar siempre: el 304 es barato
+        respuesta["Cache-Control"] = "public, max-age=0, must-revalidate"
+        return respuesta
+
+    vista.lectura_en_replica = True   # Ver primer_proyecto/replicas.py
+    return vista
@@ -0,0 +1,151 @@
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from apps.tareas.cola import encolar
+
+
+# DERIVADOS DE IMÁGENES (MINIATURAS WEBP)
+
+'''Las imágenes subidas se guardan tal cual (a veces capturas PNG de varios MB).
+Para las tarjetas y listados se generan versiones WebP de ancho fijo en
+media/derivados/<ancho>/<nombre original>.webp, y el template tag
+{% img_responsive %} arma el srcset para que el navegador elija la más chica que le sirva.
+La generación se encola al guardar una fila con una imagen nueva (señales post_save)
+y, como el borrado, corre en la cola de tareas (apps.tareas), nunca dentro del request.
+Al dibujar una página solo se averigua qué derivados existen en el almacenamiento
+(y se recuerda en el cache): el que los genere puede ser otro proceso.'''
+
+ANCHOS_DERIVADOS = (320, 640, 1024)
+CALIDAD_WEBP = 80
+CARPETA_DERIVADOS = "derivados"
+# Cuánto se recuerda lo encontrado en el almacenamiento. Un nombre por contenido no
+# cambia de archivo: los derivados existentes solo desaparecen con la imagen
+TIMEOUT_DERIVADOS = 24 * 60 * 60
+# Si todavía no hay derivados (se están generando) se vuelve a mirar enseguida
+TIMEOUT_SIN_DERIVADOS = 60
+
+
+def nombre_derivado(nombre, ancho):
+    # Con la extensión original: foto.png y foto.jpg no comparten derivados
+    return f"{CARPETA_DERIVADOS}/{ancho}/{nombre}.webp"
+
+
+def clave_derivados(nombre):
+    return f"imagenes:derivados:{nombre}"
+
+
+def generar_derivados(nombre, storage=default_storage):
+    """
+    Genera los derivados que falten de una imagen y devuelve [(ancho, nombre), ...].
+    No se agranda la imagen: solo se generan anchos menores al original
+    (y siempre el más chico, como miniatura).
+    """
+    with storage.open(nombre) as archivo:
+        imagen = Image.open(archivo)
+        imagen.load()
+    # Respetar la orientación de las fotos de celular y pasar a un modo que WebP acepte
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode not in ("RGB", "RGBA"):
+        transparente = "A" in imagen.getbands() or "transparency" in imagen.info
+        imagen = imagen.convert("RGBA" if transparente else "RGB")
+
+    derivados = []
+    generados = False
+    for ancho in ANCHOS_DERIVADOS:
+        if ancho > imagen.width and derivados:
+            break
+        destino = nombre_derivado(nombre, ancho)
+        if not storage.exists(destino):
+            copia = imagen.copy()
+            copia.thumbnail((ancho, ancho * 4))
+            buffer = BytesIO()
+            copia.save(buffer, "WEBP", quality=CALIDAD_WEBP)
+            storage.save(destino, ContentFile(buffer.getvalue()))
+            generados = True
+        derivados.append((ancho, destino))
+
+    cache.set(clave_derivados(nombre), derivados, TIMEOUT_DERIVADOS)
+    if generados:
+        invalidar_paginas_con(nombre)
+    return derivados
+
+
+def invalidar_paginas_con(nombre):
+    '''Las páginas cacheadas con la imagen original se vuelven a dibujar: el detalle
+    de los posts que la usan y los listados (no el menú ni el resto del sitio)'''
+    from .cache import invalidar_listados, invalidar_posts
+    from .models import Post
+    pks = list(Post.objects.filter(imagen=nombre).values_list("pk", flat=True))
+    if pks:
+        invalidar_posts(pks)
+        invalidar_listados()
+
+
+def derivados_existentes(nombre, storage=default_storage):
+    '''[(ancho, nombre)] de los derivados que ya están en el almacenamiento'''
+    derivados = []
+    for ancho in ANCHOS_DERIVADOS:
+        destino = nombre_derivado(nombre, ancho)
+        # Se generan de menor a mayor: el primero que falta corta la lista
+        if not storage.exists(destino):
+            break
+        derivados.append((ancho, destino))
+    return derivados
+
+
+def obtener_derivados(nombre):
+    '''Derivados de una imagen (para el render). Si todavía no existen se usa la
+    imagen original: no se encola nada, la generación se encoló al subirla'''
+    derivados = cache.get(clave_derivados(nombre))
+    if derivados is None:
+        derivados = derivados_existentes(nombre)
+        cache.set(clave_derivados(nombre), derivados, TIMEOUT_DERIVADOS if derivados else TIMEOUT_SIN_DERIVADOS)
+    return derivados
+
+
+def imagen_subida(nombre):
+    '''post_save con una imagen nueva: encola sus derivados, salvo que ya existan
+    (la misma imagen subida antes, o la imagen por defecto)'''
+    if nombre and not default_storage.exists(nombre_derivado(nombre, ANCHOS_DERIVADOS[0])):
+        encolar(procesar_imagen, nombre)
+
+
+async def aprecalentar_derivados(nombres):
+    '''Para las vistas async: deja en el cache los derivados de estas imágenes antes del
+    render, así {% img_responsive %} no consulta el almacenamiento desde el event loop'''
+    nombres = [nombre for nombre in dict.fromkeys(nombres) if nombre]
+    cacheados = await cache.aget_many([clave_derivados(nombre) for nombre in nombres])
+    for nombre in nombres:
+        if clave_derivados(nombre) not in cacheados:
+            await sync_to_async(obtener_derivados)(nombre)
+
+
+def eliminar_derivados(nombre, storage=default_storage):
+    for ancho in ANCHOS_DERIVADOS:
+        destino = nombre_derivado(nombre, ancho)
+        if storage.exists(destino):
+            storage.delete(destino)
+    cache.delete(clave_derivados(nombre))
+
+
+# TAREAS (se ejecutan en la cola, fuera del request)
+
+
+def procesar_imagen(nombre):
+    try:
+        generar_derivados(nombre)
+    except (OSError, UnidentifiedImageError):
+        # Archivo faltante o que no es una imagen: se usa el original (no se reintenta)
+        cache.set(clave_derivados(nombre), [], 300)
+
+
+def eliminar_imagen(nombre):
+    '''Borra del disco una imagen y sus derivados'''
+    eliminar_derivados(nombre)
+    if default_storage.exists(nombre):
+        default_storage.delete(nombre)
@@ -0,0 +1,292 @@
+import csv
+import json
+import os
+import uuid
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .busqueda import actualizar_total_indexados, filas_de_post
+from .cache import invalidar_categorias_menu, invalidar_contenido
+from .contadores import recalcular_categorias, recalcular_posts, recalcular_usuarios
+from .models import Categoria, Comentario, Post, TerminoBusqueda, generar_extracto
+from .paginacion import invalidar_conteos
+
+
+# IMPORTACIÓN Y EXPORTACIÓN MASIVA DE CONTENIDO
+
+'''Formatos:
+- JSONL: un solo archivo, un registro por línea con "tipo" (categoria, post o
+  comentario), primero las categorías, después los posts y al final los comentarios.
+- CSV: una carpeta con categorias.csv, posts.csv y comentarios.csv.
+Los posts se referencian por el "id" del archivo (no el de la base), las categorías
+por nombre y los autores por username. Las imágenes se exportan como la ruta dentro
+de MEDIA_ROOT: los archivos se copian aparte.'''
+
+COLUMNAS = {
+    "categoria": ["nombre"],
+    "post": ["id", "titulo", "subtitulo", "texto", "imagen", "creado", "publicado", "activo", "categoria", "autor"],
+    "comentario": ["post", "autor", "contenido", "creado"],
+}
+ARCHIVOS_CSV = {"categoria": "categorias.csv", "post": "posts.csv", "comentario": "comentarios.csv"}
+
+
+# EXPORTACIÓN
+
+
+def registros_a_exportar(tamanio_lote):
+    '''Genera los registros sin cargar la tabla entera: .iterator() lee de a lotes'''
+    for nombre in Categoria.objects.order_by("nombre").values_list("nombre", flat=True).iterator(tamanio_lote):
+        yield "categoria", {"nombre": nombre}
+
+    posts = Post.objects.order_by("pk").values_list(
+        "pk", "titulo", "subtitulo", "texto", "imagen", "creado", "publicado", "activo",
+        "categoria__nombre", "autor__username",
+    )
+    for fila in posts.iterator(chunk_size=tamanio_lote):
+        registro = dict(zip(COLUMNAS["post"], fila))
+        registro["creado"] = registro["creado"].isoformat()
+        registro["publicado"] = registro["publicado"].isoformat()
+        yield "post", registro
+
+    comentarios = Comentario.objects.order_by("pk").values_list("post_id", "autor__username", "contenido", "creado")
+    for fila in comentarios.iterator(chunk_size=tamanio_lote):
+        registro = dict(zip(COLUMNAS["comentario"], fila))
+        registro["creado"] = registro["creado"].isoformat()
+        yield "comentario", registro
+
+
+def exportar(destino, formato="jsonl", tamanio_lote=2000):
+    '''Escribe todo el contenido en destino; devuelve la cantidad por tipo'''
+    cantidades = dict.fromkeys(COLUMNAS, 0)
+    if formato == "jsonl":
+        with open(destino, "w", encoding="utf-8") as archivo:
+            for tipo, registro in registros_a_exportar(tamanio_lote):
+                archivo.write(json.dumps({"tipo": tipo, **registro}, ensure_ascii=False) + "\n")
+                cantidades[tipo] += 1
+        return cantidades
+
+    os.makedirs(destino, exist_ok=True)
+    archivos = {tipo: open(os.path.join(destino, nombre), "w", encoding="utf-8", newline="")
+                for tipo, nombre in ARCHIVOS_CSV.items()}
+    try:
+        escritores = {tipo: csv.DictWriter(archivos[tipo], COLUMNAS[tipo]) for tipo in COLUMNAS}
+        for escritor in escritores.values():
+            escritor.writeheader()
+        for tipo, registro in registros_a_exportar(tamanio_lote):
+            escritores[tipo].writerow(registro)
+            cantidades[tipo] += 1
+    finally:
+        for archivo in archivos.values():
+            archivo.close()
+    return cantidades
+
+
+# IMPORTACIÓN
+
+
+def leer_registros(origen):
+    '''Genera (tipo, registro) desde un archivo JSONL o una carpeta de CSV'''
+    if os.path.isdir(origen):
+        for tipo, nombre in ARCHIVOS_CSV.items():
+            ruta = os.path.join(origen, nombre)
+            if os.path.exists(ruta):
+                with open(ruta, encoding="utf-8", newline="") as archivo:
+                    for registro in csv.DictReader(archivo):
+                        yield tipo, registro
+        return
+    with open(origen, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if linea.strip():
+                registro = json.loads(linea)
+                yield registro.pop("tipo"), registro
+
+
+def a_fecha(valor):
+    '''La fecha del archivo, o None si falta o no se entiende'''
+    try:
+        fecha = parse_datetime(valor or "")
+    except ValueError:   # Bien formada pero inválida (ej: mes 13)
+        return None
+    if fecha is not None and timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def a_booleano(valor):
+    if isinstance(valor, str):
+        return valor.strip().lower() in ("1", "true", "si", "sí")
+    return bool(valor)
+
+
+class Importador:
+    """
+    Carga los registros con bulk_create en lotes de tamanio_lote.
+    - Las categorías se resuelven por nombre con un diccionario en memoria (las
+      que no existen se crean).
+    - Los ids los asigna la base (el sitio puede estar creando posts al mismo
+      tiempo); los ids del archivo se traducen a los nuevos con un diccionario
+      para vincular los comentarios (ver insertar()).
+    - bulk_create no dispara señales: el extracto y el índice de búsqueda se
+      calculan en cada lote, y los contadores se recalculan al final.
+    """
+
+    def __init__(self, tamanio_lote=1000, autor_por_defecto=None):
+        from apps.usuarios.models import Usuario
+        self.tamanio_lote = tamanio_lote
+        self.categorias = dict(Categoria.objects.values_list("nombre", "pk"))
+        self.autores = dict(Usuario.objects.values_list("username", "pk"))
+        self.autor_por_defecto = self.autores.get(autor_por_defecto) if autor_por_defecto else None
+        self.ids_posts = {}   # id en el archivo -> pk en la base (de los posts ya guardados)
+        self.categorias_nuevas = set()
+        self.posts = []
+        self.comentarios = []
+        self.cantidades = dict.fromkeys(COLUMNAS, 0)
+        self.omitidos = 0
+
+    def autor_de(self, username):
+        return self.autores.get(username, self.autor_por_defecto)
+
+    def agregar(self, tipo, registro):
+        getattr(self, f"agregar_{tipo}")(registro)
+
+    def agregar_categoria(self, registro):
+        if registro["nombre"] and registro["nombre"] not in self.categorias:
+            self.categorias_nuevas.add(registro["nombre"])
+
+    def agregar_post(self, registro):
+        autor_id = self.autor_de(registro.get("autor"))
+        if autor_id is None:
+            self.omitidos += 1
+            return
+        categoria = registro.get("categoria") or None
+        if categoria and categoria not in self.categorias:
+            self.categorias_nuevas.add(categoria)
+        post = Post(
+            titulo=registro["titulo"],
+            subtitulo=registro.get("subtitulo") or None,
+            texto=registro["texto"],
+            extracto=generar_extracto(registro["texto"]),
+            imagen=registro.get("imagen") or Post._meta.get_field("imagen").default,
+            activo=a_booleano(registro.get("activo", True)),
+            autor_id=autor_id,
+        )
+        publicado = a_fecha(registro.get("publicado"))
+        if publicado:
+            post.publicado = publicado
+        # La categoría se resuelve al guardar el lote (puede ser nueva)
+        self.posts.append((post, categoria, registro.get("creado"), str(registro["id"])))
+        if len(self.posts) >= self.tamanio_lote:
+            self.guardar_posts()
+
+    def agregar_comentario(self, registro):
+        # Los comentarios vienen después de los posts: los pendientes se guardan
+        # para conocer sus ids
+        if self.posts:
+            self.guardar_posts()
+        post_id = self.ids_posts.get(str(registro["post"]))
+        autor_id = self.autor_de(registro.get("autor"))
+        if post_id is None or autor_id is None:
+            self.omitidos += 1
+            return
+        comentario = Comentario(post_id=post_id, autor_id=autor_id, contenido=registro["contenido"])
+        self.comentarios.append((comentario, registro.get("creado")))
+        if len(self.comentarios) >= self.tamanio_lote:
+            self.guardar_comentarios()
+
+    def guardar_categorias(self):
+        if not self.categorias_nuevas:
+            return
+        # Otro proceso pudo crear alguna desde que se leyeron: esas no se cuentan
+        existentes = set(Categoria.objects.filter(nombre__in=self.categorias_nuevas).values_list("nombre", flat=True))
+        faltantes = self.categorias_nuevas - existentes
+        Categoria.objects.bulk_create(
+            [Categoria(nombre=nombre) for nombre in faltantes], ignore_conflicts=True,
+        )
+        self.cantidades["categoria"] += len(faltantes)
+        self.categorias.update(
+            Categoria.objects.filter(nombre__in=self.categorias_nuevas).values_list("nombre", "pk")
+        )
+        self.categorias_nuevas = set()
+
+    def guardar_posts(self):
+        self.guardar_categorias()
+        if not self.posts:
+            return
+        posts = []
+        for post, categoria, _, _ in self.posts:
+            post.categoria_id = self.categorias.get(categoria)
+            posts.append(post)
+        with transaction.atomic():
+            insertar(Post, posts, self.tamanio_lote)
+            # auto_now_add pisa "creado" al insertar: se restaura la fecha original
+            restaurar_creado(Post, [(post, creado) for post, _, creado, _ in self.posts], self.tamanio_lote)
+            filas = [fila for post in posts if post.activo for fila in filas_de_post(post)]
+            TerminoBusqueda.objects.bulk_create(filas, batch_size=self.tamanio_lote * 5)
+        self.ids_posts.update((id_archivo, post.pk) for post, _, _, id_archivo in self.posts)
+        self.cantidades["post"] += len(posts)
+        self.posts = []
+
+    def guardar_comentarios(self):
+        # Los posts del lote pendiente tienen que existir antes que sus comentarios
+        self.guardar_posts()
+        if not self.comentarios:
+            return
+        with transaction.atomic():
+            insertar(Comentario, [c for c, _ in self.comentarios], self.tamanio_lote)
+            restaurar_creado(Comentario, self.comentarios, self.tamanio_lote)
+        self.cantidades["comentario"] += len(self.comentarios)
+        self.comentarios = []
+
+    def terminar(self):
+        self.guardar_comentarios()
+        self.guardar_categorias()
+        recalcular_posts()
+        recalcular_categorias()
+        recalcular_usuarios()
+        actualizar_total_indexados()
+        invalidar_categorias_menu()
+        invalidar_contenido()
+        invalidar_conteos(Post)
+        return self.cantidades
+
+
+def insertar(modelo, objetos, tamanio_lote):
+    '''bulk_create que deja en cada objeto el pk asignado por la base. SQLite,
+    PostgreSQL y MariaDB lo devuelven en el mismo INSERT de varias filas; MySQL no
+    (y esos ids no siempre son consecutivos): ahí las filas se insertan marcadas con
+    un lote_importacion nuevo y los pks se leen con una consulta. Dentro de un INSERT
+    los ids crecen en el orden de las filas, así que ordenados por pk coinciden.'''
+    db = router.db_for_write(modelo)
+    if connections[db].features.can_return_rows_from_bulk_insert:
+        modelo.objects.using(db).bulk_create(objetos, batch_size=tamanio_lote)
+        return
+    marca = uuid.uuid4()
+    for objeto in objetos:
+        objeto.lote_importacion = marca
+    modelo.objects.using(db).bulk_create(objetos, batch_size=tamanio_lote)
+    filas = modelo._base_manager.using(db).filter(lote_importacion=marca)
+    for objeto, pk in zip(objetos, filas.order_by("pk").values_list("pk", flat=True)):
+        objeto.pk = pk
+        objeto.lote_importacion = None
+    filas.update(lote_importacion=None)
+
+
+def restaurar_creado(modelo, filas, tamanio_lote):
+    '''filas: [(objeto, fecha original o None)]. Sin una fecha válida queda la de hoy'''
+    objetos = []
+    for objeto, creado in filas:
+        fecha = a_fecha(creado)
+        if fecha:
+            objeto.creado = fecha
+            objetos.append(objeto)
+    modelo.objects.bulk_update(objetos, ["creado"], batch_size=tamanio_lote)
+
+
+def importar(origen, tamanio_lote=1000, autor_por_defecto=None):
+    '''Importa un archivo JSONL o una carpeta de CSV; devuelve (cantidades, omitidos)'''
+    importador = Importador(tamanio_lote, autor_por_defecto)
+    for tipo, registro in leer_registros(origen):
+        importador.agregar(tipo, registro)
+    return importador.terminar(), importador.omitidos
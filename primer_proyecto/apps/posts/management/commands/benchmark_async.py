@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.posts.rendimiento import carga_asgi, carga_wsgi, urls_publicas
+from .benchmark_blog import Command as BenchmarkBlog
+
+MODOS = {
+    # modo: (ROOT_URLCONF, servidor)
+    "wsgi": ("primer_proyecto.urls", "wsgi"),
+    "asgi_vistas_sync": ("primer_proyecto.urls", "asgi"),
+    "asgi_vistas_async": ("primer_proyecto.urls_async", "asgi"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara las páginas públicas bajo carga concurrente: WSGI con un pool de hilos, "
+        "ASGI con las vistas sync y ASGI con las vistas async (vistas_async.py). Usa los "
+        "datos que ya hay en la base; local: BLOG_DB=sqlite y antes sembrar_datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pedidos", type=int, default=200, help="Pedidos por página y modo")
+        parser.add_argument("--concurrencia", type=int, default=50, help="Conexiones simultáneas (ASGI)")
+        parser.add_argument("--hilos", type=int, default=8, help="Workers del servidor WSGI")
+        parser.add_argument(
+            "--latencia-cliente", type=float, default=0.0,
+            help="Milisegundos que tarda el cliente en recibir cada respuesta (cliente lento)",
+        )
+        parser.add_argument("--con-cache", action="store_true", help="Permite el cache de páginas de anónimos")
+        parser.add_argument("--salida", help="Archivo JSON (por defecto, la salida estándar)")
+
+    def handle(self, *args, **options):
+        urls = urls_publicas()
+        if not urls:
+            raise CommandError("No hay posts ni categorías: cargá datos con sembrar_datos.")
+        latencia = options["latencia_cliente"] / 1000
+        resultado = {
+            "entorno": BenchmarkBlog().entorno(),
+            "parametros": {clave: options[clave] for clave in (
+                "pedidos", "concurrencia", "hilos", "latencia_cliente", "con_cache",
+            )},
+            "modos": {},
+        }
+        for modo, (urlconf, servidor) in MODOS.items():
+            resultado["modos"][modo] = {}
+            with override_settings(ROOT_URLCONF=urlconf, ALLOWED_HOSTS=["testserver"]):
+                for nombre, url in urls.items():
+                    cache.clear()
+                    if servidor == "wsgi":
+                        medicion = carga_wsgi(url, options["pedidos"], options["hilos"], latencia, options["con_cache"])
+                    else:
+                        medicion = asyncio.run(carga_asgi(
+                            url, options["pedidos"], options["concurrencia"], latencia, options["con_cache"],
+                        ))
+                    resultado["modos"][modo][nombre] = medicion
+            self.stderr.write(f"Modo {modo} medido.")
+
+        salida = json.dumps(resultado, indent=2, ensure_ascii=False, sort_keys=True)
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as archivo:
+                archivo.write(salida + "\n")
+        else:
+            self.stdout.write(salida)
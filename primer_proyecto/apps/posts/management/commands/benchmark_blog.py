@@ -0,0 +1,77 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from apps.posts.rendimiento import medir_vistas, sembrar
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide tiempo y cantidad de consultas de las vistas principales con distintos "
+        "volúmenes de datos y escribe el resultado en JSON. Cada escala se carga dentro "
+        "de una transacción que se descarta al final. Local: BLOG_DB=sqlite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--escalas", default="100,1000,10000",
+            help="Cantidades de posts separadas por coma (usuarios = posts/10, comentarios = 3×posts)",
+        )
+        parser.add_argument("--repeticiones", type=int, default=20)
+        parser.add_argument("--semilla", type=int, default=42)
+        parser.add_argument("--salida", help="Archivo JSON (por defecto, la salida estándar)")
+
+    def handle(self, *args, **options):
+        resultado = {"entorno": self.entorno(), "escalas": []}
+        for posts in (int(valor) for valor in options["escalas"].split(",")):
+            resultado["escalas"].append(self.medir_escala(posts, options["repeticiones"], options["semilla"]))
+            self.stderr.write(f"Escala de {posts} posts medida.")
+
+        salida = json.dumps(resultado, indent=2, ensure_ascii=False, sort_keys=True)
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as archivo:
+                archivo.write(salida + "\n")
+        else:
+            self.stdout.write(salida)
+
+    def medir_escala(self, posts, repeticiones, semilla):
+        escala = {"posts": posts, "usuarios": max(10, posts // 10), "categorias": 10, "comentarios": posts * 3}
+        # Las tareas se ejecutan en el momento: dentro de la transacción no hay on_commit
+        with override_settings(TAREAS_SINCRONO=True, ALLOWED_HOSTS=["testserver"]):
+            try:
+                with transaction.atomic():
+                    inicio = time.perf_counter()
+                    datos = sembrar(semilla=semilla, **escala)
+                    escala["carga_s"] = round(time.perf_counter() - inicio, 2)
+                    escala["vistas"] = medir_vistas(datos, repeticiones)
+                    raise Rollback
+            except Rollback:
+                pass
+        # El cache tiene versiones y páginas de datos que ya no existen
+        cache.clear()
+        return escala
+
+    def entorno(self):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "base_de_datos": connection.vendor,
+            "django": django.get_version(),
+            "python": platform.python_version(),
+        }
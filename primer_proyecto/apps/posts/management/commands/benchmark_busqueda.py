@@ -0,0 +1,73 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.posts.busqueda import buscar, filas_de_post, total_posts_indexados
+from apps.posts.models import Post, TerminoBusqueda
+from apps.usuarios.models import Usuario
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de la búsqueda sobre un corpus sintético. "
+        "Todo se hace dentro de una transacción que se descarta al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100_000)
+        parser.add_argument("--consultas", type=int, default=200)
+        parser.add_argument("--vocabulario", type=int, default=20_000)
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.medir(**options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def medir(self, posts, consultas, vocabulario, semilla, **options):
+        azar = random.Random(semilla)
+        # Vocabulario con distribución de Zipf: pocas palabras muy comunes, muchas raras
+        palabras = [f"palabra{i}" for i in range(vocabulario)]
+        acumulados = list(itertools.accumulate(1 / (i + 1) for i in range(vocabulario)))
+
+        def texto(cantidad):
+            return " ".join(azar.choices(palabras, cum_weights=acumulados, k=cantidad))
+
+        autor = Usuario.objects.create_user(username="benchmark_busqueda")
+        inicio = time.perf_counter()
+        lote = []
+        for i in range(posts):
+            lote.append(Post(titulo=texto(6), subtitulo=texto(10), texto=texto(150), autor=autor))
+            if len(lote) == 1000 or i == posts - 1:
+                creados = Post.objects.bulk_create(lote)
+                filas = [fila for post in creados for fila in filas_de_post(post)]
+                TerminoBusqueda.objects.bulk_create(filas, batch_size=5000)
+                lote = []
+        self.stdout.write(f"Corpus: {posts} posts indexados en {time.perf_counter() - inicio:.1f} s")
+        total_posts_indexados()
+
+        tiempos = []
+        for _ in range(consultas):
+            consulta = texto(azar.randint(1, 3))
+            inicio = time.perf_counter()
+            buscar(consulta)[:6]
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        tiempos.sort()
+        self.stdout.write(
+            f"{consultas} consultas: "
+            f"p50={statistics.median(tiempos):.1f} ms "
+            f"p95={tiempos[int(len(tiempos) * 0.95) - 1]:.1f} ms "
+            f"máx={tiempos[-1]:.1f} ms"
+        )
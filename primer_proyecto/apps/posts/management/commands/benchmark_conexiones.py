@@ -0,0 +1,97 @@
+import copy
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+
+from apps.posts.rendimiento import url_de_pedido, urls_publicas
+from .benchmark_blog import Command as BenchmarkBlog
+
+MODOS = {
+    # Antes: una conexión nueva por request
+    "sin_persistencia": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+    "persistente": {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": False},
+    "persistente_verificada": {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True},
+    # Solo MySQL: el pool de mysql.connector (ver primer_proyecto/base_de_datos.py)
+    "pool": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "OPTIONS": {"pool_name": "benchmark", "pool_size": 2}},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de conexión por request con y sin conexiones persistentes y con el "
+        "pool de mysql.connector, pidiendo una página pública en secuencia. Usa la base "
+        "configurada (BLOG_DB, DB_HOST...) y los datos que ya tiene."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pedidos", type=int, default=200)
+        parser.add_argument("--pagina", default="detalle_post", help="home, detalle_post, posts_por_categoria o buscar")
+        parser.add_argument("--salida", help="Archivo JSON (por defecto, la salida estándar)")
+
+    def handle(self, *args, **options):
+        urls = urls_publicas()
+        if options["pagina"] not in urls:
+            raise CommandError("No hay datos para esa página: cargá datos con sembrar_datos.")
+        original = copy.deepcopy(connection.settings_dict)
+        resultado = {"entorno": BenchmarkBlog().entorno(), "pedidos": options["pedidos"], "modos": {}}
+        try:
+            for modo, ajustes in MODOS.items():
+                if "OPTIONS" in ajustes and connection.vendor != "mysql":
+                    resultado["modos"][modo] = None   # El pool es de mysql.connector
+                    continue
+                connection.close()
+                connection.settings_dict.update(copy.deepcopy(original))
+                for clave, valor in ajustes.items():
+                    if clave == "OPTIONS":
+                        connection.settings_dict["OPTIONS"] = {**original.get("OPTIONS", {}), **valor}
+                    else:
+                        connection.settings_dict[clave] = valor
+                resultado["modos"][modo] = self.medir(urls[options["pagina"]], options["pedidos"])
+                self.stderr.write(f"Modo {modo} medido.")
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+
+        salida = json.dumps(resultado, indent=2, ensure_ascii=False, sort_keys=True)
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as archivo:
+                archivo.write(salida + "\n")
+        else:
+            self.stdout.write(salida)
+
+    def medir(self, url, pedidos):
+        abiertas = []
+
+        def conexion_abierta(sender, connection, **kwargs):
+            abiertas.append(connection.alias)
+
+        # Cada modo pide las mismas URLs: sin el cache de páginas de la corrida anterior
+        cache.clear()
+        cliente = Client()
+        tiempos = []
+        connection_created.connect(conexion_abierta)
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                for numero in range(pedidos):
+                    inicio = time.perf_counter()
+                    # El cliente de pruebas no cierra conexiones: se hace como el handler WSGI
+                    close_old_connections()
+                    cliente.get(url_de_pedido(url, numero, con_cache=False))
+                    close_old_connections()
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            connection_created.disconnect(conexion_abierta)
+        tiempos.sort()
+        return {
+            "conexiones_abiertas": len(abiertas),
+            "promedio_ms": round(statistics.fmean(tiempos), 3),
+            "p50_ms": round(statistics.median(tiempos), 3),
+            "p95_ms": round(tiempos[max(0, int(len(tiempos) * 0.95) - 1)], 3),
+        }
@@ -0,0 +1,62 @@
+import re
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from apps.posts.almacenamiento import campos_por_contenido, hash_de, nombres_por_defecto
+from apps.posts.cache import invalidar_contenido
+from apps.posts.imagenes import eliminar_imagen, imagen_subida
+
+# carpeta/ab/ab...(64 hex).ext: ya está guardado por contenido
+PATRON_POR_CONTENIDO = re.compile(r"(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}\.\w+$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa las imágenes subidas antes del almacenamiento por contenido a su nombre por "
+        "hash: las copias de un mismo archivo quedan en uno solo, se actualizan las filas "
+        "y se borran los archivos viejos (con sus miniaturas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--simular", action="store_true", help="Solo informa, no cambia nada")
+
+    def handle(self, *args, **options):
+        simular = options["simular"]
+        por_defecto = nombres_por_defecto()
+        archivos = bytes_liberados = faltantes = 0
+        destinos = set()
+        for modelo, campo in campos_por_contenido():
+            storage = campo.storage
+            nombres = (
+                modelo._base_manager.exclude(**{campo.name: ""}).exclude(**{f"{campo.name}__in": por_defecto})
+                .values_list(campo.name, flat=True).distinct()
+            )
+            for viejo in list(nombres):
+                if not viejo or PATRON_POR_CONTENIDO.search(viejo):
+                    continue
+                if not storage.exists(viejo):
+                    faltantes += 1
+                    continue
+                with storage.open(viejo) as archivo:
+                    if simular:
+                        nuevo = hash_de(File(archivo))
+                    else:
+                        nuevo = storage.save(viejo, File(archivo))
+                archivos += 1
+                if nuevo in destinos:
+                    bytes_liberados += storage.size(viejo)
+                destinos.add(nuevo)
+                if not simular:
+                    modelo._base_manager.filter(**{campo.name: viejo}).update(**{campo.name: nuevo})
+                    eliminar_imagen(viejo)
+                    # El UPDATE no pasa por las señales: los derivados del nombre nuevo
+                    imagen_subida(nuevo)
+
+        if archivos and not simular:
+            # Las páginas y fragmentos cacheados apuntan a los nombres viejos
+            invalidar_contenido()
+        self.stdout.write(self.style.SUCCESS(
+            f"{archivos} archivos {'a migrar' if simular else 'migrados'} a {len(destinos)} únicos "
+            f"({bytes_liberados / 1024:.0f} KB de copias); {faltantes} faltantes."
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.intercambio import exportar
+
+
+class Command(BaseCommand):
+    help = "Exporta categorías, posts y comentarios a un archivo JSONL o a una carpeta de CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("destino", help="Archivo .jsonl o carpeta (con --formato csv)")
+        parser.add_argument("--formato", choices=["jsonl", "csv"], default="jsonl")
+        parser.add_argument("--lote", type=int, default=2000, help="Filas leídas por consulta")
+
+    def handle(self, *args, **options):
+        cantidades = exportar(options["destino"], options["formato"], options["lote"])
+        resumen = ", ".join(f"{cantidad} {tipo}s" for tipo, cantidad in cantidades.items())
+        self.stdout.write(self.style.SUCCESS(f"Exportado: {resumen}."))
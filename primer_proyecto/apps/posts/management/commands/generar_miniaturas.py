@@ -0,0 +1,23 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from apps.posts.almacenamiento import nombres_referenciados
+from apps.posts.imagenes import ANCHOS_DERIVADOS, nombre_derivado, procesar_imagen
+from apps.tareas.cola import encolar
+
+
+class Command(BaseCommand):
+    help = (
+        "Encola los derivados WebP de las imágenes referenciadas que todavía no los tienen "
+        "(cargadas sin pasar por las señales: importaciones, imágenes de antes de las miniaturas...)."
+    )
+
+    def handle(self, *args, **options):
+        faltantes = [
+            nombre for nombre in sorted(nombres_referenciados())
+            if default_storage.exists(nombre)
+            and not default_storage.exists(nombre_derivado(nombre, ANCHOS_DERIVADOS[0]))
+        ]
+        for nombre in faltantes:
+            encolar(procesar_imagen, nombre)
+        self.stdout.write(self.style.SUCCESS(f"Miniaturas de {len(faltantes)} imágenes encoladas."))
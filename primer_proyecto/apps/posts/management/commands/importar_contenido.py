@@ -0,0 +1,28 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.posts.intercambio import importar
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa categorías, posts y comentarios desde un archivo JSONL o una carpeta "
+        "de CSV (el formato de exportar_contenido)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("origen", help="Archivo .jsonl o carpeta con los CSV")
+        parser.add_argument("--lote", type=int, default=1000, help="Filas por bulk_create")
+        parser.add_argument(
+            "--autor", help="Username a usar cuando el autor del archivo no existe (si no, se omite el registro)",
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["origen"]):
+            raise CommandError(f"No existe {options['origen']}")
+        cantidades, omitidos = importar(options["origen"], options["lote"], options["autor"])
+        resumen = ", ".join(f"{cantidad} {tipo}s" for tipo, cantidad in cantidades.items())
+        self.stdout.write(self.style.SUCCESS(f"Importado: {resumen}."))
+        if omitidos:
+            self.stdout.write(self.style.WARNING(f"{omitidos} registros omitidos (autor o post inexistente)."))
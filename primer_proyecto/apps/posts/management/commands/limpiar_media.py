@@ -0,0 +1,64 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.posts.almacenamiento import campos_por_contenido, nombres_referenciados
+from apps.posts.imagenes import ANCHOS_DERIVADOS, CARPETA_DERIVADOS
+
+
+def recorrer(storage, carpeta):
+    '''Nombres de todos los archivos bajo carpeta (recursivo)'''
+    if not storage.exists(carpeta):
+        return
+    subcarpetas, archivos = storage.listdir(carpeta)
+    for archivo in archivos:
+        yield posixpath.join(carpeta, archivo)
+    for subcarpeta in subcarpetas:
+        yield from recorrer(storage, posixpath.join(carpeta, subcarpeta))
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra de MEDIA_ROOT las imágenes y miniaturas que ninguna fila referencia "
+        "(restos de borrados que no pasaron por las señales, subidas cortadas...)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--simular", action="store_true", help="Solo informa, no borra")
+        parser.add_argument(
+            "--minutos", type=int, default=60,
+            help="No tocar archivos más nuevos que esto: pueden ser de una subida en curso (60)",
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        limite = timezone.now() - timedelta(minutes=options["minutos"])
+        referenciados = nombres_referenciados()
+        # Las miniaturas son derivados/<ancho>/<nombre original>.webp (las de antes, sin
+        # la extensión original, ya no se usan y también se borran)
+
+        candidatos = []
+        for carpeta in {campo.upload_to for _, campo in campos_por_contenido()}:
+            candidatos += [nombre for nombre in recorrer(storage, carpeta) if nombre not in referenciados]
+        for ancho in ANCHOS_DERIVADOS:
+            carpeta = f"{CARPETA_DERIVADOS}/{ancho}"
+            candidatos += [
+                nombre for nombre in recorrer(storage, carpeta)
+                if posixpath.splitext(posixpath.relpath(nombre, carpeta))[0] not in referenciados
+            ]
+
+        huerfanos = [nombre for nombre in candidatos if storage.get_modified_time(nombre) < limite]
+        bytes_liberados = sum(storage.size(nombre) for nombre in huerfanos)
+        if not options["simular"]:
+            for nombre in huerfanos:
+                storage.delete(nombre)
+        if options["verbosity"] > 1:
+            for nombre in huerfanos:
+                self.stdout.write(f"  {nombre}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(huerfanos)} archivos huérfanos {'encontrados' if options['simular'] else 'borrados'} "
+            f"({bytes_liberados / 1024:.0f} KB); {len(candidatos) - len(huerfanos)} recientes sin tocar."
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.cache import invalidar_categorias_menu, invalidar_contenido
+from apps.posts.contadores import recalcular_categorias, recalcular_posts, recalcular_usuarios
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de comentarios y posts y corrige los desfasados"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--solo-verificar", action="store_true",
+            help="Informa las filas desfasadas sin modificarlas",
+        )
+
+    def handle(self, *args, **options):
+        corregir = not options["solo_verificar"]
+        desfasadas = {
+            "Post.num_comentarios": recalcular_posts(corregir=corregir),
+            "Categoria.num_posts": recalcular_categorias(corregir=corregir),
+            "Usuario.num_posts": recalcular_usuarios(corregir=corregir),
+        }
+        for contador, cantidad in desfasadas.items():
+            self.stdout.write(f"{contador}: {cantidad} filas desfasadas")
+
+        if corregir and any(desfasadas.values()):
+            invalidar_categorias_menu()
+            invalidar_contenido()
+            self.stdout.write(self.style.SUCCESS("Contadores corregidos."))
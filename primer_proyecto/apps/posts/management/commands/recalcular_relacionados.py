@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.cache import invalidar_contenido
+from apps.posts.relacionados import recalcular_todos
+
+
+class Command(BaseCommand):
+    help = "Recalcula los posts relacionados de todos los posts (después de reindexar la búsqueda)"
+
+    def handle(self, *args, **options):
+        total = recalcular_todos()
+        invalidar_contenido()
+        self.stdout.write(self.style.SUCCESS(f"Relacionados de {total} posts recalculados."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.busqueda import reindexar_todo
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de todos los posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=500, help="Posts por lote")
+
+    def handle(self, *args, **options):
+        total = reindexar_todo(tamanio_lote=options["lote"])
+        self.stdout.write(self.style.SUCCESS(f"{total} posts indexados."))
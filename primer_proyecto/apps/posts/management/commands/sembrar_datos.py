@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.posts.rendimiento import sembrar
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga usuarios, categorías, posts y comentarios sintéticos (siempre los mismos "
+        "para una misma semilla). Útil con BLOG_DB=sqlite para pruebas de carga locales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=50)
+        parser.add_argument("--categorias", type=int, default=10)
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--comentarios", type=int, default=3000)
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def handle(self, *args, **options):
+        sembrar(
+            usuarios=options["usuarios"], categorias=options["categorias"], posts=options["posts"],
+            comentarios=options["comentarios"], semilla=options["semilla"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['usuarios']} usuarios, {options['categorias']} categorías, "
+            f"{options['posts']} posts y {options['comentarios']} comentarios creados."
+        ))
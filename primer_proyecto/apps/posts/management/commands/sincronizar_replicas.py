@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Solo SQLite (pruebas locales): copia la base \"default\" sobre los archivos de las "
+        "réplicas (DB_REPLICAS), como haría la replicación de MySQL. Correrlo de nuevo "
+        "simula que la réplica se pone al día."
+    )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICAS_LECTURA:
+            raise CommandError("No hay réplicas configuradas (DB_REPLICAS).")
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("En MySQL las réplicas se sincronizan con la replicación del servidor.")
+
+        origen = sqlite3.connect(connections["default"].settings_dict["NAME"])
+        try:
+            for alias in settings.REPLICAS_LECTURA:
+                connections[alias].close()
+                destino = sqlite3.connect(connections[alias].settings_dict["NAME"])
+                try:
+                    origen.backup(destino)
+                finally:
+                    destino.close()
+                self.stdout.write(self.style.SUCCESS(f"{alias} sincronizada."))
+        finally:
+            origen.close()
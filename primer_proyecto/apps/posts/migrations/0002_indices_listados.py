@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-17 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['post', 'creado'], name='comentario_post_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['publicado', 'id', 'activo'], name='post_publicado_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['categoria', 'publicado', 'activo'], name='post_cat_pub_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['categoria', 'titulo', 'activo'], name='post_cat_titulo_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['autor', 'publicado'], name='post_autor_publicado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['autor', 'titulo'], name='post_autor_titulo_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_indices_listados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=40)),
+                ('peso', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='posts.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['termino', '-peso', 'post'], name='termino_peso_post_idx')],
+                'constraints': [models.UniqueConstraint(fields=('termino', 'post'), name='termino_post_unico')],
+            },
+        ),
+    ]
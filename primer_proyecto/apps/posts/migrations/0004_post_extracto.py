@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 21:45
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def completar_extractos(apps, schema_editor):
+    '''Calcula el extracto de los posts existentes, en lotes'''
+    Post = apps.get_model('posts', 'Post')
+    lote = []
+    for post in Post.objects.only('texto').iterator(chunk_size=500):
+        post.extracto = Truncator(Truncator(post.texto or '').words(20)).chars(300)
+        lote.append(post)
+        if len(lote) == 500:
+            Post.objects.bulk_update(lote, ['extracto'])
+            lote = []
+    Post.objects.bulk_update(lote, ['extracto'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_terminobusqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='extracto',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.RunPython(completar_extractos, migrations.RunPython.noop),
+    ]
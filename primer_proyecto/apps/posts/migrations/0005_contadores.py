@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-17 22:10
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def conteo(queryset, campo_relacion):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{campo_relacion: OuterRef('pk')})
+            .order_by()
+            .values(campo_relacion)
+            .annotate(n=Count('pk'))
+            .values('n'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def completar_contadores(apps, schema_editor):
+    '''Calcula los contadores de las filas existentes (un UPDATE por tabla)'''
+    Post = apps.get_model('posts', 'Post')
+    Categoria = apps.get_model('posts', 'Categoria')
+    Comentario = apps.get_model('posts', 'Comentario')
+    Usuario = apps.get_model('usuarios', 'Usuario')
+    Post.objects.update(num_comentarios=conteo(Comentario.objects.all(), 'post'))
+    Categoria.objects.update(num_posts=conteo(Post.objects.filter(activo=True), 'categoria'))
+    Usuario.objects.update(num_posts=conteo(Post.objects.all(), 'autor'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_extracto'),
+        ('usuarios', '0002_usuario_num_posts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='num_posts',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='num_comentarios',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(completar_contadores, migrations.RunPython.noop),
+    ]
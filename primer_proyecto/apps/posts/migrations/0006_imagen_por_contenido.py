@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-17 21:14
+
+import apps.posts.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_contadores'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='imagen',
+            field=models.ImageField(blank=True, db_index=True, default='posts/post_default.png', null=True, storage=apps.posts.almacenamiento.AlmacenamientoPorContenido(), upload_to='posts'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-17 21:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_imagen_por_contenido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['creado'], name='comentario_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-17 21:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_comentario_creado_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='num_visitas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='VisitaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('visitas', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visitas_diarias', to='posts.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dia', 'post', 'visitas'], name='visita_dia_post_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'dia'), name='visita_post_dia_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 21:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_visitas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRelacionado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionados', to='posts.post')),
+                ('relacionado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionado_de', to='posts.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['post', '-puntaje', 'relacionado'], name='relacionado_puntaje_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'relacionado'), name='relacionado_post_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_relacionado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comentario',
+            name='lote_importacion',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='lote_importacion',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
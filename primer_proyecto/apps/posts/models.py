@@ -1,6 +1,10 @@
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
+from django.utils.text import Truncator
+
+from .almacenamiento import AlmacenamientoPorContenido, ArchivosPorContenidoMixin
+from .contadores import ContadoresMixin, estado_contado
 
 ########### MODELO CATEGORÍA (sirve para clasificación del Posts)
 ########### MODELO CATEGORÍA (sirve para clasificación del Posts)
@@ -9,7 +13,7 @@ from django.conf import settings
 '''Creamos la clase “Categoria”, que representa una clasificación temática para 
 los artículos del blog.'''
 
-class Categoria(models.Model):
+class Categoria(ContadoresMixin, models.Model):
     nombre = models.CharField(max_length=50, unique=True, null=False)
     
     ''' nombre: será el nombre identificatorio de una categoría.
@@ -17,6 +21,11 @@ class Categoria(models.Model):
     - unique=True → evita categorías duplicadas
     - null=False → siempre debe existir un nombre'''
 
+    # Cantidad de posts activos (lo mantienen las señales, ver contadores.py)
+    num_posts = models.PositiveIntegerField(default=0, editable=False)
+
+    campos_contadores = ('num_posts',)
+
     def __str__(self):
         return self.nombre
 
@@ -26,13 +35,20 @@ class Categoria(models.Model):
 # MODELO: POST (ARTÍCULO DEL BLOG)
 # MODELO: POST (ARTÍCULO DEL BLOG)
 
+EXTRACTO_PALABRAS = 20
+
+
+def generar_extracto(texto):
+    '''Las primeras EXTRACTO_PALABRAS palabras del texto (igual que truncatewords:20)'''
+    return Truncator(Truncator(texto or "").words(EXTRACTO_PALABRAS)).chars(300)
+
 
 ''' La clase “Post” son los artículos/publicaciones que son creadas por 
 los usuarios colaboradores.
 Cada Post tiene que poseer un: título, subtítulo, una categoría, imagen, 
 texto (que es el contenido),fecha de publicación, autor '''
 
-class Post(models.Model):
+class Post(ContadoresMixin, ArchivosPorContenidoMixin, models.Model):
 
     # título
     titulo = models.CharField(max_length=100, null=False)
@@ -43,11 +59,21 @@ class Post(models.Model):
     # contenido / texto del post / artículo / etc...
     texto = models.TextField(null=False)
 
+    # Extracto para las tarjetas de los listados
+    extracto = models.CharField(max_length=300, blank=True, editable=False)
+    '''Primeras palabras del texto, calculadas al guardar. Los listados muestran
+    esto en lugar de traer y recortar el texto completo en cada render.'''
+
     # Imagen
-    imagen = models.ImageField(null=True, blank=True, upload_to='posts', default='posts/post_default.png')
+    imagen = models.ImageField(
+        null=True, blank=True, upload_to='posts', default='posts/post_default.png',
+        storage=AlmacenamientoPorContenido(), db_index=True,
+    )
     
-    '''- upload_to='posts' guarda las imágenes en /media/posts/
-    - default: si no se carga ninguna imagen uso la de post_default.png'''
+    '''- upload_to='posts' guarda las imágenes en /media/posts/ (con el hash del
+      contenido como nombre: ver almacenamiento.py)
+    - default: si no se carga ninguna imagen uso la de post_default.png
+    - db_index: para contar rápido cuántas filas usan un archivo antes de borrarlo'''
 
     # Fecha de creación del post
     creado = models.DateTimeField(auto_now_add=True)
@@ -61,6 +87,19 @@ class Post(models.Model):
     # Campo booleano para activar/desactivar un post
     activo = models.BooleanField(default=True)
 
+    # Cantidad de comentarios (la mantienen las señales, ver contadores.py)
+    num_comentarios = models.PositiveIntegerField(default=0, editable=False)
+
+    # Cantidad de visitas al detalle (se vuelcan por lotes, ver visitas.py)
+    num_visitas = models.PositiveIntegerField(default=0, editable=False)
+
+    campos_contadores = ('num_comentarios', 'num_visitas')
+
+    # Marca de un lote de la importación masiva (ver intercambio.insertar)
+    lote_importacion = models.UUIDField(null=True, blank=True, editable=False, db_index=True)
+    '''Solo se usa mientras se guarda el lote, en las bases que no devuelven los ids
+    de un INSERT de varias filas (MySQL); el resto del tiempo es NULL.'''
+
 
     # RELACIONES: Relación POST con CATEGORÍA  # OJO / CUIDADO!!!
         
@@ -81,16 +120,39 @@ class Post(models.Model):
 
     class Meta:
         ordering = ('-publicado',)
+        # Índices compuestos que coinciden con los filtros + orden de los listados.
+        # "activo" va al final: Django lo compila como "WHERE activo" (sin "= 1"),
+        # así que se filtra dentro del índice mientras se recorre en el orden pedido.
+        indexes = [
+            # Inicio: activo=True ORDER BY publicado, id (cursor)
+            models.Index(fields=['publicado', 'id', 'activo'], name='post_publicado_activo_idx'),
+            # Posts por categoría: categoria + activo, ordenado por fecha o título
+            models.Index(fields=['categoria', 'publicado', 'activo'], name='post_cat_pub_activo_idx'),
+            models.Index(fields=['categoria', 'titulo', 'activo'], name='post_cat_titulo_activo_idx'),
+            # Administrar posts: autor, ordenado por fecha o título
+            models.Index(fields=['autor', 'publicado'], name='post_autor_publicado_idx'),
+            models.Index(fields=['autor', 'titulo'], name='post_autor_titulo_idx'),
+        ]
 
     def __str__(self):
         return self.titulo
 
-    # Eliminación de la imagen asociada al posts
-    def delete(self, using=None, keep_parents=False):
-        if self.imagen:
-            self.imagen.delete(save=False)
-        super().delete(using=using, keep_parents=keep_parents)
-'''verifica si el post tiene una imagen asociada y la elimina'''
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Categoría/estado/autor tal como se leyeron: al guardar se ajustan los contadores
+        instancia._estado_contado = estado_contado(instancia)
+        return instancia
+
+    # Cálculo del extracto al guardar
+    def save(self, *args, **kwargs):
+        # Con el texto diferido (only/defer) no cambió: no se lee solo para esto
+        if "texto" not in self.get_deferred_fields():
+            self.extracto = generar_extracto(self.texto)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "texto" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "extracto"}
+        super().save(*args, **kwargs)
 
 
 
@@ -119,9 +181,114 @@ class Comentario(models.Model):
     creado = models.DateTimeField(auto_now_add=True)
     '''Fecha de creación automática del comentario.'''
 
+    # Marca de un lote de la importación masiva (como en Post)
+    lote_importacion = models.UUIDField(null=True, blank=True, editable=False, db_index=True)
+
     class Meta:
         ordering = ('-creado',)
         '''Los comentarios se ordenan desde el mas reciente al mas antiguo'''
+        indexes = [
+            # Comentarios de un post, del más reciente al más antiguo
+            models.Index(fields=['post', 'creado'], name='comentario_post_creado_idx'),
+            # Administración: todos los comentarios por fecha (date_hierarchy)
+            models.Index(fields=['creado'], name='comentario_creado_idx'),
+        ]
 
     def __str__(self):
         return f"Comentario de {self.autor} en {self.post.titulo}"
+
+
+
+
+# MODELO: TÉRMINO DE BÚSQUEDA (ÍNDICE INVERTIDO)
+# MODELO: TÉRMINO DE BÚSQUEDA (ÍNDICE INVERTIDO)
+# MODELO: TÉRMINO DE BÚSQUEDA (ÍNDICE INVERTIDO)
+'''Cada fila dice "el término X aparece en el Post Y con este peso".
+Buscar una palabra es leer un rango del índice (termino, peso, post) en lugar de
+recorrer con LIKE '%...%' todos los textos. Solo se indexan los posts activos. Lo mantiene busqueda.py (ver signals.py).'''
+
+
+class TerminoBusqueda(models.Model):
+
+    termino = models.CharField(max_length=40)
+    ''' Palabra normalizada: minúsculas, sin acentos y reducida a su raíz'''
+
+    post = models.ForeignKey(Post, related_name='terminos_busqueda', on_delete=models.CASCADE)
+
+    peso = models.FloatField()
+    ''' Importancia del término en el post (frecuencia ponderada por campo:
+    el título pesa más que el subtítulo y éste más que el texto)'''
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['termino', 'post'], name='termino_post_unico'),
+        ]
+        indexes = [
+            # Índice "cubriente" ordenado por impacto: los posts donde el término
+            # pesa más se leen primero, sin tocar la tabla
+            models.Index(fields=['termino', '-peso', 'post'], name='termino_peso_post_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.termino} → {self.post_id}"
+
+
+
+
+# MODELO: VISITAS POR DÍA
+# MODELO: VISITAS POR DÍA
+# MODELO: VISITAS POR DÍA
+'''Visitas de cada post en cada día, para el ranking de "más leídos" de los últimos
+días. Las suma visitas.py de a lotes (nunca una fila por visita).'''
+
+
+class VisitaDiaria(models.Model):
+
+    post = models.ForeignKey(Post, related_name='visitas_diarias', on_delete=models.CASCADE)
+
+    dia = models.DateField()
+
+    visitas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'dia'], name='visita_post_dia_unica'),
+        ]
+        indexes = [
+            # Ranking: las filas de los últimos días
+            models.Index(fields=['dia', 'post', 'visitas'], name='visita_dia_post_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} {self.dia}: {self.visitas}"
+
+
+
+
+# MODELO: POST RELACIONADO
+# MODELO: POST RELACIONADO
+# MODELO: POST RELACIONADO
+'''Los posts más parecidos a cada post (coseno TF-IDF), precalculados en la cola
+por relacionados.py. El detalle los lee ordenados por puntaje con un solo índice.'''
+
+
+class PostRelacionado(models.Model):
+
+    post = models.ForeignKey(Post, related_name='relacionados', on_delete=models.CASCADE)
+
+    relacionado = models.ForeignKey(Post, related_name='relacionado_de', on_delete=models.CASCADE)
+
+    puntaje = models.FloatField()
+    ''' Parecido entre los dos posts (de 0 a 1)'''
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'relacionado'], name='relacionado_post_unico'),
+        ]
+        indexes = [
+            # Relacionados de un post, del más parecido al menos parecido
+            models.Index(fields=['post', '-puntaje', 'relacionado'], name='relacionado_puntaje_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} → {self.relacionado_id} ({self.puntaje:.2f})"
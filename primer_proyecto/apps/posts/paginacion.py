@@ -0,0 +1,245 @@
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+# PAGINACIÓN POR CURSOR (KEYSET)
+
+'''En lugar de OFFSET (que obliga a la base a recorrer y descartar todas las filas
+anteriores), cada página se pide "a partir de" la última fila vista, usando el par
+(publicado, id) como cursor. Con un índice sobre esas columnas el costo es el mismo
+en la página 1 que en la página 10.000.'''
+
+EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def codificar_cursor(post):
+    '''Convierte (publicado, id) en un texto apto para la URL: "<microsegundos>.<id>"'''
+    microsegundos = (post.publicado - EPOCA) // timedelta(microseconds=1)
+    return f"{microsegundos}.{post.pk}"
+
+
+def decodificar_cursor(valor):
+    '''Devuelve (publicado, id) o None si el cursor es inválido'''
+    if not valor:
+        return None
+    try:
+        microsegundos, pk = valor.split(".")
+        publicado = EPOCA + timedelta(microseconds=int(microsegundos))
+        return publicado, int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+
+class PaginaCursor:
+    '''Resultado de una página: los objetos y los cursores para moverse.'''
+
+    def __init__(self, objetos, cursor_anterior=None, cursor_siguiente=None):
+        self.objetos = objetos
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+
+def paginar_por_cursor(queryset, despues=None, antes=None, por_pagina=9):
+    """
+    Pagina un queryset ordenado de más reciente a más antiguo por (publicado, id).
+    - despues: cursor de la última fila vista → trae los posts más antiguos.
+    - antes: cursor de la primera fila vista → trae los posts más recientes.
+    Se pide una fila de más para saber si existe otra página sin hacer COUNT(*).
+    """
+    consulta, cursor_despues, cursor_antes = consulta_por_cursor(queryset, despues, antes, por_pagina)
+    return armar_pagina(list(consulta), cursor_despues, cursor_antes, por_pagina)
+
+
+async def apaginar_por_cursor(queryset, despues=None, antes=None, por_pagina=9):
+    '''Igual que paginar_por_cursor(), con el ORM asíncrono'''
+    consulta, cursor_despues, cursor_antes = consulta_por_cursor(queryset, despues, antes, por_pagina)
+    return armar_pagina([fila async for fila in consulta], cursor_despues, cursor_antes, por_pagina)
+
+
+def consulta_por_cursor(queryset, despues, antes, por_pagina):
+    '''Arma (sin ejecutar) la consulta de la página; devuelve (consulta, cursor_despues, cursor_antes)'''
+    cursor_despues = decodificar_cursor(despues)
+    cursor_antes = None if cursor_despues else decodificar_cursor(antes)
+
+    # 1. Navegando hacia atrás (posts más recientes): se recorre en orden ascendente
+    if cursor_antes:
+        publicado, pk = cursor_antes
+        consulta = (
+            queryset
+            .filter(publicado__gte=publicado)
+            .filter(Q(publicado__gt=publicado) | Q(pk__gt=pk))
+            .order_by("publicado", "pk")[:por_pagina + 1]
+        )
+        return consulta, None, cursor_antes
+
+    # 2. Navegando hacia adelante (posts más antiguos) o primera página
+    queryset = queryset.order_by("-publicado", "-pk")
+    if cursor_despues:
+        publicado, pk = cursor_despues
+        # publicado <= x AND (publicado < x OR id < y) permite usar el índice por rango
+        queryset = (
+            queryset
+            .filter(publicado__lte=publicado)
+            .filter(Q(publicado__lt=publicado) | Q(pk__lt=pk))
+        )
+    return queryset[:por_pagina + 1], cursor_despues, None
+
+
+def armar_pagina(filas, cursor_despues, cursor_antes, por_pagina):
+    hay_mas = len(filas) > por_pagina
+    if cursor_antes:
+        filas = list(reversed(filas[:por_pagina]))
+        return PaginaCursor(
+            filas,
+            cursor_anterior=codificar_cursor(filas[0]) if hay_mas else None,
+            cursor_siguiente=codificar_cursor(filas[-1]) if filas else None,
+        )
+    filas = filas[:por_pagina]
+    return PaginaCursor(
+        filas,
+        cursor_anterior=codificar_cursor(filas[0]) if cursor_despues and filas else None,
+        cursor_siguiente=codificar_cursor(filas[-1]) if hay_mas else None,
+    )
+
+
+# PAGINADOR CON CONTEO CACHEADO
+
+'''El Paginator de Django hace un COUNT(*) en cada request y el template recorría
+paginator.page_range entero para mostrar cinco enlaces. PaginadorCacheado guarda el
+conteo en el cache (una entrada por consulta: filtros, sin el orden) y lo invalida
+con una versión por modelo que cambian las señales al guardar o borrar filas.
+En MySQL, si PAGINACION_ESTIMAR_DESDE está configurado, las listas sin filtros de
+tablas muy grandes usan la estadística de information_schema en lugar del COUNT(*).'''
+
+CONTEO_TIMEOUT = 60 * 60
+PAGINAS_A_CADA_LADO = 2
+
+
+def clave_version_conteo(modelo):
+    return f"conteos:version:{modelo._meta.label_lower}"
+
+
+def invalidar_conteos(modelo):
+    cache.set(clave_version_conteo(modelo), time.time_ns(), None)
+
+
+def clave_conteo(queryset, version):
+    sql, parametros = queryset.query.sql_with_params()
+    firma = hashlib.md5(f"{queryset.db}|{sql}|{parametros!r}".encode()).hexdigest()
+    return f"conteos:{firma}:{version}"
+
+
+def debe_estimar(queryset):
+    return (
+        getattr(settings, "PAGINACION_ESTIMAR_DESDE", None) is not None
+        and not queryset.query.where
+        and not queryset.query.distinct
+    )
+
+
+def estimar_filas(queryset):
+    '''Filas aproximadas de la tabla según las estadísticas de MySQL (o None)'''
+    connection = connections[queryset.db]
+    if connection.vendor != "mysql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [queryset.model._meta.db_table],
+        )
+        fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+
+class PaginadorCacheado(Paginator):
+    """
+    Paginator con el conteo cacheado y una ventana de páginas visibles.
+    Los object_list que no son QuerySet (p. ej. resultados de búsqueda) se cuentan
+    como siempre.
+    """
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+
+        # El orden no cambia el conteo: todas las variantes comparten la entrada
+        queryset = self.object_list.order_by()
+        from .cache import obtener_versiones
+        clave = clave_conteo(queryset, obtener_versiones([clave_version_conteo(queryset.model)])[0])
+        total = cache.get(clave)
+        if total is None:
+            total = self.estimar(queryset)
+            if total is None:
+                total = queryset.count()
+            cache.set(clave, total, CONTEO_TIMEOUT)
+        return total
+
+    async def acontar(self):
+        '''Calcula count con el ORM asíncrono (vistas async); después se usa como siempre'''
+        if "count" in self.__dict__ or not isinstance(self.object_list, QuerySet):
+            return self.count
+        queryset = self.object_list.order_by()
+        from .cache import aobtener_versiones
+        version, = await aobtener_versiones([clave_version_conteo(queryset.model)])
+        clave = clave_conteo(queryset, version)
+        total = await cache.aget(clave)
+        if total is None:
+            total = await sync_to_async(self.estimar)(queryset) if debe_estimar(queryset) else None
+            if total is None:
+                total = await queryset.acount()
+            await cache.aset(clave, total, CONTEO_TIMEOUT)
+        self.__dict__["count"] = total
+        return total
+
+    async def apagina(self, numero):
+        '''page() para las vistas async: cuenta y trae las filas con el ORM asíncrono.
+        Como en ListView, "last" es la última página; un número inválido da InvalidPage'''
+        await self.acontar()
+        numero = self.num_pages if numero == "last" else self.validate_number(numero)
+        inicio = (numero - 1) * self.per_page
+        fin = inicio + self.per_page
+        if fin + self.orphans >= self.count:
+            fin = self.count
+        if isinstance(self.object_list, QuerySet):
+            objetos = [fila async for fila in self.object_list[inicio:fin]]
+        else:
+            objetos = await self.object_list.apagina(inicio, fin)
+        return self._get_page(objetos, numero, self)
+
+    def estimar(self, queryset):
+        if not debe_estimar(queryset):
+            return None
+        estimado = estimar_filas(queryset)
+        # Con pocas filas el COUNT(*) es barato y exacto
+        return estimado if estimado is not None and estimado >= settings.PAGINACION_ESTIMAR_DESDE else None
+
+    def ventana(self, numero, lados=PAGINAS_A_CADA_LADO):
+        '''Números de página alrededor de la actual (sin recorrer page_range)'''
+        desde = max(1, numero - lados)
+        hasta = min(self.num_pages, numero + lados)
+        return range(desde, hasta + 1)
@@ -0,0 +1,156 @@
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .busqueda import calcular_idf, consulta_entradas, frecuencias_de, total_posts_indexados
+
+
+# POSTS RELACIONADOS (PRECALCULADOS)
+
+'''Al final del detalle de un post se muestran los RELACIONADOS_POR_POST más
+parecidos. El parecido es el coseno entre los vectores TF-IDF de los posts, armados
+con el índice de búsqueda (TerminoBusqueda ya tiene el peso de cada término en el
+título, subtítulo y texto; el IDF es el mismo de la búsqueda).
+Se calcula en la cola cada vez que se reindexa un post y se guarda en
+PostRelacionado: el detalle lo lee con una consulta por el índice (post, -puntaje).
+Actualización incremental: el post guardado recalcula su lista y, como el parecido
+es simétrico, entra (o sale) de las listas de los posts que encontró. Una lista que
+perdió una entrada porque el post editado dejó de parecerse queda más corta hasta que
+ese post se guarde de nuevo o se corra "manage.py recalcular_relacionados".'''
+
+RELACIONADOS_POR_POST = 5
+# Términos del post (los de más peso) con los que se buscan candidatos
+TERMINOS_POR_POST = 20
+# Candidatos a los que se les calcula el coseno exacto
+CANDIDATOS = 50
+
+
+def vectores(pks):
+    '''{pk: {termino: peso}} desde el índice de búsqueda (solo posts activos)'''
+    from .models import TerminoBusqueda
+    resultado = defaultdict(dict)
+    filas = TerminoBusqueda.objects.filter(post_id__in=pks).values_list("post_id", "termino", "peso")
+    for post_id, termino, peso in filas:
+        resultado[post_id][termino] = peso
+    return resultado
+
+
+def norma(vector):
+    return math.sqrt(sum(valor * valor for valor in vector.values()))
+
+
+def similares(pk):
+    '''[(puntaje, pk)] de los posts más parecidos, de mayor a menor'''
+    vector = vectores([pk]).get(pk)
+    if not vector:
+        return []
+    total = total_posts_indexados()
+
+    # 1. Candidatos: los que comparten los términos principales del post, leyendo solo
+    # las entradas de mayor peso de cada término (como la búsqueda)
+    idf = calcular_idf(total, frecuencias_de(list(vector)))
+    ponderado = {termino: peso * idf[termino] for termino, peso in vector.items() if termino in idf}
+    parcial = Counter()
+    for termino in sorted(ponderado, key=ponderado.get, reverse=True)[:TERMINOS_POR_POST]:
+        for otro, peso in consulta_entradas(termino):
+            if otro != pk:
+                parcial[otro] += ponderado[termino] * peso * idf[termino]
+    otros = vectores([otro for otro, _ in parcial.most_common(CANDIDATOS)])
+
+    # 2. Coseno exacto con los vectores completos de los candidatos
+    terminos = set(vector).union(*otros.values())
+    idf = calcular_idf(total, frecuencias_de(list(terminos)))
+
+    def ponderar(valores):
+        return {termino: peso * idf[termino] for termino, peso in valores.items() if termino in idf}
+
+    propio = ponderar(vector)
+    norma_propia = norma(propio)
+    puntajes = []
+    for otro, valores in otros.items():
+        ajeno = ponderar(valores)
+        producto = sum(peso * ajeno[termino] for termino, peso in propio.items() if termino in ajeno)
+        if producto:
+            puntajes.append((producto / (norma_propia * norma(ajeno)), otro))
+    return sorted(puntajes, key=lambda fila: (-fila[0], fila[1]))
+
+
+def relacionar(pk, reciprocos=True):
+    '''Recalcula la lista del post y, si reciprocos, su lugar en las listas de los demás.
+    Devuelve los pks de los posts cuya lista pudo cambiar (para invalidar su detalle).'''
+    from .models import PostRelacionado
+    parecidos = similares(pk)
+    afectados = {pk}
+    with transaction.atomic():
+        if reciprocos:
+            # Los que lo tenían en su lista (puede haber cambiado su título o su estado)
+            afectados.update(PostRelacionado.objects.filter(relacionado_id=pk).values_list("post_id", flat=True))
+        filtro = Q(post_id=pk) | Q(relacionado_id=pk) if reciprocos else Q(post_id=pk)
+        PostRelacionado.objects.filter(filtro).delete()
+        nuevas = [
+            PostRelacionado(post_id=pk, relacionado_id=otro, puntaje=puntaje)
+            for puntaje, otro in parecidos[:RELACIONADOS_POR_POST]
+        ]
+        if reciprocos and parecidos:
+            otras = reciprocas(pk, parecidos)
+            afectados.update(fila.post_id for fila in otras)
+            nuevas += otras
+        PostRelacionado.objects.bulk_create(nuevas)
+    return afectados
+
+
+def reciprocas(pk, parecidos):
+    '''Filas (otro → pk) para los posts en cuya lista entra pk; borra las que desplaza'''
+    from .models import PostRelacionado
+    listas = defaultdict(list)
+    filas = PostRelacionado.objects.filter(post_id__in=[otro for _, otro in parecidos])
+    for fila in filas.only("pk", "post_id", "puntaje"):
+        listas[fila.post_id].append(fila)
+
+    nuevas = []
+    desplazadas = []
+    for puntaje, otro in parecidos:
+        lista = sorted(listas[otro], key=lambda fila: -fila.puntaje)
+        if len(lista) < RELACIONADOS_POR_POST:
+            nuevas.append(PostRelacionado(post_id=otro, relacionado_id=pk, puntaje=puntaje))
+        elif puntaje > lista[-1].puntaje:
+            nuevas.append(PostRelacionado(post_id=otro, relacionado_id=pk, puntaje=puntaje))
+            desplazadas.append(lista[-1].pk)
+    PostRelacionado.objects.filter(pk__in=desplazadas).delete()
+    return nuevas
+
+
+def relacionados_de(pk):
+    '''Consulta (perezosa) de los relacionados de un post, con el índice (post, -puntaje)'''
+    from .models import PostRelacionado
+    return (
+        PostRelacionado.objects
+        .filter(post_id=pk, relacionado__activo=True)
+        .select_related("relacionado")
+        .only("relacionado__titulo", "relacionado__extracto")
+        .order_by("-puntaje")[:RELACIONADOS_POR_POST]
+    )
+
+
+def recalcular_todos():
+    '''Reconstruye todas las listas (después de reindexar_todo o de una importación)'''
+    from .models import Post, PostRelacionado
+    PostRelacionado.objects.all().delete()
+    total = 0
+    for pk in Post.objects.filter(activo=True).order_by("pk").values_list("pk", flat=True).iterator():
+        # Cada post arma su propia lista: no hace falta tocar las de los demás
+        relacionar(pk, reciprocos=False)
+        total += 1
+    return total
+
+
+# TAREAS (se ejecutan en la cola, fuera del request)
+
+
+def actualizar_relacionados(pk):
+    '''Tarea de la cola: la encola indexar_post_por_id cuando el post ya está indexado'''
+    from .cache import invalidar_posts
+    # Solo el detalle de los posts cuya lista cambió
+    invalidar_posts(relacionar(pk))
@@ -0,0 +1,242 @@
+import asyncio
+import itertools
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario
+from apps.usuarios.roles import GRUPO_COLABORADOR, GRUPO_MIEMBRO
+from .intercambio import Importador
+from .models import Categoria, Post
+
+
+# DATOS SINTÉTICOS Y MEDICIÓN DE LAS VISTAS
+
+'''sembrar() genera usuarios, categorías, posts y comentarios con una semilla fija
+(mismos datos en cada corrida) usando el Importador de intercambio.py, así que los
+datos quedan igual que en producción: extracto, índice de búsqueda y contadores.
+medir_vistas() pide cada página con el cliente de pruebas de Django y devuelve
+tiempos y cantidad de consultas, listos para guardar como JSON y comparar entre commits.
+carga_wsgi() y carga_asgi() piden las páginas públicas en paralelo (hilos contra
+corrutinas) para comparar las vistas sync y async bajo concurrencia.'''
+
+PREFIJO = "bench"
+
+PALABRAS = (
+    "fe esperanza amor iglesia comunidad oracion evangelio bautismo misa retiro jovenes "
+    "familia servicio caridad encuentro palabra vida camino paz alegria perdon gracia "
+    "reflexion mision catequesis parroquia celebracion pascua adviento cuaresma espiritu"
+).split()
+
+
+# Distribución de Zipf: pocas palabras muy comunes y muchas raras
+ACUMULADOS = list(itertools.accumulate(1 / (i + 1) for i in range(len(PALABRAS))))
+
+
+def texto(azar, cantidad):
+    return " ".join(azar.choices(PALABRAS, cum_weights=ACUMULADOS, k=cantidad))
+
+
+def sembrar(usuarios=50, categorias=10, posts=1000, comentarios=3000, semilla=42, tamanio_lote=1000):
+    """
+    Crea los datos y devuelve un dict con los objetos que usa la medición:
+    un colaborador, un miembro, el post más comentado y una categoría.
+    """
+    azar = random.Random(semilla)
+    colaboradores_grupo, _ = Group.objects.get_or_create(name=GRUPO_COLABORADOR)
+    miembros_grupo, _ = Group.objects.get_or_create(name=GRUPO_MIEMBRO)
+
+    # 1. Usuarios: el 10 % son colaboradores (los autores de los posts)
+    Usuario.objects.bulk_create(
+        [Usuario(username=f"{PREFIJO}_{i}", password="!", nombre=f"Nombre {i}", apellido="Prueba")
+         for i in range(usuarios)],
+        batch_size=tamanio_lote, ignore_conflicts=True,
+    )
+    creados = list(Usuario.objects.filter(username__startswith=f"{PREFIJO}_").values_list("pk", "username"))
+    cantidad_autores = max(1, len(creados) // 10)
+    autores = [username for _, username in creados[:cantidad_autores]]
+    Usuario.groups.through.objects.bulk_create(
+        [Usuario.groups.through(usuario_id=pk, group_id=(colaboradores_grupo if i < cantidad_autores else miembros_grupo).pk)
+         for i, (pk, _) in enumerate(creados)],
+        batch_size=tamanio_lote, ignore_conflicts=True,
+    )
+
+    # 2. Contenido, con los mismos pasos que una importación
+    importador = Importador(tamanio_lote)
+    nombres = [f"Categoría {i}" for i in range(categorias)]
+    for nombre in nombres:
+        importador.agregar("categoria", {"nombre": nombre})
+    ahora = timezone.now()
+    for i in range(posts):
+        importador.agregar("post", {
+            "id": i,
+            "titulo": texto(azar, 5).capitalize(),
+            "subtitulo": texto(azar, 8),
+            "texto": texto(azar, 200),
+            "publicado": (ahora - timedelta(minutes=azar.randint(0, 3 * 365 * 24 * 60))).isoformat(),
+            "activo": azar.random() > 0.05,
+            "categoria": azar.choice(nombres),
+            "autor": azar.choice(autores),
+        })
+    # Los comentarios se concentran en pocos posts (como en un blog real);
+    # el post 0 es el más comentado
+    for _ in range(comentarios):
+        importador.agregar("comentario", {
+            "post": min(int(azar.paretovariate(1.2)) - 1, posts - 1),
+            "autor": azar.choice(creados)[1],
+            "contenido": texto(azar, 30),
+        })
+    importador.terminar()
+
+    return {
+        "colaborador": Usuario.objects.get(username=autores[0]),
+        "miembro": Usuario.objects.get(username=creados[-1][1]),
+        "post": Post.objects.get(pk=importador.ids_posts["0"]),
+        "categoria": Categoria.objects.get(nombre=nombres[0]),
+    }
+
+
+def medir(cliente, url, repeticiones, metodo="get", datos=None):
+    """
+    - frio: primer pedido con el cache vacío.
+    - p50/p95: pedidos siguientes (con cache, si la vista lo usa).
+    """
+    def pedir():
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            respuesta = getattr(cliente, metodo)(url, datos)
+            milisegundos = (time.perf_counter() - inicio) * 1000
+        return respuesta.status_code, milisegundos, len(consultas)
+
+    cache.clear()
+    estado, frio_ms, frio_consultas = pedir()
+    tiempos = []
+    for _ in range(repeticiones):
+        estado, milisegundos, consultas = pedir()
+        tiempos.append(milisegundos)
+    tiempos.sort()
+    return {
+        "url": url,
+        "estado": estado,
+        "frio_ms": round(frio_ms, 2),
+        "frio_consultas": frio_consultas,
+        "p50_ms": round(statistics.median(tiempos), 2),
+        "p95_ms": round(tiempos[max(0, int(len(tiempos) * 0.95) - 1)], 2),
+        "consultas": consultas,
+    }
+
+
+def medir_vistas(datos, repeticiones=20):
+    '''Mide las vistas públicas y de administración; devuelve {nombre: resultado}'''
+    anonimo = Client()
+    colaborador = Client()
+    colaborador.force_login(datos["colaborador"])
+    miembro = Client()
+    miembro.force_login(datos["miembro"])
+
+    detalle = reverse("posts:detalle_post", kwargs={"pk": datos["post"].pk})
+    categoria = reverse("posts:posts_por_categoria", kwargs={"pk": datos["categoria"].pk})
+    return {
+        "home": medir(anonimo, reverse("index"), repeticiones),
+        "home_autenticado": medir(miembro, reverse("index"), repeticiones),
+        "detalle_post": medir(anonimo, detalle, repeticiones),
+        "detalle_post_autenticado": medir(miembro, detalle, repeticiones),
+        "posts_por_categoria": medir(anonimo, categoria, repeticiones),
+        "posts_por_categoria_pagina_2": medir(anonimo, f"{categoria}?page=2", repeticiones),
+        "lista_posts": medir(colaborador, reverse("posts:lista_posts"), repeticiones),
+        "lista_usuarios": medir(colaborador, reverse("usuarios:lista_usuarios"), repeticiones),
+        "crear_comentario": medir(
+            miembro, reverse("posts:agregar_comentario", kwargs={"pk_post": datos["post"].pk}),
+            repeticiones, metodo="post", datos={"contenido": "Comentario de prueba"},
+        ),
+    }
+
+
+# CARGA CONCURRENTE: WSGI (HILOS) CONTRA ASGI (CORRUTINAS)
+
+
+def urls_publicas():
+    '''Las páginas públicas de lectura, armadas con los datos que ya hay en la base'''
+    post = Post.objects.filter(activo=True).order_by("-num_comentarios", "pk").first()
+    categoria = Categoria.objects.order_by("-num_posts", "pk").first()
+    if post is None or categoria is None:
+        return {}
+    return {
+        "home": reverse("index"),
+        "detalle_post": reverse("posts:detalle_post", kwargs={"pk": post.pk}),
+        "posts_por_categoria": reverse("posts:posts_por_categoria", kwargs={"pk": categoria.pk}),
+        "buscar": reverse("posts:buscar") + "?q=" + post.titulo.split()[0],
+    }
+
+
+def url_de_pedido(url, numero, con_cache):
+    # Un parámetro distinto por pedido evita el cache de páginas de los anónimos
+    if con_cache:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}_n={numero}"
+
+
+def resumir(resultados, total_s):
+    tiempos = sorted(ms for _, ms in resultados)
+    return {
+        "pedidos": len(resultados),
+        "errores": sum(1 for estado, _ in resultados if estado != 200),
+        "pedidos_por_s": round(len(resultados) / total_s, 1),
+        "p50_ms": round(statistics.median(tiempos), 2),
+        "p95_ms": round(tiempos[max(0, int(len(tiempos) * 0.95) - 1)], 2),
+        "max_ms": round(tiempos[-1], 2),
+    }
+
+
+def carga_wsgi(url, pedidos, hilos, latencia_cliente=0.0, con_cache=False):
+    """
+    Como un servidor WSGI con `hilos` workers: cada hilo atiende un pedido a la vez y
+    queda ocupado mientras "envía" la respuesta a un cliente lento (latencia_cliente, s).
+    """
+    local = threading.local()
+
+    def pedir(numero):
+        if not hasattr(local, "cliente"):
+            local.cliente = Client()
+        inicio = time.perf_counter()
+        respuesta = local.cliente.get(url_de_pedido(url, numero, con_cache))
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        time.sleep(latencia_cliente)
+        return respuesta.status_code, milisegundos
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(hilos) as pool:
+        resultados = list(pool.map(pedir, range(pedidos)))
+    return resumir(resultados, time.perf_counter() - inicio)
+
+
+async def carga_asgi(url, pedidos, concurrencia, latencia_cliente=0.0, con_cache=False):
+    """
+    Como un proceso ASGI con `concurrencia` conexiones abiertas a la vez: la espera del
+    cliente lento es un asyncio.sleep y no ocupa ningún hilo.
+    """
+    cliente = AsyncClient()
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def pedir(numero):
+        async with semaforo:
+            inicio = time.perf_counter()
+            respuesta = await cliente.get(url_de_pedido(url, numero, con_cache))
+            milisegundos = (time.perf_counter() - inicio) * 1000
+            await asyncio.sleep(latencia_cliente)
+            return respuesta.status_code, milisegundos
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(pedir(numero) for numero in range(pedidos)))
+    return resumir(resultados, time.perf_counter() - inicio)
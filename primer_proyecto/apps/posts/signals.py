@@ -0,0 +1,145 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.tareas.cola import encolar
+from . import almacenamiento
+from .busqueda import indexar_post_por_id
+from . import contadores
+from .cache import invalidar_categorias_menu, invalidar_contenido, invalidar_listados, invalidar_post
+from .imagenes import imagen_subida
+from .models import Categoria, Post, Comentario
+from .paginacion import invalidar_conteos
+from .visitas import invalidar_mas_leidos
+
+
+# CONTADORES DESNORMALIZADOS
+# (van primero: el menú cacheado se vuelve a leer con los valores ya actualizados)
+
+
+@receiver(post_save, sender=Post)
+def post_guardado_contadores(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        contadores.post_guardado(instance, created)
+
+
+@receiver(post_delete, sender=Post)
+def post_eliminado_contadores(sender, instance, **kwargs):
+    contadores.post_eliminado(instance)
+
+
+@receiver(post_save, sender=Comentario)
+def comentario_creado_contadores(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        contadores.sumar(Post, instance.post_id, "num_comentarios", 1)
+
+
+@receiver(post_delete, sender=Comentario)
+def comentario_eliminado_contadores(sender, instance, **kwargs):
+    contadores.sumar(Post, instance.post_id, "num_comentarios", -1)
+
+
+# INVALIDACIÓN DEL MENÚ DE CATEGORÍAS
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=Post)
+def categorias_modificadas(sender, **kwargs):
+    # Cambia un nombre o la cantidad de posts activos de alguna categoría
+    invalidar_categorias_menu()
+
+
+@receiver(post_save, sender=Post)
+def post_guardado_menu(sender, instance, **kwargs):
+    # Solo si el post entró o salió de una categoría (ver contadores.post_guardado)
+    if getattr(instance, "_categorias_cambiadas", True):
+        invalidar_categorias_menu()
+
+
+# INVALIDACIÓN DE PÁGINAS Y FRAGMENTOS CACHEADOS
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def categoria_modificada(sender, **kwargs):
+    # El menú y las tarjetas de todas las páginas muestran categorías
+    invalidar_contenido()
+
+
+@receiver(post_save, sender=Post)
+def post_guardado_paginas(sender, instance, **kwargs):
+    if getattr(instance, "_categorias_cambiadas", True):
+        # El menú de todas las páginas muestra la cantidad de posts de cada categoría
+        invalidar_contenido(post_pk=instance.pk)
+    else:
+        # Un post editado sin cambiar de categoría ni de estado: su detalle y los listados
+        invalidar_listados(post_pk=instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_eliminado_paginas(sender, instance, **kwargs):
+    invalidar_contenido(post_pk=instance.pk)
+
+
+@receiver(post_save, sender=Comentario)
+@receiver(post_delete, sender=Comentario)
+def comentario_modificado(sender, instance, **kwargs):
+    # Solo cambia el detalle del post comentado
+    invalidar_post(instance.post_id)
+
+
+# CONTEOS DE LOS PAGINADORES
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def posts_contados(sender, **kwargs):
+    # Un alta, baja o cambio de categoría/estado cambia el total de algún listado
+    invalidar_conteos(Post)
+
+
+@receiver(post_save, sender=Comentario)
+@receiver(post_delete, sender=Comentario)
+def comentarios_contados(sender, created=True, **kwargs):
+    # Lista de comentarios del admin; una edición no cambia el total
+    if created:
+        invalidar_conteos(Comentario)
+
+
+# RANKING DE MÁS LEÍDOS
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_modificado_mas_leidos(sender, raw=False, **kwargs):
+    # Puede cambiar el título, el estado o la categoría de un post del ranking
+    if not raw:
+        invalidar_mas_leidos()
+
+
+# ÍNDICE DE BÚSQUEDA
+
+
+@receiver(post_save, sender=Post)
+def post_guardado_indexar(sender, instance, raw=False, **kwargs):
+    # Se indexa en la cola; al borrar un post sus términos se borran en cascada
+    if not raw:
+        encolar(indexar_post_por_id, instance.pk)
+
+
+# ARCHIVOS COMPARTIDOS (ALMACENAMIENTO POR CONTENIDO) Y MINIATURAS
+
+
+@receiver(post_save, sender=Post)
+def post_guardado_archivos(sender, instance, raw=False, **kwargs):
+    # Si cambió la imagen, la anterior se borra cuando ya nadie la usa y se
+    # encolan los derivados WebP de la nueva
+    if not raw:
+        for nombre in almacenamiento.archivos_guardados(instance):
+            imagen_subida(nombre)
+
+
+@receiver(post_delete, sender=Post)
+def post_eliminado_archivos(sender, instance, **kwargs):
+    # También cubre los borrados en cascada y por queryset (no pasan por Post.delete)
+    almacenamiento.archivos_eliminados(instance)
@@ -0,0 +1,37 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from apps.posts.imagenes import obtener_derivados
+
+register = template.Library()
+
+
+@register.simple_tag
+def img_responsive(imagen, alt="", clase="", sizes="(max-width: 768px) 100vw, 33vw"):
+    """
+    <img> con srcset de los derivados WebP de la imagen:
+        {% img_responsive post.imagen alt=post.titulo clase="card-img-top" %}
+    Si no hay derivados (imagen inválida) se usa el archivo original.
+    """
+    if not imagen:
+        return ""
+    derivados = obtener_derivados(imagen.name)
+    if not derivados:
+        return format_html(
+            '<img src="{}" class="{}" alt="{}" loading="lazy">', imagen.url, clase, alt
+        )
+    srcset = ", ".join(f"{default_storage.url(nombre)} {ancho}w" for ancho, nombre in derivados)
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" loading="lazy" decoding="async">',
+        default_storage.url(derivados[0][1]), srcset, sizes, clase, alt,
+    )
+
+
+@register.simple_tag
+def url_miniatura(imagen):
+    '''URL del derivado más chico (para avatares y miniaturas de tablas)'''
+    if not imagen:
+        return ""
+    derivados = obtener_derivados(imagen.name)
+    return default_storage.url(derivados[0][1]) if derivados else imagen.url
@@ -0,0 +1,27 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def ventana_paginas(page_obj):
+    """
+    Páginas a mostrar alrededor de la actual:
+    {% ventana_paginas page_obj as paginas %}
+    Con un paginador común se calcula igual, sin recorrer todas las páginas.
+    """
+    paginator = page_obj.paginator
+    if hasattr(paginator, "ventana"):
+        return paginator.ventana(page_obj.number)
+    desde = max(1, page_obj.number - 2)
+    return range(desde, min(paginator.num_pages, page_obj.number + 2) + 1)
+
+
+@register.simple_tag(takes_context=True)
+def parametro_orden(context):
+    """
+    "&orden=<orden_actual>" para los enlaces, o "" si la vista no tiene orden
+    (la búsqueda): {% parametro_orden as orden_param %}
+    """
+    orden = context.get("orden_actual")
+    return f"&orden={orden}" if orden else ""
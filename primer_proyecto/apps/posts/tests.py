@@ -1,3 +1,1432 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from apps.tareas.cola import procesar_pendientes
+from apps.tareas.models import Tarea
+from apps.usuarios.models import Usuario
+from .busqueda import buscar, terminos, total_posts_indexados
+from .cache import CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, clave_version_post, obtener_categorias_menu
+from .imagenes import eliminar_derivados, generar_derivados, nombre_derivado
+from .intercambio import Importador, leer_registros
+from .eliminacion import eliminar_posts, eliminar_usuario
+from .models import Post, Categoria, Comentario, PostRelacionado, TerminoBusqueda, VisitaDiaria
+from .paginacion import PaginadorCacheado
+from .relacionados import relacionados_de
+from . import visitas
+from .visitas import actualizar_mas_leidos, obtener_mas_leidos, volcar_pendientes
+
+# Las imágenes (y sus miniaturas) que generan los tests van a una carpeta temporal
+MEDIA_PRUEBAS = tempfile.mkdtemp()
+
+
+def plan_de(queryset):
+    '''Ejecuta EXPLAIN sobre el SQL del queryset y devuelve las filas del plan'''
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [fila[-1] for fila in cursor.fetchall()]
+        cursor.execute("EXPLAIN " + sql, params)
+        columnas = [columna[0].lower() for columna in cursor.description]
+        return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+
+# ÍNDICES DE LOS LISTADOS PÚBLICOS
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class IndicesListadosTest(TestCase):
+    """
+    Verifica que los listados públicos usan los índices compuestos:
+    sin recorrido completo de la tabla y sin ordenamiento en memoria (filesort).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.categorias = Categoria.objects.bulk_create(
+            [Categoria(nombre=f"Categoría {i}") for i in range(10)]
+        )
+        ahora = timezone.now()
+        Post.objects.bulk_create([
+            Post(
+                titulo=f"Post {i}",
+                texto="texto",
+                autor=autor,
+                categoria=cls.categorias[i % 10],
+                activo=i % 7 != 0,
+                publicado=ahora - timedelta(minutes=i),
+            )
+            for i in range(500)
+        ])
+        cls.post = Post.objects.first()
+        Comentario.objects.bulk_create([
+            Comentario(post_id=post_id, autor=autor, contenido="comentario")
+            for post_id in Post.objects.values_list("pk", flat=True)[:100]
+        ])
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute("ANALYZE TABLE posts_post, posts_comentario")
+
+    def assertUsaIndice(self, queryset):
+        plan = plan_de(queryset)
+        if connection.vendor == "sqlite":
+            for paso in plan:
+                self.assertNotIn("TEMP B-TREE", paso, plan)
+                if paso.startswith("SCAN"):
+                    self.assertIn("INDEX", paso, plan)
+        else:
+            for paso in plan:
+                self.assertNotEqual(paso["type"], "ALL", plan)
+                self.assertNotIn("filesort", paso["extra"] or "", plan)
+
+    def test_inicio(self):
+        self.assertUsaIndice(
+            Post.objects.filter(activo=True).order_by("-publicado", "-pk")[:10]
+        )
+
+    def test_posts_por_categoria_por_fecha(self):
+        self.assertUsaIndice(
+            Post.objects.filter(categoria_id=self.categorias[3].pk, activo=True).order_by("-publicado")[:6]
+        )
+
+    def test_posts_por_categoria_por_titulo(self):
+        self.assertUsaIndice(
+            Post.objects.filter(categoria_id=self.categorias[3].pk, activo=True).order_by("titulo")[:6]
+        )
+
+    def test_comentarios_de_un_post(self):
+        self.assertUsaIndice(
+            Comentario.objects.filter(post=self.post).order_by("-creado")
+        )
+
+
+# DETALLE DEL POST: CANTIDAD DE CONSULTAS
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class DetallePostConsultasTest(TestCase):
+    """
+    La cantidad de consultas del detalle no depende de la cantidad de comentarios
+    ni de cuántos autores distintos comentaron.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        categoria = Categoria.objects.create(nombre="Noticias")
+        cls.post = Post.objects.create(titulo="Post", texto="texto", autor=cls.autor, categoria=categoria)
+        lectores = Usuario.objects.bulk_create(
+            [Usuario(username=f"lector{i}") for i in range(30)]
+        )
+        Comentario.objects.bulk_create([
+            Comentario(post=cls.post, autor=lector, contenido=f"Comentario {i}")
+            for i, lector in enumerate(lectores)
+        ])
+        # bulk_create no pasa por las señales que llevan el contador
+        Post.objects.filter(pk=cls.post.pk).update(num_comentarios=30)
+        cls.url = reverse("posts:detalle_post", kwargs={"pk": cls.post.pk})
+
+    def setUp(self):
+        # Cache caliente: menú de categorías y roles ya resueltos
+        cache.clear()
+        self.client.get(self.url)
+
+    def test_consultas_anonimo(self):
+        cache.clear()
+        obtener_categorias_menu()
+        # post + comentarios + relacionados
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(self.url)
+        self.assertEqual(len(respuesta.context["comentarios"]), 20)
+        self.assertContains(respuesta, "lector29")
+        # La segunda visita anónima sale entera del cache
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_cache_anonimo_invalidado_por_comentario(self):
+        Comentario.objects.create(post=self.post, autor=self.autor, contenido="Comentario nuevo")
+        self.assertContains(self.client.get(self.url), "Comentario nuevo")
+
+    def test_consultas_autenticado(self):
+        self.client.force_login(self.autor)
+        self.client.get(self.url)
+        # sesión + usuario + post + comentarios (rol, menú y relacionados salen del cache)
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+    def test_segunda_pagina_de_comentarios(self):
+        respuesta = self.client.get(self.url, {"comentarios": 2})
+        self.assertEqual(len(respuesta.context["comentarios"]), 10)
+        self.assertEqual(respuesta.context["comentarios_pagina_anterior"], 1)
+        self.assertIsNone(respuesta.context["comentarios_pagina_siguiente"])
+
+    def test_pagina_de_comentarios_fuera_de_rango(self):
+        for pagina in ("99999999999999999999", "3", "-1", "x"):
+            respuesta = self.client.get(self.url, {"comentarios": pagina})
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertIsNone(respuesta.context["comentarios_pagina_anterior"])
+            self.assertEqual(respuesta.context["comentarios_pagina_siguiente"], 2)
+
+
+# CACHE DE PÁGINAS PARA ANÓNIMOS
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class CacheAnonimoTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autora", password="clave")
+        cls.categoria = Categoria.objects.create(nombre="Noticias")
+        cls.post = Post.objects.create(titulo="Primero", texto="Retiro de jóvenes", autor=cls.autor, categoria=cls.categoria)
+        cls.otro = Post.objects.create(titulo="Segundo", texto="Misa del domingo", autor=cls.autor, categoria=cls.categoria)
+
+    def setUp(self):
+        cache.clear()
+        # Portada cacheada por una visita anónima
+        self.assertContains(self.client.get(reverse("index")), "sos nuevo?")
+
+    def test_autenticado_ve_su_saludo(self):
+        self.client.force_login(self.autor)
+        respuesta = self.client.get(reverse("index"))
+        self.assertContains(respuesta, "Hola <strong>autora</strong>")
+        self.assertNotContains(respuesta, "sos nuevo?")
+
+    def test_mensajes_flash_sin_cache(self):
+        datos = {"nombre": "Ana", "correo": "ana@ejemplo.com", "asunto": "Hola", "mensaje": "Consulta"}
+        respuesta = self.client.post(reverse("contacto"), datos, follow=True)
+        self.assertContains(respuesta, "Gracias por contactarnos")
+        # La página con el mensaje no quedó en el cache
+        self.assertNotContains(self.client.get(reverse("index")), "Gracias por contactarnos")
+
+    def test_portada_invalidada_por_post_nuevo_y_editado(self):
+        Post.objects.create(titulo="Novedad", texto="texto", autor=self.autor, categoria=self.categoria)
+        self.assertContains(self.client.get(reverse("index")), "Novedad")
+        post = Post.objects.get(pk=self.post.pk)
+        post.titulo = "Primero corregido"
+        post.save()
+        self.assertContains(self.client.get(reverse("index")), "Primero corregido")
+
+    def test_editar_un_post_no_invalida_el_detalle_de_otro(self):
+        url = reverse("posts:detalle_post", kwargs={"pk": self.otro.pk})
+        self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.titulo = "Primero corregido"
+        post.save()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        # Si el post cambia de categoría cambia el menú de todas las páginas
+        post.categoria = Categoria.objects.create(nombre="Agenda")
+        post.save()
+        # post + comentarios + menú (los relacionados siguen en el cache)
+        with self.assertNumQueries(3):
+            self.assertContains(self.client.get(url), "Agenda")
+
+    def test_chequeo_de_cache_compartido(self):
+        from .checks import cache_compartido
+        self.assertEqual([aviso.id for aviso in cache_compartido(None)], ["posts.W001"])
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(cache_compartido(None), [])
+
+
+# MENÚ DE CATEGORÍAS CACHEADO
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class CategoriasMenuTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.categoria = Categoria.objects.create(nombre="Eventos")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sin_consultas_con_cache_caliente(self):
+        obtener_categorias_menu()
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_categorias_menu()[0]["nombre"], "Eventos")
+
+    def test_invalidado_al_cambiar_categorias_y_posts(self):
+        self.assertEqual(obtener_categorias_menu()[0]["num_posts"], 0)
+        Post.objects.create(titulo="Post", texto="texto", autor=self.autor, categoria=self.categoria)
+        Post.objects.create(titulo="Oculto", texto="texto", autor=self.autor, categoria=self.categoria, activo=False)
+        self.assertEqual(obtener_categorias_menu()[0]["num_posts"], 1)
+        Categoria.objects.create(nombre="Avisos")
+        self.assertEqual([c["nombre"] for c in obtener_categorias_menu()], ["Avisos", "Eventos"])
+
+
+# BÚSQUEDA
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class BusquedaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.en_titulo = Post.objects.create(titulo="Oraciones de la mañana", texto="Un texto cualquiera", autor=autor)
+        cls.en_texto = Post.objects.create(titulo="Reflexión", texto="Hablamos de la oración diaria", autor=autor)
+        cls.inactivo = Post.objects.create(titulo="Oración", texto="borrador", autor=autor, activo=False)
+        Post.objects.create(titulo="Eventos", texto="Nada que ver", autor=autor)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_raiz_y_acentos(self):
+        self.assertEqual(terminos("Oraciones"), terminos("oración"))
+        self.assertEqual(terminos("MAÑANA"), terminos("mañanas"))
+
+    def test_ranking_y_posts_inactivos(self):
+        resultados = buscar("oracion")
+        self.assertEqual([post.pk for post in resultados[:10]], [self.en_titulo.pk, self.en_texto.pk])
+
+    def test_indice_actualizado_al_editar(self):
+        self.en_texto.texto = "Ya no habla de eso"
+        self.en_texto.save()
+        self.assertEqual([post.pk for post in buscar("oración")[:10]], [self.en_titulo.pk])
+
+    def test_total_indexados_guardado_por_las_tareas(self):
+        buscar("oracion")
+        with self.assertNumQueries(0):
+            self.assertEqual(total_posts_indexados(), 3)
+        # Lo actualiza la tarea de indexación, sin esperar ningún vencimiento
+        self.inactivo.activo = True
+        self.inactivo.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(total_posts_indexados(), 4)
+
+    def test_vista(self):
+        respuesta = self.client.get(reverse("posts:buscar"), {"q": "Oración"})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, "Oraciones de la mañana")
+        self.assertNotContains(respuesta, "Eventos</h5>")
+
+
+# MINIATURAS DE IMÁGENES
+
+
+def imagen_png(ancho, alto):
+    from PIL import Image
+    buffer = BytesIO()
+    Image.new("RGB", (ancho, alto), "orange").save(buffer, "PNG")
+    return SimpleUploadedFile("captura.png", buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True, MEDIA_GRACIA_HUERFANOS=0)
+class MiniaturasTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        autor = Usuario.objects.create_user(username="autor", password="clave")
+        self.post = Post.objects.create(titulo="Post", texto="texto", autor=autor, imagen=imagen_png(800, 600))
+
+    def test_derivados_generados_al_subir(self):
+        nombre = self.post.imagen.name
+        # No se agranda: 800px de ancho → 320 y 640, pero no 1024
+        self.assertTrue(default_storage.exists(nombre_derivado(nombre, 320)))
+        self.assertTrue(default_storage.exists(nombre_derivado(nombre, 640)))
+        self.assertFalse(default_storage.exists(nombre_derivado(nombre, 1024)))
+
+    def test_srcset(self):
+        html = Template("{% load imagenes %}{% img_responsive post.imagen %}").render(Context({"post": self.post}))
+        self.assertIn("320w", html)
+        self.assertIn("640w", html)
+        self.assertIn(".webp", html)
+
+    def test_el_render_no_encola_tareas(self):
+        # Derivados generados por otro proceso: se encuentran en el almacenamiento
+        cache.clear()
+        template = Template("{% load imagenes %}{% img_responsive post.imagen %}")
+        with override_settings(TAREAS_SINCRONO=False):
+            self.assertIn("320w", template.render(Context({"post": self.post})))
+            # Sin derivados (todavía) se usa el original, sin encolar nada
+            otro = Post.objects.create(titulo="Otro", texto="texto", autor=self.post.autor, imagen=imagen_png(700, 500))
+            Tarea.objects.all().delete()
+            html = template.render(Context({"post": otro}))
+        self.assertIn(otro.imagen.url, html)
+        self.assertNotIn("srcset", html)
+        self.assertFalse(Tarea.objects.exists())
+
+    def test_se_encola_solo_si_cambia_la_imagen(self):
+        post = Post.objects.get(pk=self.post.pk)
+        with override_settings(TAREAS_SINCRONO=False):
+            post.titulo = "Otro título"
+            post.save()
+            self.assertFalse(Tarea.objects.filter(funcion__endswith="procesar_imagen").exists())
+            post.imagen = imagen_png(900, 500)
+            post.save()
+            self.assertTrue(Tarea.objects.filter(funcion__endswith="procesar_imagen", argumentos=[post.imagen.name]).exists())
+
+    def test_derivados_nuevos_invalidan_solo_las_paginas_con_la_imagen(self):
+        otro = Post.objects.create(titulo="Otro", texto="texto", autor=self.post.autor, imagen=imagen_png(660, 440))
+        versiones = [CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, clave_version_post(self.post.pk), clave_version_post(otro.pk)]
+        cache.set_many(dict.fromkeys(versiones, 1), None)
+        eliminar_derivados(self.post.imagen.name)
+        generar_derivados(self.post.imagen.name)
+        self.assertEqual(
+            [cache.get(clave) == 1 for clave in versiones], [True, False, False, True],
+        )
+
+    def test_misma_base_con_distinta_extension(self):
+        png = default_storage.save("posts/foto.png", imagen_png(400, 300))
+        jpg = default_storage.save("posts/foto.jpg", imagen_png(500, 300))
+        generar_derivados(png)
+        generar_derivados(jpg)
+        self.assertNotEqual(nombre_derivado(png, 320), nombre_derivado(jpg, 320))
+        eliminar_derivados(png)
+        self.assertFalse(default_storage.exists(nombre_derivado(png, 320)))
+        self.assertTrue(default_storage.exists(nombre_derivado(jpg, 320)))
+
+    def test_derivados_eliminados_con_el_post(self):
+        nombre = self.post.imagen.name
+        self.post.delete()
+        self.assertFalse(default_storage.exists(nombre_derivado(nombre, 320)))
+        self.assertFalse(default_storage.exists(nombre))
+
+
+# ALMACENAMIENTO POR CONTENIDO
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True, MEDIA_GRACIA_HUERFANOS=0)
+class AlmacenamientoPorContenidoTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.autor = Usuario.objects.create_user(username="autor", password="clave")
+
+    def crear_post(self, imagen=None):
+        return Post.objects.create(titulo="Post", texto="texto", autor=self.autor, imagen=imagen or imagen_png(400, 300))
+
+    def test_misma_imagen_un_solo_archivo(self):
+        primero, segundo = self.crear_post(), self.crear_post()
+        self.assertEqual(primero.imagen.name, segundo.imagen.name)
+        self.assertRegex(primero.imagen.name, r"^posts/[0-9a-f]{2}/[0-9a-f]{64}\.png$")
+        _, archivos = default_storage.listdir(primero.imagen.name.rsplit("/", 1)[0])
+        self.assertEqual(archivos.count(primero.imagen.name.rsplit("/", 1)[1]), 1)
+
+    def test_archivo_compartido_se_borra_con_la_ultima_fila(self):
+        primero, segundo = self.crear_post(), self.crear_post()
+        nombre = primero.imagen.name
+        primero.delete()
+        self.assertTrue(default_storage.exists(nombre))
+        Post.objects.filter(pk=segundo.pk).delete()
+        self.assertFalse(default_storage.exists(nombre))
+        self.assertFalse(default_storage.exists(nombre_derivado(nombre, 320)))
+
+    def test_cambiar_imagen_libera_la_anterior(self):
+        post = Post.objects.get(pk=self.crear_post().pk)
+        anterior = post.imagen.name
+        post.imagen = imagen_png(500, 300)
+        post.save()
+        self.assertNotEqual(post.imagen.name, anterior)
+        self.assertFalse(default_storage.exists(anterior))
+        self.assertTrue(default_storage.exists(post.imagen.name))
+
+    def test_reutilizar_un_archivo_lo_protege_de_un_borrado_en_curso(self):
+        primero = self.crear_post()
+        nombre = primero.imagen.name
+        hace_una_hora = time.time() - 3600
+        os.utime(default_storage.path(nombre), (hace_una_hora, hace_una_hora))
+        # Otra subida de la misma imagen, todavía sin fila confirmada, renueva la fecha
+        self.assertEqual(primero.imagen.storage.save("posts/otra.png", imagen_png(400, 300)), nombre)
+        self.assertGreater(default_storage.get_modified_time(nombre), timezone.now() - timedelta(minutes=1))
+        with override_settings(MEDIA_GRACIA_HUERFANOS=600):
+            Post.objects.filter(pk=primero.pk).delete()
+        self.assertTrue(default_storage.exists(nombre))
+
+    def test_imagen_por_defecto_no_se_borra(self):
+        por_defecto = Post._meta.get_field("imagen").default
+        default_storage.save(por_defecto, imagen_png(10, 10))
+        post = Post.objects.create(titulo="Post", texto="texto", autor=self.autor)
+        self.assertEqual(post.imagen.name, por_defecto)
+        post.delete()
+        self.assertTrue(default_storage.exists(por_defecto))
+
+    def test_deduplicar_media_existente(self):
+        primero, segundo = self.crear_post(), self.crear_post()
+        # Dos copias con nombres de antes del almacenamiento por contenido
+        for post, viejo in ((primero, "posts/foto.png"), (segundo, "posts/foto_copia.png")):
+            with default_storage.open(post.imagen.name) as archivo:
+                FileSystemStorage(location=MEDIA_PRUEBAS).save(viejo, archivo)
+            Post.objects.filter(pk=post.pk).update(imagen=viejo)
+        call_command("deduplicar_media", stdout=StringIO())
+        primero.refresh_from_db()
+        segundo.refresh_from_db()
+        self.assertEqual(primero.imagen.name, segundo.imagen.name)
+        self.assertTrue(default_storage.exists(primero.imagen.name))
+        self.assertFalse(default_storage.exists("posts/foto.png"))
+        self.assertFalse(default_storage.exists("posts/foto_copia.png"))
+
+
+# BORRADOS POR LOTES Y LIMPIEZA DE MEDIA
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True, MEDIA_GRACIA_HUERFANOS=0)
+class EliminacionPorLotesTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.autor = Usuario.objects.create_user(username="autor", password="clave")
+        self.otro = Usuario.objects.create_user(username="otro", password="clave")
+        self.categoria = Categoria.objects.create(nombre="Noticias")
+        self.posts = [
+            Post.objects.create(
+                titulo=f"Post {i}", texto="texto", autor=self.autor, categoria=self.categoria,
+                imagen=imagen_png(300 + i, 200),
+            )
+            for i in range(5)
+        ]
+        self.ajeno = Post.objects.create(titulo="Ajeno", texto="texto", autor=self.otro, categoria=self.categoria)
+        for post in self.posts:
+            Comentario.objects.create(post=post, autor=self.otro, contenido="Comentario")
+        for _ in range(3):
+            Comentario.objects.create(post=self.ajeno, autor=self.autor, contenido="Comentario")
+
+    def test_eliminar_usuario_por_lotes(self):
+        imagenes = [post.imagen.name for post in self.posts]
+        self.assertEqual(eliminar_usuario(self.autor, tamanio_lote=2), (5, 3))
+
+        self.assertFalse(Usuario.objects.filter(pk=self.autor.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.ajeno])
+        self.assertEqual(Comentario.objects.count(), 0)
+        self.assertFalse(TerminoBusqueda.objects.exclude(post=self.ajeno).exists())
+        # Contadores que antes ajustaban las señales
+        self.ajeno.refresh_from_db()
+        self.categoria.refresh_from_db()
+        self.assertEqual(self.ajeno.num_comentarios, 0)
+        self.assertEqual(self.categoria.num_posts, 1)
+        for nombre in imagenes:
+            self.assertFalse(default_storage.exists(nombre))
+
+    def test_un_delete_por_tabla_y_lote(self):
+        with CaptureQueriesContext(connection) as pocos:
+            eliminar_posts(Post.objects.filter(pk__in=[post.pk for post in self.posts[:2]]), tamanio_lote=10)
+        with CaptureQueriesContext(connection) as muchos:
+            eliminar_posts(Post.objects.filter(autor=self.autor), tamanio_lote=10)
+        borrados = [
+            sum(q["sql"].startswith("DELETE") for q in consultas.captured_queries)
+            for consultas in (pocos, muchos)
+        ]
+        # Uno por tabla dependiente (PostRelacionado apunta dos veces a Post) sin importar cuántas filas
+        self.assertEqual(borrados, [6, 6])
+
+    def test_vista_eliminar_usuario(self):
+        admin = Usuario.objects.create_superuser(username="admin", password="clave")
+        self.client.force_login(admin)
+        respuesta = self.client.post(reverse("usuarios:eliminar_usuario", kwargs={"pk": self.autor.pk}), follow=True)
+        self.assertContains(respuesta, "5 posts y 3 comentarios")
+        self.assertFalse(Post.objects.filter(autor_id=self.autor.pk).exists())
+
+    def test_limpiar_media(self):
+        referenciado = self.posts[0].imagen.name
+        huerfano = default_storage.save("posts/huerfano.png", imagen_png(10, 10))
+        miniatura = default_storage.save(nombre_derivado("posts/huerfano.png", 320), imagen_png(10, 10))
+        call_command("limpiar_media", "--minutos=0", stdout=StringIO())
+        self.assertFalse(default_storage.exists(huerfano))
+        self.assertFalse(default_storage.exists(miniatura))
+        self.assertTrue(default_storage.exists(referenciado))
+        self.assertTrue(default_storage.exists(nombre_derivado(referenciado, 320)))
+
+    def test_limpiar_media_borra_miniaturas_con_el_nombre_anterior(self):
+        # Antes los derivados no llevaban la extensión original: derivados/320/posts/ab/ab....webp
+        referenciado = self.posts[0].imagen.name
+        sin_extension = default_storage.save(f"derivados/320/{referenciado.rsplit('.', 1)[0]}.webp", imagen_png(10, 10))
+        call_command("limpiar_media", "--minutos=0", stdout=StringIO())
+        self.assertFalse(default_storage.exists(sin_extension))
+        self.assertTrue(default_storage.exists(nombre_derivado(referenciado, 320)))
+
+    def test_limpiar_media_respeta_archivos_recientes(self):
+        huerfano = default_storage.save("posts/subiendo.png", imagen_png(10, 10))
+        call_command("limpiar_media", stdout=StringIO())
+        self.assertTrue(default_storage.exists(huerfano))
+
+
+# ADMINISTRACIÓN
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class AdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_superuser(username="admin", password="clave")
+        cls.categoria = Categoria.objects.create(nombre="Noticias")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def crear_posts(self, cantidad):
+        for i in range(cantidad):
+            autor = Usuario.objects.create_user(username=f"autor{Usuario.objects.count()}", password="clave")
+            post = Post.objects.create(titulo=f"Post {i}", texto="texto", autor=autor, categoria=self.categoria)
+            Comentario.objects.create(post=post, autor=autor, contenido="Comentario")
+
+    def consultas_de(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(consultas)
+
+    def test_busqueda_en_el_texto_por_el_indice(self):
+        autor = Usuario.objects.create_user(username="autor", password="clave")
+        Post.objects.create(titulo="Retiro", texto="Hablamos del bautismo", autor=autor)
+        Post.objects.create(titulo="Bautismos del mes", texto="texto", autor=autor)
+        Post.objects.create(titulo="Eventos", texto="Nada que ver", autor=autor)
+        respuesta = self.client.get(reverse("admin:posts_post_changelist"), {"q": "bautismo"})
+        self.assertEqual(
+            sorted(post.titulo for post in respuesta.context["cl"].result_list), ["Bautismos del mes", "Retiro"],
+        )
+
+    def test_consultas_de_los_listados_no_crecen_con_las_filas(self):
+        for nombre in ("admin:posts_post_changelist", "admin:posts_comentario_changelist"):
+            with self.subTest(nombre):
+                self.crear_posts(2)
+                pocas = self.consultas_de(reverse(nombre))
+                self.crear_posts(8)
+                self.assertEqual(self.consultas_de(reverse(nombre)), pocas)
+
+    def test_desactivar_y_activar(self):
+        self.crear_posts(3)
+        pks = list(Post.objects.values_list("pk", flat=True))
+        url = reverse("admin:posts_post_changelist")
+        self.client.post(url, {"action": "desactivar", "_selected_action": pks[:2]})
+        self.categoria.refresh_from_db()
+        self.assertEqual(self.categoria.num_posts, 1)
+        self.assertFalse(TerminoBusqueda.objects.filter(post_id__in=pks[:2]).exists())
+        self.assertEqual(Post.objects.filter(activo=False).count(), 2)
+
+        self.client.post(url, {"action": "activar", "_selected_action": pks})
+        self.categoria.refresh_from_db()
+        self.assertEqual(self.categoria.num_posts, 3)
+        self.assertTrue(TerminoBusqueda.objects.filter(post_id=pks[0]).exists())
+
+    def test_eliminar_comentarios_seleccionados(self):
+        self.crear_posts(2)
+        post = Post.objects.first()
+        Comentario.objects.create(post=post, autor=self.admin, contenido="Otro")
+        pks = list(post.comentarios.values_list("pk", flat=True))
+        self.client.post(
+            reverse("admin:posts_comentario_changelist"),
+            {"action": "delete_selected", "_selected_action": pks, "post": "yes"},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.num_comentarios, 0)
+        self.assertEqual(Comentario.objects.count(), 1)
+
+
+# VISITAS Y MÁS LEÍDOS
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True, VISITAS_INTERVALO=3600)
+class VisitasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.noticias = Categoria.objects.create(nombre="Noticias")
+        cls.eventos = Categoria.objects.create(nombre="Eventos")
+        cls.posts = [
+            Post.objects.create(titulo=f"Post {i}", texto="texto", autor=cls.autor, categoria=categoria)
+            for i, categoria in enumerate([cls.noticias, cls.noticias, cls.eventos])
+        ]
+
+    def setUp(self):
+        cache.clear()
+        # Lo acumulado por otros tests (sus pk se repiten en la base de pruebas)
+        visitas._pendientes.clear()
+
+    def visitar(self, post, veces=1):
+        for _ in range(veces):
+            self.assertEqual(self.client.get(reverse("posts:detalle_post", kwargs={"pk": post.pk})).status_code, 200)
+
+    def test_acumula_y_vuelca_por_lotes(self):
+        self.visitar(self.posts[0], 2)
+        self.visitar(self.posts[1], 2)
+        self.visitar(self.posts[2])
+        # Nada se escribió todavía (la segunda visita se sirvió desde el cache)
+        self.assertEqual(Post.objects.filter(num_visitas__gt=0).count(), 0)
+        with CaptureQueriesContext(connection) as consultas:
+            volcar_pendientes()
+        # Un UPDATE de Post por cantidad distinta (2 y 1), no uno por post
+        actualizaciones = [q for q in consultas.captured_queries if q["sql"].startswith('UPDATE "posts_post"')]
+        self.assertEqual(len(actualizaciones), 2)
+        self.assertEqual(
+            list(Post.objects.order_by("pk").values_list("num_visitas", flat=True)), [2, 2, 1],
+        )
+        self.visitar(self.posts[0])
+        volcar_pendientes()
+        self.assertEqual(VisitaDiaria.objects.get(post=self.posts[0]).visitas, 3)
+
+    @override_settings(VISITAS_INTERVALO=0)
+    def test_intervalo_cumplido_vuelca_al_visitar(self):
+        self.visitar(self.posts[2])
+        self.posts[2].refresh_from_db()
+        self.assertEqual(self.posts[2].num_visitas, 1)
+
+    def test_volcado_periodico_y_al_salir(self):
+        self.visitar(self.posts[0])
+        # El hilo de revisión no vuelca antes del intervalo...
+        visitas.volcar_si_vencido()
+        self.assertFalse(VisitaDiaria.objects.exists())
+        # ...y sí después, aunque no haya llegado otra visita
+        with override_settings(VISITAS_INTERVALO=0):
+            visitas.volcar_si_vencido()
+        self.assertEqual(VisitaDiaria.objects.get(post=self.posts[0]).visitas, 1)
+        # Al terminar el proceso se vuelca lo que quede, sin pasar por la cola
+        self.visitar(self.posts[1])
+        with override_settings(TAREAS_SINCRONO=False):
+            visitas.volcar_al_salir()
+        self.posts[1].refresh_from_db()
+        self.assertEqual(self.posts[1].num_visitas, 1)
+
+    def test_mas_leidos_del_sitio_y_por_categoria(self):
+        self.visitar(self.posts[1], 3)
+        self.visitar(self.posts[2], 2)
+        self.visitar(self.posts[0])
+        volcar_pendientes()
+        actualizar_mas_leidos()
+        self.assertEqual([e["pk"] for e in obtener_mas_leidos()], [p.pk for p in (self.posts[1], self.posts[2], self.posts[0])])
+        self.assertEqual([e["pk"] for e in obtener_mas_leidos(self.noticias.pk)], [self.posts[1].pk, self.posts[0].pk])
+        self.assertContains(self.client.get(reverse("index")), "Más leídos")
+        # Desactivar un post lo saca del ranking
+        self.posts[1].activo = False
+        self.posts[1].save()
+        self.assertNotIn(self.posts[1].pk, [e["pk"] for e in obtener_mas_leidos()])
+
+    def test_ranking_servido_desde_el_cache(self):
+        actualizar_mas_leidos()
+        with self.assertNumQueries(0):
+            obtener_mas_leidos(self.eventos.pk)
+
+    def test_sin_ranking_se_calcula_en_la_cola(self):
+        self.visitar(self.posts[2])
+        volcar_pendientes()
+        cache.clear()
+        with override_settings(TAREAS_SINCRONO=False), mock.patch.object(visitas, "calcular_mas_leidos") as calcular:
+            with self.captureOnCommitCallbacks():
+                self.assertEqual(obtener_mas_leidos(), [])
+                obtener_mas_leidos(self.eventos.pk)
+            calcular.assert_not_called()
+        # Un solo cálculo pedido, fuera del request
+        self.assertEqual(Tarea.objects.filter(funcion__endswith="actualizar_mas_leidos").count(), 1)
+
+    def test_ranking_vencido_se_sigue_mostrando_mientras_se_recalcula(self):
+        anterior = {None: [{"pk": self.posts[0].pk, "titulo": "Post 0", "visitas": 1}]}
+        cache.set(visitas.CLAVE_MAS_LEIDOS, (time.time() - visitas.MAS_LEIDOS_INTERVALO - 1, anterior), None)
+        with override_settings(TAREAS_SINCRONO=False):
+            self.assertEqual(obtener_mas_leidos(), anterior[None])
+        self.assertTrue(Tarea.objects.filter(funcion__endswith="actualizar_mas_leidos").exists())
+
+    def test_falla_del_ranking_no_reintenta_el_volcado(self):
+        self.visitar(self.posts[0])
+        with override_settings(TAREAS_SINCRONO=False), self.assertLogs("apps.tareas.cola", "ERROR"), \
+                mock.patch.object(visitas, "calcular_mas_leidos", side_effect=RuntimeError):
+            volcar_pendientes()
+            procesar_pendientes()
+            procesar_pendientes()
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].num_visitas, 1)
+        # Solo queda el ranking, para reintentar
+        self.assertEqual(list(Tarea.objects.values_list("funcion", flat=True)), ["apps.posts.visitas.actualizar_mas_leidos"])
+
+
+# POSTS RELACIONADOS
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class RelacionadosTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.bautismo = cls.crear("Bautismo en la parroquia", "El bautismo de los niños se celebra en la parroquia del barrio")
+        cls.bautismos = cls.crear("Bautismos de verano", "Nuevas fechas de bautismo para los niños de la parroquia")
+        cls.retiro = cls.crear("Retiro de jóvenes", "Un retiro espiritual en la montaña para los jóvenes")
+        cls.cocina = cls.crear("Receta de empanadas", "Empanadas de carne al horno para la kermesse")
+
+    @classmethod
+    def crear(cls, titulo, texto):
+        return Post.objects.create(titulo=titulo, texto=texto, autor=cls.autor)
+
+    def setUp(self):
+        cache.clear()
+
+    def relacionados(self, post):
+        return [fila.relacionado for fila in relacionados_de(post.pk)]
+
+    def test_el_mas_parecido_primero(self):
+        self.assertEqual(self.relacionados(self.bautismo)[0], self.bautismos)
+        self.assertNotIn(self.cocina, self.relacionados(self.bautismo))
+        self.assertEqual(self.relacionados(self.cocina), [])
+
+    def test_actualizacion_incremental(self):
+        nuevo = self.crear("Retiro en la montaña", "Retiro de jóvenes con caminata en la montaña")
+        # El nuevo entra en la lista del parecido sin recalcularla entera
+        self.assertEqual(self.relacionados(self.retiro)[0], nuevo)
+        self.assertEqual(self.relacionados(nuevo)[0], self.retiro)
+        # Deja de parecerse: sale de la lista
+        nuevo.titulo, nuevo.texto = "Receta de pastelitos", "Pastelitos de membrillo para la kermesse"
+        nuevo.save()
+        self.assertNotIn(nuevo, self.relacionados(self.retiro))
+        self.assertIn(self.cocina, self.relacionados(nuevo))
+
+    def test_detalle_con_una_consulta(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse("posts:detalle_post", kwargs={"pk": self.bautismo.pk}))
+        self.assertContains(respuesta, "Seguí leyendo")
+        self.assertContains(respuesta, "Bautismos de verano")
+        self.assertEqual(sum("posts_postrelacionado" in q["sql"] for q in consultas.captured_queries), 1)
+
+    def test_detalle_cacheado_invalidado_al_cambiar_un_relacionado(self):
+        url = reverse("posts:detalle_post", kwargs={"pk": self.bautismo.pk})
+        self.assertContains(self.client.get(url), "Bautismos de verano")
+        post = Post.objects.get(pk=self.bautismos.pk)
+        post.titulo = "Bautismos de otoño"
+        post.save()
+        self.assertContains(self.client.get(url), "Bautismos de otoño")
+
+    def test_inactivos_fuera(self):
+        self.bautismos.activo = False
+        self.bautismos.save()
+        self.assertNotIn(self.bautismos, self.relacionados(self.bautismo))
+
+    def test_recalcular_todos(self):
+        PostRelacionado.objects.all().delete()
+        call_command("recalcular_relacionados", stdout=StringIO())
+        self.assertEqual(self.relacionados(self.bautismo)[0], self.bautismos)
+
+
+# EXTRACTO GUARDADO
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class ExtractoTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.categoria = Categoria.objects.create(nombre="Noticias")
+        cls.post = Post.objects.create(
+            titulo="Post", texto=" ".join(f"palabra{i}" for i in range(100)),
+            autor=cls.autor, categoria=cls.categoria,
+        )
+
+    def test_extracto_al_guardar(self):
+        self.assertEqual(self.post.extracto.split()[:2], ["palabra0", "palabra1"])
+        self.assertEqual(len(self.post.extracto.split()), 20)
+        self.post.texto = "Nuevo texto"
+        self.post.save(update_fields=["texto"])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.extracto, "Nuevo texto")
+
+    def test_listados_sin_texto_completo(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse("index"))
+            self.client.get(reverse("posts:posts_por_categoria", kwargs={"pk": self.categoria.pk}))
+        for consulta in consultas.captured_queries:
+            if 'FROM "posts_post"' in consulta["sql"] or "FROM `posts_post`" in consulta["sql"]:
+                self.assertNotIn("texto", consulta["sql"].replace("extracto", ""))
+
+
+# PAGINADOR CON CONTEO CACHEADO
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class PaginadorCacheadoTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.categoria = Categoria.objects.create(nombre="Noticias")
+        Post.objects.bulk_create(
+            Post(titulo=f"Post {i}", texto="texto", autor=cls.autor, categoria=cls.categoria)
+            for i in range(30)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def paginador(self, orden="-publicado"):
+        return PaginadorCacheado(Post.objects.filter(activo=True).order_by(orden), 2)
+
+    def test_conteo_cacheado_sin_importar_el_orden(self):
+        self.assertEqual(self.paginador().count, 30)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginador("titulo").count, 30)
+
+    def test_conteo_invalidado_al_guardar_posts(self):
+        self.assertEqual(self.paginador().count, 30)
+        Post.objects.create(titulo="Nuevo", texto="texto", autor=self.autor, categoria=self.categoria)
+        self.assertEqual(self.paginador().count, 31)
+        Post.objects.filter(titulo="Nuevo").get().delete()
+        self.assertEqual(self.paginador().count, 30)
+
+    def test_ventana_de_paginas(self):
+        paginador = self.paginador()
+        self.assertEqual(list(paginador.ventana(1)), [1, 2, 3])
+        self.assertEqual(list(paginador.ventana(8)), [6, 7, 8, 9, 10])
+        self.assertEqual(list(paginador.ventana(15)), [13, 14, 15])
+
+    def test_listado_de_categoria_sin_count_con_cache_caliente(self):
+        url = reverse("posts:posts_por_categoria", kwargs={"pk": self.categoria.pk})
+        self.client.force_login(self.autor)   # Los autenticados no usan el cache de página
+        self.client.get(url, {"page": 3})
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url, {"page": 3, "orden": "titulo"})
+        self.assertContains(respuesta, "?page=5&amp;orden=titulo")
+        self.assertFalse(any("COUNT(" in c["sql"].upper() for c in consultas.captured_queries))
+
+
+# CONTADORES DESNORMALIZADOS
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class ContadoresTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.noticias = Categoria.objects.create(nombre="Noticias")
+        cls.eventos = Categoria.objects.create(nombre="Eventos")
+
+    def contadores(self):
+        self.noticias.refresh_from_db()
+        self.eventos.refresh_from_db()
+        self.autor.refresh_from_db()
+        return self.noticias.num_posts, self.eventos.num_posts, self.autor.num_posts
+
+    def crear_post(self, **kwargs):
+        datos = {"titulo": "Post", "texto": "texto", "autor": self.autor, "categoria": self.noticias}
+        return Post.objects.create(**{**datos, **kwargs})
+
+    def test_posts_por_categoria_y_autor(self):
+        post = self.crear_post()
+        self.crear_post(activo=False)
+        self.assertEqual(self.contadores(), (1, 0, 2))
+
+        # Cambio de categoría y de estado sobre una instancia leída de la base
+        post = Post.objects.get(pk=post.pk)
+        post.categoria = self.eventos
+        post.save()
+        self.assertEqual(self.contadores(), (0, 1, 2))
+        post.activo = False
+        post.save()
+        self.assertEqual(self.contadores(), (0, 0, 2))
+
+        post.delete()
+        self.assertEqual(self.contadores(), (0, 0, 1))
+
+    def test_comentarios_por_post(self):
+        post = self.crear_post()
+        comentario = Comentario.objects.create(post=post, autor=self.autor, contenido="Hola")
+        Comentario.objects.create(post=post, autor=self.autor, contenido="Chau")
+        comentario.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.num_comentarios, 1)
+
+    def test_contador_desfasado_no_baja_de_cero(self):
+        post = self.crear_post()
+        comentario = Comentario.objects.create(post=post, autor=self.autor, contenido="Hola")
+        Post.objects.filter(pk=post.pk).update(num_comentarios=0)
+        comentario.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.num_comentarios, 0)
+
+    def test_guardar_no_pisa_los_contadores(self):
+        post = self.crear_post()
+        en_memoria = Post.objects.get(pk=post.pk)
+        Comentario.objects.create(post=post, autor=self.autor, contenido="Hola")
+        en_memoria.titulo = "Editado"
+        en_memoria.save()   # Tenía num_comentarios=0 en memoria
+        post.refresh_from_db()
+        self.assertEqual((post.titulo, post.num_comentarios), ("Editado", 1))
+
+    def test_guardar_con_campos_diferidos_solo_escribe_los_cargados(self):
+        post = self.crear_post()
+        parcial = Post.objects.only("titulo").get(pk=post.pk)
+        Post.objects.filter(pk=post.pk).update(texto="editado por otro")
+        parcial.titulo = "Editado"
+        with CaptureQueriesContext(connection) as consultas:
+            parcial.save()
+        # Los diferidos no se leen para escribirlos de nuevo
+        actualizacion = next(q["sql"] for q in consultas.captured_queries if q["sql"].startswith('UPDATE "posts_post"'))
+        self.assertNotIn('"texto"', actualizacion)
+        post.refresh_from_db()
+        self.assertEqual((post.titulo, post.texto), ("Editado", "editado por otro"))
+
+    def test_recalcular_corrige_desfasados(self):
+        post = self.crear_post()
+        Comentario.objects.create(post=post, autor=self.autor, contenido="Hola")
+        Post.objects.update(num_comentarios=7)
+        Categoria.objects.update(num_posts=7)
+        salida = StringIO()
+        call_command("recalcular_contadores", stdout=salida)
+        self.assertIn("Post.num_comentarios: 1 filas desfasadas", salida.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.num_comentarios, 1)
+        self.assertEqual(self.contadores(), (1, 0, 1))
+
+
+# IMPORTACIÓN / EXPORTACIÓN MASIVA
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class IntercambioContenidoTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        categoria = Categoria.objects.create(nombre="Noticias")
+        Categoria.objects.create(nombre="Vacía")
+        hace_un_anio = timezone.now() - timedelta(days=365)
+        for i in range(5):
+            post = Post.objects.create(
+                titulo=f"Bautismo {i}", texto="Texto del bautismo", autor=cls.autor,
+                categoria=categoria, publicado=hace_un_anio, activo=i != 4,
+            )
+            Comentario.objects.create(post=post, autor=cls.autor, contenido=f"Comentario {i}")
+        Comentario.objects.update(creado=hace_un_anio)
+
+    def setUp(self):
+        cache.clear()
+        self.carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.carpeta)
+
+    def ida_y_vuelta(self, destino, *opciones):
+        call_command("exportar_contenido", destino, *opciones, stdout=StringIO())
+        Categoria.objects.all().delete()
+        Post.objects.all().delete()
+        call_command("importar_contenido", destino, "--lote", "2", stdout=StringIO())
+
+    def verificar_importado(self):
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comentario.objects.count(), 5)
+        self.assertEqual(
+            sorted(Categoria.objects.values_list("nombre", "num_posts")), [("Noticias", 4), ("Vacía", 0)]
+        )
+        for post in Post.objects.all():
+            self.assertEqual(post.num_comentarios, 1)
+            self.assertEqual(post.extracto, "Texto del bautismo")
+            self.assertEqual(post.comentarios.get().contenido, f"Comentario {post.titulo[-1]}")
+            self.assertLess(post.publicado, timezone.now() - timedelta(days=300))
+        self.assertLess(Comentario.objects.first().creado, timezone.now() - timedelta(days=300))
+        self.assertEqual(buscar("bautismo").count(), 4)
+        self.autor.refresh_from_db()
+        self.assertEqual(self.autor.num_posts, 5)
+
+    def test_jsonl(self):
+        self.ida_y_vuelta(f"{self.carpeta}/contenido.jsonl")
+        self.verificar_importado()
+
+    def test_csv(self):
+        self.ida_y_vuelta(f"{self.carpeta}/csv", "--formato", "csv")
+        self.verificar_importado()
+
+    def test_autor_inexistente(self):
+        destino = f"{self.carpeta}/contenido.jsonl"
+        call_command("exportar_contenido", destino, stdout=StringIO())
+        Post.objects.all().delete()
+        self.autor.username = "otro"
+        self.autor.save()
+        salida = StringIO()
+        call_command("importar_contenido", destino, stdout=salida)
+        self.assertIn("10 registros omitidos", salida.getvalue())
+        call_command("importar_contenido", destino, "--autor", "otro", stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_ids_asignados_por_la_base(self):
+        destino = f"{self.carpeta}/contenido.jsonl"
+        call_command("exportar_contenido", destino, stdout=StringIO())
+        Categoria.objects.all().delete()
+        Post.objects.all().delete()
+        importador = Importador(tamanio_lote=2)
+        # El sitio crea un post mientras se importa: no choca con los ids importados
+        Post.objects.create(titulo="Publicado mientras tanto", texto="texto", autor=self.autor)
+        for tipo, registro in leer_registros(destino):
+            importador.agregar(tipo, registro)
+        importador.terminar()
+        self.assertEqual(Post.objects.count(), 6)
+        Post.objects.filter(titulo="Publicado mientras tanto").delete()
+        self.verificar_importado()
+
+    def test_motor_sin_ids_en_bulk_create(self):
+        # Como MySQL: un INSERT por lote y los comentarios igual se vinculan
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False), \
+                CaptureQueriesContext(connection) as consultas:
+            self.ida_y_vuelta(f"{self.carpeta}/contenido.jsonl")
+        self.verificar_importado()
+        inserts = [q for q in consultas.captured_queries if q["sql"].startswith('INSERT INTO "posts_post"')]
+        self.assertEqual(len(inserts), 3)   # 5 posts en lotes de 2
+        self.assertFalse(Post.objects.exclude(lote_importacion=None).exists())
+        self.assertFalse(Comentario.objects.exclude(lote_importacion=None).exists())
+
+    def test_fechas_invalidas_y_categorias_existentes(self):
+        destino = f"{self.carpeta}/contenido.jsonl"
+        with open(destino, "w", encoding="utf-8") as archivo:
+            for registro in [
+                {"tipo": "categoria", "nombre": "Noticias"},
+                {"tipo": "categoria", "nombre": "Retiros"},
+                {"tipo": "post", "id": 1, "titulo": "Importado", "texto": "texto", "autor": "autor",
+                 "categoria": "Retiros", "creado": "2020-13-45T00:00:00", "publicado": "ayer"},
+                {"tipo": "comentario", "post": 1, "autor": "autor", "contenido": "Hola", "creado": "no es fecha"},
+            ]:
+                archivo.write(json.dumps(registro) + "\n")
+        importador = Importador()
+        # Otro proceso crea "Retiros" después de que el importador leyó las categorías
+        Categoria.objects.create(nombre="Retiros")
+        for tipo, registro in leer_registros(destino):
+            importador.agregar(tipo, registro)
+        self.assertEqual(importador.terminar()["categoria"], 0)
+        post = Post.objects.get(titulo="Importado")
+        # Sin fecha válida quedan las de hoy (no NULL)
+        self.assertGreater(post.creado, timezone.now() - timedelta(minutes=1))
+        self.assertGreater(post.publicado, timezone.now() - timedelta(minutes=1))
+        self.assertGreater(post.comentarios.get().creado, timezone.now() - timedelta(minutes=1))
+
+
+# BENCHMARK
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class BenchmarkBlogTest(TestCase):
+
+    def test_resultado_json_y_datos_descartados(self):
+        destino = f"{tempfile.mkdtemp()}/benchmark.json"
+        call_command("benchmark_blog", "--escalas", "30", "--repeticiones", "2", "--salida", destino, stderr=StringIO())
+        with open(destino, encoding="utf-8") as archivo:
+            resultado = json.load(archivo)
+        vistas = resultado["escalas"][0]["vistas"]
+        self.assertEqual(vistas["home"]["estado"], 200)
+        self.assertEqual(vistas["lista_usuarios"]["estado"], 200)
+        self.assertEqual(vistas["crear_comentario"]["estado"], 302)
+        # Con la página en cache, el inicio no consulta la base
+        self.assertEqual(vistas["home"]["consultas"], 0)
+        self.assertFalse(Post.objects.exists())
+
+
+# INSTRUMENTACIÓN DE REQUESTS
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True, INSTRUMENTACION=True,
+    INSTRUMENTACION_REQUEST_LENTO_MS=10_000, INSTRUMENTACION_REPETICIONES=3,
+)
+class InstrumentacionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.post = Post.objects.create(titulo="Post", texto="texto", autor=cls.autor)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_y_log(self):
+        with self.assertLogs("primer_proyecto.instrumentacion", "INFO") as logs:
+            respuesta = self.client.get(reverse("posts:detalle_post", kwargs={"pk": self.post.pk}))
+        self.assertRegex(respuesta["Server-Timing"], r'total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ consultas", tpl;dur=')
+        datos = json.loads(logs.records[0].getMessage())
+        self.assertEqual(datos["vista"], "posts:detalle_post")
+        self.assertGreater(datos["consultas"], 0)
+        self.assertGreater(datos["template_ms"], 0)
+
+    def test_consultas_repetidas(self):
+        def vista_n_mas_1(request):
+            for pk in range(4):
+                list(Post.objects.filter(pk=pk))
+            return HttpResponse("ok")
+
+        from primer_proyecto.instrumentacion import InstrumentacionMiddleware
+        middleware = InstrumentacionMiddleware(vista_n_mas_1)
+        with self.assertLogs("primer_proyecto.instrumentacion", "WARNING") as logs:
+            middleware(RequestFactory().get("/"))
+        self.assertIn("Consultas repetidas", logs.output[0])
+        self.assertIn('= ? ORDER BY', logs.output[0])
+
+    @override_settings(ROOT_URLCONF="primer_proyecto.urls_async")
+    async def test_vistas_async(self):
+        with self.assertLogs("primer_proyecto.instrumentacion", "INFO") as logs:
+            respuesta = await self.async_client.get(reverse("posts:detalle_post", kwargs={"pk": self.post.pk}))
+        self.assertContains(respuesta, "Post")
+        self.assertIn("Server-Timing", respuesta)
+        datos = json.loads(logs.records[0].getMessage())
+        # Las consultas de la vista corren en sync_to_async y también se cuentan
+        self.assertGreater(datos["consultas"], 0)
+        self.assertEqual(datos["vista"], "posts:detalle_post")
+
+
+# FEEDS
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True)
+class FeedsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        autor = Usuario.objects.create_user(username="autor", password="clave", nombre="Ana", apellido="Pérez")
+        cls.categoria = Categoria.objects.create(nombre="Noticias")
+        otra = Categoria.objects.create(nombre="Agenda")
+        cls.post = Post.objects.create(
+            titulo="Retiro de jóvenes", texto="Un retiro espiritual " * 50, autor=autor, categoria=cls.categoria,
+        )
+        Post.objects.create(titulo="Misa de domingo", texto="texto", autor=autor, categoria=otra)
+        Post.objects.create(titulo="Borrador", texto="texto", autor=autor, activo=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rss_atom_y_json(self):
+        rss = self.client.get(reverse("feed"))
+        self.assertEqual(rss["Content-Type"], "application/rss+xml; charset=utf-8")
+        self.assertContains(rss, "Retiro de jóvenes")
+        self.assertContains(rss, self.post.extracto[:40])
+        self.assertNotContains(rss, "Borrador")
+        self.assertContains(self.client.get(reverse("feed_atom")), "<feed")
+
+        datos = json.loads(self.client.get(reverse("feed_json")).content)
+        self.assertEqual(datos["version"], "https://jsonfeed.org/version/1.1")
+        self.assertEqual([item["title"] for item in datos["items"]], ["Misa de domingo", "Retiro de jóvenes"])
+        self.assertEqual(datos["items"][1]["authors"], [{"name": "Ana Pérez"}])
+        self.assertEqual(datos["items"][1]["tags"], ["Noticias"])
+
+    def test_feed_por_categoria(self):
+        url = reverse("feed_categoria_json", kwargs={"pk": self.categoria.pk})
+        datos = json.loads(self.client.get(url).content)
+        self.assertEqual([item["title"] for item in datos["items"]], ["Retiro de jóvenes"])
+        self.assertEqual(self.client.get(reverse("feed_categoria", kwargs={"pk": 999})).status_code, 404)
+
+    def test_cacheado_y_get_condicional(self):
+        url = reverse("feed")
+        respuesta = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, respuesta.content)
+            no_modificado = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta["ETag"])
+            self.assertEqual(no_modificado.status_code, 304)
+            desde = self.client.get(url, HTTP_IF_MODIFIED_SINCE=respuesta["Last-Modified"])
+            self.assertEqual(desde.status_code, 304)
+
+        # Un post nuevo cambia la versión: se regenera y el ETag viejo ya no sirve
+        Post.objects.create(titulo="Nuevo", texto="texto", autor=self.post.autor)
+        respuesta_nueva = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta["ETag"])
+        self.assertEqual(respuesta_nueva.status_code, 200)
+        self.assertContains(respuesta_nueva, "Nuevo")
+        self.assertNotEqual(respuesta_nueva["ETag"], respuesta["ETag"])
+
+    def test_last_modified_sigue_a_la_version(self):
+        url = reverse("feed")
+        # Contenido cambiado por última vez hace una hora
+        hace_una_hora = time.time_ns() - 3600 * 10**9
+        cache.set_many({CLAVE_VERSION_CONTENIDO: hace_una_hora, CLAVE_VERSION_LISTADOS: hace_una_hora})
+        respuesta = self.client.get(url)
+        # Desactivar el post más nuevo cambia el feed: Last-Modified no retrocede y el
+        # If-Modified-Since anterior ya no recibe un 304
+        ultimo = Post.objects.filter(activo=True).latest("publicado")
+        ultimo.activo = False
+        ultimo.save()
+        nueva = self.client.get(url, HTTP_IF_MODIFIED_SINCE=respuesta["Last-Modified"])
+        self.assertEqual(nueva.status_code, 200)
+        self.assertNotContains(nueva, ultimo.titulo)
+        self.assertGreater(parse_http_date(nueva["Last-Modified"]), parse_http_date(respuesta["Last-Modified"]))
+
+
+# CONFIGURACIÓN DE CONEXIONES A LA BASE
+
+
+class ConfiguracionBaseDeDatosTest(SimpleTestCase):
+
+    def configurar_todas(self, asgi=False, **entorno):
+        from pathlib import Path
+        from primer_proyecto.base_de_datos import configurar
+        return configurar(Path("/tmp"), {"BLOG_DB": "mysql", **entorno}, asgi=asgi)
+
+    def configurar(self, **entorno):
+        return self.configurar_todas(**entorno)["default"]
+
+    def test_wsgi_conexiones_persistentes(self):
+        base = self.configurar()
+        self.assertEqual(base["CONN_MAX_AGE"], 60)
+        self.assertTrue(base["CONN_HEALTH_CHECKS"])
+        self.assertNotIn("pool_name", base["OPTIONS"])
+
+    def test_asgi_usa_pool(self):
+        base = self.configurar(asgi=True)
+        self.assertEqual(base["CONN_MAX_AGE"], 0)
+        self.assertEqual(base["OPTIONS"]["pool_size"], 5)
+
+    def test_pool_configurable_y_acotado(self):
+        base = self.configurar(DB_POOL_TAMANIO="100", DB_CONN_HEALTH_CHECKS="0")
+        self.assertEqual(base["OPTIONS"]["pool_size"], 32)
+        self.assertEqual(base["CONN_MAX_AGE"], 0)
+        self.assertFalse(base["CONN_HEALTH_CHECKS"])
+
+    def test_replicas(self):
+        bases = self.configurar_todas(BLOG_DB="sqlite", DB_REPLICAS="/tmp/r1.sqlite3, /tmp/r2.sqlite3")
+        self.assertEqual(list(bases), ["default", "replica1", "replica2"])
+        self.assertEqual(bases["replica2"]["NAME"], "/tmp/r2.sqlite3")
+        self.assertEqual(bases["replica1"]["TEST"], {"MIRROR": "default"})
+        mysql = self.configurar_todas(DB_REPLICAS="10.0.0.2:3307", DB_POOL_TAMANIO="4")
+        self.assertEqual((mysql["replica1"]["HOST"], mysql["replica1"]["PORT"]), ("10.0.0.2", "3307"))
+        self.assertEqual(mysql["replica1"]["OPTIONS"]["pool_name"], "primer_proyecto_replica1")
+
+    def test_motores_alternativos(self):
+        self.assertEqual(self.configurar(BLOG_DB="sqlite")["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(self.configurar(BLOG_DB="dummy")["ENGINE"], "django.db.backends.dummy")
+
+
+# RÉPLICAS DE LECTURA
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True, REPLICAS_LECTURA=["replica1"])
+class ReplicasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.post = Post.objects.create(titulo="Post", texto="texto", autor=cls.autor)
+
+    def pedir(self, vista, request):
+        '''Pasa request por el middleware y devuelve (response, bases que usó vista)'''
+        from primer_proyecto.replicas import ReplicasMiddleware
+        bases = {}
+
+        def get_response(request):
+            middleware.process_view(request, vista, (), {})
+            bases.update(vista(request))
+            return HttpResponse("ok")
+
+        middleware = ReplicasMiddleware(get_response)
+        return middleware(request), bases
+
+    def test_solo_las_vistas_publicas_leen_de_la_replica(self):
+        from django.db import router
+        from primer_proyecto.replicas import timeout_cache
+
+        def publica(request):
+            return {"post": router.db_for_read(Post), "usuario": router.db_for_read(Usuario),
+                    "timeout": timeout_cache()}
+        publica.lectura_en_replica = True
+
+        def privada(request):
+            return {"post": router.db_for_read(Post)}
+
+        _, bases = self.pedir(publica, RequestFactory().get("/"))
+        # El contenido va a la réplica; el usuario y la sesión, a la primaria
+        self.assertEqual(bases, {"post": "replica1", "usuario": "default", "timeout": 10})
+        _, bases = self.pedir(privada, RequestFactory().get("/"))
+        self.assertEqual(bases["post"], "default")
+
+        fijado = RequestFactory().get("/")
+        fijado.COOKIES["primaria"] = "1"
+        _, bases = self.pedir(publica, fijado)
+        self.assertEqual(bases["post"], "default")
+        self.assertIsNone(bases["timeout"])
+
+    def test_escribir_fija_la_primaria(self):
+        def escribe(request):
+            Post.objects.filter(pk=self.post.pk).update(titulo="Nuevo")
+            return {}
+
+        response, _ = self.pedir(escribe, RequestFactory().post("/"))
+        self.assertEqual(response.cookies["primaria"]["max-age"], 10)
+        # Un GET que escribe (p. ej. encolar una tarea) no fija
+        response, _ = self.pedir(escribe, RequestFactory().get("/"))
+        self.assertNotIn("primaria", response.cookies)
+
+    def test_comentar_fija_la_primaria(self):
+        self.client.force_login(self.autor)
+        respuesta = self.client.post(
+            reverse("posts:agregar_comentario", kwargs={"pk_post": self.post.pk}), {"contenido": "Hola"},
+        )
+        self.assertRedirects(respuesta, reverse("posts:detalle_post", kwargs={"pk": self.post.pk}))
+        self.assertIn("primaria", respuesta.cookies)
+
+
+# VISTAS ASYNC (ASGI)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, TAREAS_SINCRONO=True, ROOT_URLCONF="primer_proyecto.urls_async")
+class VistasAsyncTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.autor = Usuario.objects.create_user(username="autor", password="clave")
+        cls.categoria = Categoria.objects.create(nombre="Noticias")
+        cls.post = Post.objects.create(
+            titulo="Retiro de jóvenes", texto="Un retiro espiritual", autor=cls.autor, categoria=cls.categoria,
+        )
+        Comentario.objects.create(post=cls.post, autor=cls.autor, contenido="Gran encuentro")
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_paginas_publicas(self):
+        urls = {
+            reverse("index"): "Retiro de jóvenes",
+            reverse("posts:detalle_post", kwargs={"pk": self.post.pk}): "Gran encuentro",
+            reverse("posts:posts_por_categoria", kwargs={"pk": self.categoria.pk}): "Retiro de jóvenes",
+            reverse("posts:buscar") + "?q=retiro": "Retiro de jóvenes",
+        }
+        for url, texto in urls.items():
+            with self.subTest(url=url):
+                respuesta = await self.async_client.get(url)
+                self.assertContains(respuesta, texto)
+                self.assertContains(respuesta, "Noticias")   # menú de categorías
+
+    async def test_autenticado_ve_la_pagina_en_vivo(self):
+        await self.async_client.aforce_login(self.autor)
+        respuesta = await self.async_client.get(reverse("posts:detalle_post", kwargs={"pk": self.post.pk}))
+        self.assertContains(respuesta, "autor")
+        self.assertContains(respuesta, "csrfmiddlewaretoken")
+
+    async def test_no_encontrado_y_pagina_invalida(self):
+        respuesta = await self.async_client.get(reverse("posts:detalle_post", kwargs={"pk": 999}))
+        self.assertEqual(respuesta.status_code, 404)
+        url = reverse("posts:posts_por_categoria", kwargs={"pk": self.categoria.pk})
+        self.assertEqual((await self.async_client.get(url, {"page": 9})).status_code, 404)
+
+    def test_cache_anonimo_compartido(self):
+        url = reverse("posts:posts_por_categoria", kwargs={"pk": self.categoria.pk})
+        # Ya calculado: el primer ranking cambia su versión (y la clave de la página)
+        actualizar_mas_leidos()
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), "Retiro de jóvenes")
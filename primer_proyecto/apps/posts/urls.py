@@ -10,6 +10,7 @@ from .views import (
     CategoriaUpdateView,
     CategoriaDeleteView,
     CategoriaPostsView,
+    BuscarPostsView,
     ComentarioCreateView, 
     ComentarioUpdateView,
     ComentarioDeleteView,
@@ -17,36 +18,53 @@ from .views import (
 
 app_name = "posts"
 
-urlpatterns = [
-    
-    # POSTS (ADMIN COLABORADOR)
-    
-    path("", PostListView.as_view(), name="lista_posts"),
-    path("agregar/", PostCreateView.as_view(), name="agregar_post"),
-    path("editar/<int:pk>/", PostUpdateView.as_view(), name="editar_post"),
-    path("eliminar/<int:pk>/", PostDeleteView.as_view(), name="eliminar_post"),
-
-    # Detalle del Post (PÚBLICO)
-    path("<int:pk>/", PostDetailView.as_view(), name="detalle_post"),
-
-
-    # CATEGORÍAS (ADMIN COLABORADOR)
-    
-    path("categorias/", CategoriaListView.as_view(), name="lista_categorias"),
-    path("categorias/agregar/", CategoriaCreateView.as_view(), name="agregar_categoria"),
-    path("categorias/editar/<int:pk>/", CategoriaUpdateView.as_view(), name="editar_categoria"),
-    path("categorias/eliminar/<int:pk>/", CategoriaDeleteView.as_view(), name="eliminar_categoria"),
-
-    
-    # POSTS POR CATEGORÍA (PÚBLICO)
-    
-    path("categoria/<int:pk>/", CategoriaPostsView.as_view(), name="posts_por_categoria"),
-    
-    
-    # COMENTARIOS
-    # Recibe el pk del post y llama a la vista de creación de comentarios
-    path("post/<int:pk_post>/comentar/", ComentarioCreateView.as_view(), name="agregar_comentario"), 
-    # Reciben el pk del comentario a editar/eliminar
-    path("comentario/editar/<int:pk>/", ComentarioUpdateView.as_view(), name="editar_comentario"),
-    path("comentario/eliminar/<int:pk>/", ComentarioDeleteView.as_view(), name="eliminar_comentario"),
-]
\ No newline at end of file
+
+def patrones(asincronas=False):
+    '''asincronas=True usa las vistas públicas async (ASGI, ver vistas_async.py)'''
+    if asincronas:
+        from . import vistas_async
+        detalle = vistas_async.PostDetailAsyncView
+        por_categoria = vistas_async.CategoriaPostsAsyncView
+        busqueda = vistas_async.BuscarPostsAsyncView
+    else:
+        detalle, por_categoria, busqueda = PostDetailView, CategoriaPostsView, BuscarPostsView
+
+    return [
+
+        # POSTS (ADMIN COLABORADOR)
+
+        path("", PostListView.as_view(), name="lista_posts"),
+        path("agregar/", PostCreateView.as_view(), name="agregar_post"),
+        path("editar/<int:pk>/", PostUpdateView.as_view(), name="editar_post"),
+        path("eliminar/<int:pk>/", PostDeleteView.as_view(), name="eliminar_post"),
+
+        # Búsqueda (PÚBLICO)
+        path("buscar/", busqueda.as_view(), name="buscar"),
+
+        # Detalle del Post (PÚBLICO)
+        path("<int:pk>/", detalle.as_view(), name="detalle_post"),
+
+
+        # CATEGORÍAS (ADMIN COLABORADOR)
+
+        path("categorias/", CategoriaListView.as_view(), name="lista_categorias"),
+        path("categorias/agregar/", CategoriaCreateView.as_view(), name="agregar_categoria"),
+        path("categorias/editar/<int:pk>/", CategoriaUpdateView.as_view(), name="editar_categoria"),
+        path("categorias/eliminar/<int:pk>/", CategoriaDeleteView.as_view(), name="eliminar_categoria"),
+
+
+        # POSTS POR CATEGORÍA (PÚBLICO)
+
+        path("categoria/<int:pk>/", por_categoria.as_view(), name="posts_por_categoria"),
+
+
+        # COMENTARIOS
+        # Recibe el pk del post y llama a la vista de creación de comentarios
+        path("post/<int:pk_post>/comentar/", ComentarioCreateView.as_view(), name="agregar_comentario"), 
+        # Reciben el pk del comentario a editar/eliminar
+        path("comentario/editar/<int:pk>/", ComentarioUpdateView.as_view(), name="editar_comentario"),
+        path("comentario/eliminar/<int:pk>/", ComentarioDeleteView.as_view(), name="eliminar_comentario"),
+    ]
+
+
+urlpatterns = patrones()
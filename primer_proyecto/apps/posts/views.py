@@ -3,8 +3,15 @@ from django.urls import reverse_lazy, reverse
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin 
+from django.utils.http import urlencode
 
+from apps.usuarios.roles import es_colaborador
+from .busqueda import buscar
+from .cache import CacheAnonimoMixin, CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, clave_version_post, obtener_versiones
 from .models import Post, Categoria, Comentario
+from .paginacion import PaginadorCacheado
+from .relacionados import relacionados_de
+from .visitas import CLAVE_VERSION_MAS_LEIDOS, obtener_mas_leidos, registrar_visita
 from .forms import PostForm, CategoriaForm, ComentarioForm
 
 
@@ -26,11 +33,9 @@ class Autor_o_ColaboradorMixin(UserPassesTestMixin):
         comentario = self.get_object() 
 
         es_autor = comentario.autor == user
-        # La lógica de Colaborador es la pertenencia al grupo
-        es_colaborador = user.groups.filter(name="Colaborador").exists() 
-        
+        # La lógica de Colaborador es la pertenencia al grupo (rol cacheado)
         # El usuario puede operar si es el autor O si es un Colaborador
-        return es_autor or es_colaborador
+        return es_autor or es_colaborador(user)
 
     def handle_no_permission(self):
         messages.error(self.request, "No tenés permisos para editar o eliminar este comentario.")
@@ -51,9 +56,10 @@ class PostListView(LoginRequiredMixin, ListView):
     template_name = "posts/lista_posts.html"
     context_object_name = "posts"
     paginate_by = 10 # Cantidad de posts por página en el administrador
+    paginator_class = PaginadorCacheado
 
     def dispatch(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="Colaborador").exists():
+        if not es_colaborador(request.user):
             messages.error(request, "No tenés permisos para administrar posts.")
             return redirect("index")
         return super().dispatch(request, *args, **kwargs)
@@ -82,8 +88,8 @@ class PostListView(LoginRequiredMixin, ListView):
              # Si el parámetro es inválido, usar el orden por defecto
             queryset = queryset.order_by('-publicado')
 
-        # Usar select_related para optimizar la consulta
-        return queryset.select_related('categoria', 'autor')
+        # Usar select_related para optimizar la consulta (el texto completo no se muestra)
+        return queryset.select_related('categoria', 'autor').defer('texto')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -101,21 +107,71 @@ class PostListView(LoginRequiredMixin, ListView):
 # POSTS - VISTAS CRUD
 
 
-class PostDetailView(DetailView):
+class PostDetailView(CacheAnonimoMixin, DetailView):
     model = Post
     template_name = "posts/detalle_post.html"
     context_object_name = "post"
+    lectura_en_replica = True # Ver primer_proyecto/replicas.py
+    comentarios_por_pagina = 20 # El resto se carga con "Ver comentarios anteriores"
+
+    def get_claves_version(self):
+        # La página cambia con el contenido general y con los comentarios del post
+        return [CLAVE_VERSION_CONTENIDO, clave_version_post(self.kwargs["pk"])]
+
+    def dispatch(self, request, *args, **kwargs):
+        respuesta = super().dispatch(request, *args, **kwargs)
+        # Cuenta también las páginas servidas desde el cache (ver visitas.py)
+        if request.method == "GET" and respuesta.status_code == 200:
+            registrar_visita(self.kwargs["pk"])
+        return respuesta
+
+    def get_queryset(self):
+        # Categoría y autor en la misma consulta del post
+        return Post.objects.select_related('categoria', 'autor')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # 1. Agrega el formulario de comentarios
         context["form"] = ComentarioForm()
-        # 2. Pre-calcula si el usuario es colaborador (para la edición de comentarios)
-        user = self.request.user
-        context["es_colaborador"] = user.groups.filter(name="Colaborador").exists()
+        # 2. "es_colaborador" (para la edición de comentarios) lo agrega el
+        # context processor de roles, cacheado por usuario
+        # 3. Comentarios paginados con su autor en una sola consulta (sin N+1)
+        pagina = pagina_comentarios(self.request, self.object, self.comentarios_por_pagina)
+        consulta = consulta_comentarios(self.object, pagina, self.comentarios_por_pagina)
+        context.update(contexto_comentarios(list(consulta), pagina, self.comentarios_por_pagina))
+        # 4. Versión para los fragmentos cacheados de cada comentario
+        context["version_post"] = obtener_versiones([clave_version_post(self.object.pk)])[0]
+        # 5. Relacionados precalculados (perezosos: no se consultan si el fragmento está en el cache)
+        context["relacionados"] = relacionados_de(self.object.pk)
         return context
 
 
+def pagina_comentarios(request, post, por_pagina):
+    '''Página de comentarios pedida (?comentarios=N); si no existe, la primera'''
+    try:
+        pagina = int(request.GET.get("comentarios", 1))
+    except ValueError:
+        return 1
+    # Sin COUNT(*): num_comentarios es un contador guardado (ver contadores.py).
+    # Un número enorme haría un OFFSET fuera del rango de la base
+    ultima = post.num_comentarios // por_pagina + 1
+    return pagina if 1 <= pagina <= ultima else 1
+
+
+def consulta_comentarios(post, pagina, por_pagina):
+    # Se pide uno de más para saber si hay otra página sin hacer COUNT(*)
+    inicio = (pagina - 1) * por_pagina
+    return post.comentarios.select_related('autor').order_by('-creado')[inicio:inicio + por_pagina + 1]
+
+
+def contexto_comentarios(comentarios, pagina, por_pagina):
+    return {
+        "comentarios": comentarios[:por_pagina],
+        "comentarios_pagina_anterior": pagina - 1 if pagina > 1 else None,
+        "comentarios_pagina_siguiente": pagina + 1 if len(comentarios) > por_pagina else None,
+    }
+
+
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
     form_class = PostForm
@@ -129,7 +185,7 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
     def dispatch(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="Colaborador").exists():
+        if not es_colaborador(request.user):
             messages.error(request, "No tenés permisos para crear posts.")
             return redirect("index")
         return super().dispatch(request, *args, **kwargs)
@@ -174,7 +230,7 @@ class CategoriaListView(LoginRequiredMixin, ListView):
     context_object_name = "categorias"
 
     def dispatch(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="Colaborador").exists():
+        if not es_colaborador(request.user):
             messages.error(request, "No tenés permisos para administrar categorías.")
             return redirect("index")
         return super().dispatch(request, *args, **kwargs)
@@ -187,7 +243,7 @@ class CategoriaCreateView(LoginRequiredMixin, CreateView):
     success_url = reverse_lazy("posts:lista_categorias")
 
     def dispatch(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="Colaborador").exists():
+        if not es_colaborador(request.user):
             messages.error(request, "No tenés permisos para crear categorías.")
             return redirect("posts:lista_categorias")
         return super().dispatch(request, *args, **kwargs)
@@ -200,7 +256,7 @@ class CategoriaUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy("posts:lista_categorias")
 
     def dispatch(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="Colaborador").exists():
+        if not es_colaborador(request.user):
             messages.error(request, "No tenés permisos para editar categorías.")
             return redirect("posts:lista_categorias")
         return super().dispatch(request, *args, **kwargs)
@@ -212,7 +268,7 @@ class CategoriaDeleteView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy("posts:lista_categorias")
 
     def dispatch(self, request, *args, **kwargs):
-        if not request.user.groups.filter(name="Colaborador").exists():
+        if not es_colaborador(request.user):
             messages.error(request, "No tenés permisos para eliminar categorías.")
             return redirect("posts:lista_categorias")
         return super().dispatch(request, *args, **kwargs)
@@ -222,43 +278,80 @@ class CategoriaDeleteView(LoginRequiredMixin, DeleteView):
 # POSTS POR CATEGORÍA (PÚBLICO)
 
 
-class CategoriaPostsView(ListView):
+class CategoriaPostsView(CacheAnonimoMixin, ListView):
     model = Post
     template_name = "posts/categorias/posts_por_categoria.html"
     context_object_name = "posts"
     # Se actualizó a 6 posts para mostrar 2 filas de 3
     paginate_by = 6 
+    paginator_class = PaginadorCacheado
+    lectura_en_replica = True
+
+    def get_claves_version(self):
+        # Muestra los posts de la categoría y sus más leídos
+        return [CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, CLAVE_VERSION_MAS_LEIDOS]
 
     def get_queryset(self):
-        # 1. Base del Queryset: Filtrar por categoría y posts activos
-        queryset = Post.objects.filter(
-            categoria_id=self.kwargs["pk"],
-            activo=True
-        )
-
-        # 2. Obtener parámetro de ordenamiento (si existe)
-        orden = self.request.GET.get('orden', None)
-        
-        # 3. Lógica de ordenamiento condicional (Solo para usuarios autenticados)
-        # Se permite el orden si el usuario está autenticado y si el parámetro 'orden' es válido
-        if self.request.user.is_authenticated and orden in ['titulo', '-titulo', 'publicado', '-publicado']:
-            # Aplicar orden solicitado: 'titulo' (asc), '-titulo' (desc), 'publicado' (asc), '-publicado' (desc)
-            queryset = queryset.order_by(orden)
-        else:
-            # Orden por defecto: Más reciente primero
-            queryset = queryset.order_by("-publicado")
-            
-        # Usar select_related para optimizar la consulta
-        return queryset.select_related('categoria', 'autor')
+        return posts_de_categoria(self.request, self.kwargs["pk"])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["categoria"] = Categoria.objects.get(pk=self.kwargs["pk"])
+        context["mas_leidos"] = obtener_mas_leidos(context["categoria"].pk)
         # Agregar el orden actual al contexto para usarlo en el template
         context["orden_actual"] = self.request.GET.get('orden', '-publicado') 
         return context
 
 
+def posts_de_categoria(request, categoria_pk):
+    # 1. Base del Queryset: Filtrar por categoría y posts activos
+    queryset = Post.objects.filter(
+        categoria_id=categoria_pk,
+        activo=True
+    )
+
+    # 2. Obtener parámetro de ordenamiento (si existe)
+    orden = request.GET.get('orden', None)
+
+    # 3. Lógica de ordenamiento condicional (Solo para usuarios autenticados)
+    # Se permite el orden si el usuario está autenticado y si el parámetro 'orden' es válido
+    if request.user.is_authenticated and orden in ['titulo', '-titulo', 'publicado', '-publicado']:
+        # Aplicar orden solicitado: 'titulo' (asc), '-titulo' (desc), 'publicado' (asc), '-publicado' (desc)
+        queryset = queryset.order_by(orden)
+    else:
+        # Orden por defecto: Más reciente primero
+        queryset = queryset.order_by("-publicado")
+
+    # Usar select_related para optimizar la consulta.
+    # Las tarjetas usan el extracto guardado: el texto completo no se trae
+    return queryset.select_related('categoria', 'autor').defer('texto')
+
+
+# BÚSQUEDA (PÚBLICO)
+
+
+class BuscarPostsView(CacheAnonimoMixin, ListView):
+    template_name = "posts/buscar.html"
+    context_object_name = "posts"
+    paginate_by = 6
+    paginator_class = PaginadorCacheado
+    lectura_en_replica = True
+
+    def get_claves_version(self):
+        return [CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS]
+
+    def get_queryset(self):
+        # Índice invertido propio (ver busqueda.py), ordenado por relevancia
+        return buscar(self.request.GET.get("q", ""))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["consulta"] = self.request.GET.get("q", "")
+        # El paginador conserva la consulta en los enlaces
+        context["parametros_extra"] = "&" + urlencode({"q": context["consulta"]})
+        return context
+
+
 # ==============================================================================
 # COMENTARIOS - EDICIÓN Y ELIMINACIÓN (Autor O Colaborador)
 # ==============================================================================
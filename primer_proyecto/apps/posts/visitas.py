@@ -0,0 +1,221 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from apps.tareas.cola import cada_revision, encolar
+
+logger = logging.getLogger(__name__)
+
+
+# CONTADOR DE VISITAS (CON BUFFER)
+
+'''Cada vista del detalle de un post (también las servidas desde el cache de página)
+suma 1 en un contador en memoria del proceso. Cada VISITAS_INTERVALO segundos lo
+acumulado se entrega a la cola de tareas, que lo vuelca a la base con un UPDATE
+... SET n = n + x por cada cantidad distinta (no uno por visita ni uno por post):
+en Post.num_visitas (total) y en VisitaDiaria (por día, para el ranking).
+El vencimiento se revisa con cada visita y, en los procesos del servidor, también
+desde el hilo de revisión de la cola (aunque no lleguen más visitas). Al terminar el
+proceso lo pendiente se vuelca directo; solo si el proceso muere de golpe se pierden,
+como mucho, los últimos VISITAS_INTERVALO segundos de visitas de ese proceso.'''
+
+_pendientes = Counter()
+_lock = threading.Lock()
+_ultimo_volcado = time.monotonic()
+
+
+def _sumar(pk):
+    '''Suma la visita; si ya pasó el intervalo devuelve lo acumulado (y lo vacía)'''
+    with _lock:
+        _pendientes[pk] += 1
+        return _tomar_si_vencido()
+
+
+def _tomar_si_vencido():
+    global _ultimo_volcado
+    ahora = time.monotonic()
+    if ahora - _ultimo_volcado < settings.VISITAS_INTERVALO:
+        return None
+    _ultimo_volcado = ahora
+    return _tomar_pendientes()
+
+
+def _tomar_pendientes():
+    # Las claves van a JSON (argumentos de la tarea): se guardan como texto
+    pendientes = {str(pk): visitas for pk, visitas in _pendientes.items()}
+    _pendientes.clear()
+    return pendientes
+
+
+def registrar_visita(pk):
+    pendientes = _sumar(pk)
+    if pendientes:
+        encolar(volcar_visitas, pendientes, timezone.localdate().isoformat())
+
+
+async def aregistrar_visita(pk):
+    '''Igual que registrar_visita(), para las vistas async (encolar usa el ORM)'''
+    pendientes = _sumar(pk)
+    if pendientes:
+        await sync_to_async(encolar)(volcar_visitas, pendientes, timezone.localdate().isoformat())
+
+
+def volcar_pendientes():
+    '''Vuelca ya lo acumulado en este proceso, sin esperar el intervalo'''
+    with _lock:
+        pendientes = _tomar_pendientes()
+    if pendientes:
+        encolar(volcar_visitas, pendientes, timezone.localdate().isoformat())
+
+
+def volcar_si_vencido():
+    '''Lo llama el hilo de revisión de la cola: vuelca aunque no lleguen visitas nuevas'''
+    with _lock:
+        pendientes = _tomar_si_vencido()
+    if pendientes:
+        encolar(volcar_visitas, pendientes, timezone.localdate().isoformat())
+
+
+def volcar_al_salir():
+    '''atexit: el pool de la cola ya no acepta tareas, se vuelca en este hilo'''
+    with _lock:
+        pendientes = _tomar_pendientes()
+    if pendientes:
+        try:
+            volcar_visitas(pendientes, timezone.localdate().isoformat())
+        except Exception:
+            logger.exception("No se pudieron volcar las visitas pendientes al salir")
+
+
+def programar_volcado():
+    '''En los procesos del servidor (PostsConfig.ready): volcado periódico y al salir'''
+    cada_revision(volcar_si_vencido)
+    atexit.register(volcar_al_salir)
+
+
+# MÁS LEÍDOS
+
+'''Ranking de los posts activos con más visitas de los últimos MAS_LEIDOS_DIAS días,
+del sitio y de cada categoría. Se calcula siempre en la cola y se guarda en el cache
+sin vencimiento: las vistas solo lo leen. Si pasaron más de MAS_LEIDOS_INTERVALO
+segundos desde el cálculo, o un post cambió, se pide uno nuevo a la cola y mientras
+tanto se sigue mostrando el anterior (vacío si todavía no hay ninguno).
+Las páginas que lo muestran (portada y categorías) tienen la versión del ranking en
+su clave de cache; esa versión cambia solo si cambia el orden de algún ranking.'''
+
+MAS_LEIDOS_CANTIDAD = 5
+MAS_LEIDOS_DIAS = 7
+MAS_LEIDOS_INTERVALO = 5 * 60
+
+CLAVE_MAS_LEIDOS = "posts:mas_leidos"
+CLAVE_VERSION_MAS_LEIDOS = "posts:mas_leidos:version"
+# Hay un cálculo encolado que todavía no empezó: no hace falta pedir otro
+CLAVE_MAS_LEIDOS_PEDIDO = "posts:mas_leidos:pedido"
+
+
+def calcular_mas_leidos():
+    '''{None: ranking del sitio, categoria_id: ranking de la categoría}'''
+    from .models import VisitaDiaria
+    desde = timezone.localdate() - timedelta(days=MAS_LEIDOS_DIAS - 1)
+    filas = (
+        VisitaDiaria.objects
+        .filter(dia__gte=desde, post__activo=True)
+        .values("post_id", "post__titulo", "post__categoria_id")
+        .annotate(visitas=Sum("visitas"))
+        .order_by("-visitas", "post_id")
+    )
+    rankings = defaultdict(list)
+    for fila in filas:
+        entrada = {"pk": fila["post_id"], "titulo": fila["post__titulo"], "visitas": fila["visitas"]}
+        claves = [None] if fila["post__categoria_id"] is None else [None, fila["post__categoria_id"]]
+        for clave in claves:
+            if len(rankings[clave]) < MAS_LEIDOS_CANTIDAD:
+                rankings[clave].append(entrada)
+    return dict(rankings)
+
+
+def actualizar_mas_leidos():
+    # Lo que cambie desde acá en adelante tiene que pedir otro cálculo
+    cache.delete(CLAVE_MAS_LEIDOS_PEDIDO)
+    rankings = calcular_mas_leidos()
+    anteriores = cache.get(CLAVE_MAS_LEIDOS)
+    cache.set(CLAVE_MAS_LEIDOS, (time.time(), rankings), None)
+    # Sin ranking anterior las páginas se pudieron armar con uno vacío
+    if anteriores is None or ordenes(anteriores[1]) != ordenes(rankings):
+        cache.set(CLAVE_VERSION_MAS_LEIDOS, time.time_ns(), None)
+    return rankings
+
+
+def ordenes(rankings):
+    return {clave: [entrada["pk"] for entrada in ranking] for clave, ranking in rankings.items()}
+
+
+def pedir_mas_leidos():
+    '''Encola el cálculo del ranking, salvo que ya haya uno esperando'''
+    if cache.add(CLAVE_MAS_LEIDOS_PEDIDO, True, MAS_LEIDOS_INTERVALO):
+        encolar(actualizar_mas_leidos)
+
+
+def invalidar_mas_leidos():
+    '''Un post borrado o desactivado no debe seguir en el ranking: se recalcula en la cola'''
+    pedir_mas_leidos()
+
+
+def _vencido(guardado):
+    '''guardado: (calculado, rankings) o None. True si falta o ya es viejo'''
+    return guardado is None or time.time() - guardado[0] > MAS_LEIDOS_INTERVALO
+
+
+def obtener_mas_leidos(categoria_id=None):
+    guardado = cache.get(CLAVE_MAS_LEIDOS)
+    if _vencido(guardado):
+        pedir_mas_leidos()
+        # En modo sincrónico ya se calculó; si no, el anterior o vacío
+        guardado = cache.get(CLAVE_MAS_LEIDOS)
+    return guardado[1].get(categoria_id, []) if guardado else []
+
+
+async def aobtener_mas_leidos(categoria_id=None):
+    guardado = await cache.aget(CLAVE_MAS_LEIDOS)
+    if _vencido(guardado):
+        await sync_to_async(pedir_mas_leidos)()
+        guardado = await cache.aget(CLAVE_MAS_LEIDOS)
+    return guardado[1].get(categoria_id, []) if guardado else []
+
+
+# TAREAS (se ejecutan en la cola, fuera del request)
+
+
+def volcar_visitas(visitas, dia):
+    '''visitas: {"<pk>": cantidad} acumuladas por un proceso; dia: fecha ISO'''
+    from .models import Post, VisitaDiaria
+    visitas = {int(pk): cantidad for pk, cantidad in visitas.items()}
+    # Los posts borrados mientras tanto se descartan
+    existentes = set(Post.objects.filter(pk__in=visitas).values_list("pk", flat=True))
+    por_cantidad = defaultdict(list)
+    for pk in existentes:
+        por_cantidad[visitas[pk]].append(pk)
+
+    with transaction.atomic():
+        # Filas del día que falten (en 0) y después un UPDATE por cantidad distinta
+        VisitaDiaria.objects.bulk_create(
+            [VisitaDiaria(post_id=pk, dia=dia) for pk in existentes], ignore_conflicts=True,
+        )
+        for cantidad, pks in por_cantidad.items():
+            Post.objects.filter(pk__in=pks).update(num_visitas=F("num_visitas") + cantidad)
+            VisitaDiaria.objects.filter(dia=dia, post_id__in=pks).update(visitas=F("visitas") + cantidad)
+
+    # El ranking se recalcula en su propia tarea (un error ahí no reintenta este
+    # volcado, que sumaría las visitas dos veces), a lo sumo cada MAS_LEIDOS_INTERVALO
+    if cache.add("posts:mas_leidos:calculado", True, MAS_LEIDOS_INTERVALO):
+        pedir_mas_leidos()
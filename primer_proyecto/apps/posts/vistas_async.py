@@ -0,0 +1,161 @@
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from django.views import View
+
+from apps.usuarios.roles import aes_colaborador
+from .busqueda import abuscar
+from .cache import (
+    CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, aobtener_categorias_menu, aobtener_versiones, clave_pagina,
+    clave_version_post, timeout_contenido,
+)
+from .forms import ComentarioForm
+from .imagenes import aprecalentar_derivados
+from .models import Categoria, Post
+from .paginacion import PaginadorCacheado
+from .relacionados import relacionados_de
+from .visitas import CLAVE_VERSION_MAS_LEIDOS, aobtener_mas_leidos, aregistrar_visita
+from .views import (
+    BuscarPostsView, CategoriaPostsView, PostDetailView,
+    consulta_comentarios, contexto_comentarios, pagina_comentarios, posts_de_categoria,
+)
+
+
+# VISTAS PÚBLICAS ASÍNCRONAS (ASGI)
+
+'''Versiones async de las páginas públicas de lectura (portada, detalle, posts por
+categoría y búsqueda), para servir con ASGI (uvicorn/daphne). Se activan con
+VISTAS_ASYNC=1 (asgi.py lo pone por defecto), que cambia ROOT_URLCONF a urls_async.py.
+Todo lo que el template necesita se resuelve antes del render con el cache y el ORM
+asíncronos: el usuario, el menú de categorías, el rol y los derivados de las imágenes.
+Los context processors son perezosos y no llegan a consultar la base.
+El ORM async de Django todavía ejecuta las consultas en un hilo (sync_to_async): lo
+que se gana es no ocupar un worker mientras se espera al cache o a clientes lentos.'''
+
+
+class VistaAsync(View):
+    """
+    Base de las vistas async: cache de página completa para anónimos (mismas reglas y
+    claves que CacheAnonimoMixin) y render a HttpResponse dentro de la vista.
+    Las subclases implementan obtener_contexto().
+    """
+    template_name = None
+    http_method_names = ["get", "head", "options"]
+    lectura_en_replica = True # Todas son páginas públicas (ver primer_proyecto/replicas.py)
+
+    def get_claves_version(self):
+        return [CLAVE_VERSION_CONTENIDO]
+
+    async def obtener_contexto(self):
+        return {}
+
+    async def get(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        usar_cache = not request.user.is_authenticated and not len(get_messages(request))
+        if usar_cache:
+            clave = clave_pagina(request, await aobtener_versiones(self.get_claves_version()))
+            respuesta = await cache.aget(clave)
+            if respuesta is not None:
+                return respuesta
+
+        contexto = await self.contexto_comun()
+        contexto.update(await self.obtener_contexto())
+        respuesta = HttpResponse(render_to_string(self.template_name, contexto, request))
+        # Una página con token CSRF es personal: no se comparte
+        if usar_cache and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+            await cache.aset(clave, respuesta, timeout_contenido())
+        return respuesta
+
+    async def contexto_comun(self):
+        # Reemplazan a los valores perezosos de los context processors
+        version, version_listados = await aobtener_versiones([CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS])
+        return {
+            "view": self,
+            "user": self.request.user,
+            "categorias_menu": await aobtener_categorias_menu(),
+            "es_colaborador": await aes_colaborador(self.request.user),
+            "version_contenido": version,
+            "version_listados": version_listados,
+            "timeout_fragmentos": timeout_contenido(),
+        }
+
+    async def paginar(self, object_list, por_pagina):
+        '''Como ListView.paginate_queryset(): devuelve el contexto de la página'''
+        paginador = PaginadorCacheado(object_list, por_pagina)
+        try:
+            pagina = await paginador.apagina(self.request.GET.get("page") or 1)
+        except InvalidPage as e:
+            raise Http404(f"Página inválida: {e}")
+        await aprecalentar_derivados(post.imagen.name for post in pagina.object_list)
+        return {
+            "paginator": paginador,
+            "page_obj": pagina,
+            "is_paginated": pagina.has_other_pages(),
+            "object_list": pagina.object_list,
+            "posts": pagina.object_list,
+        }
+
+
+class PostDetailAsyncView(VistaAsync):
+    template_name = "posts/detalle_post.html"
+    comentarios_por_pagina = PostDetailView.comentarios_por_pagina
+
+    def get_claves_version(self):
+        return [CLAVE_VERSION_CONTENIDO, clave_version_post(self.kwargs["pk"])]
+
+    async def get(self, request, *args, **kwargs):
+        respuesta = await super().get(request, *args, **kwargs)
+        if request.method == "GET":
+            await aregistrar_visita(self.kwargs["pk"])
+        return respuesta
+
+    async def obtener_contexto(self):
+        post = await aget_object_or_404(Post.objects.select_related("categoria", "autor"), pk=self.kwargs["pk"])
+        pagina = pagina_comentarios(self.request, post, self.comentarios_por_pagina)
+        consulta = consulta_comentarios(post, pagina, self.comentarios_por_pagina)
+        comentarios = [comentario async for comentario in consulta]
+        version_post, = await aobtener_versiones([clave_version_post(post.pk)])
+        await aprecalentar_derivados([post.imagen.name])
+        return {
+            "object": post,
+            "post": post,
+            "form": ComentarioForm(),
+            "version_post": version_post,
+            "relacionados": [relacionado async for relacionado in relacionados_de(post.pk)],
+            **contexto_comentarios(comentarios, pagina, self.comentarios_por_pagina),
+        }
+
+
+class CategoriaPostsAsyncView(VistaAsync):
+    template_name = "posts/categorias/posts_por_categoria.html"
+    paginate_by = CategoriaPostsView.paginate_by
+
+    def get_claves_version(self):
+        return [CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, CLAVE_VERSION_MAS_LEIDOS]
+
+    async def obtener_contexto(self):
+        categoria = await aget_object_or_404(Categoria, pk=self.kwargs["pk"])
+        contexto = await self.paginar(posts_de_categoria(self.request, categoria.pk), self.paginate_by)
+        contexto["categoria"] = categoria
+        contexto["mas_leidos"] = await aobtener_mas_leidos(categoria.pk)
+        contexto["orden_actual"] = self.request.GET.get("orden", "-publicado")
+        return contexto
+
+
+class BuscarPostsAsyncView(VistaAsync):
+    template_name = "posts/buscar.html"
+    paginate_by = BuscarPostsView.paginate_by
+
+    def get_claves_version(self):
+        return [CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS]
+
+    async def obtener_contexto(self):
+        consulta = self.request.GET.get("q", "")
+        contexto = await self.paginar(await abuscar(consulta), self.paginate_by)
+        contexto["consulta"] = consulta
+        contexto["parametros_extra"] = "&" + urlencode({"q": consulta})
+        return contexto
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Tarea
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ("funcion", "estado", "intentos", "ejecutar_desde", "creada")
+    list_filter = ("estado",)
+    readonly_fields = ("error",)
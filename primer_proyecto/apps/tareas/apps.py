@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+
+class TareasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.tareas'
+
+    def ready(self):
+        from . import cola
+        if (
+            getattr(settings, "TAREAS_SINCRONO", False)
+            or not getattr(settings, "TAREAS_EN_PROCESO", True)
+            or not cola.es_proceso_servidor()
+        ):
+            return
+        # Retoma las pendientes, reintentos y huérfanas sin esperar a un encolar()
+        cola.iniciar_en_proceso()
+        # Y en cada proceso hijo, si el servidor hace fork después de cargar la app
+        request_started.connect(cola.iniciar_en_proceso, dispatch_uid="tareas_iniciar_en_proceso")
@@ -0,0 +1,247 @@
+import logging
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+
+# COLA DE TAREAS EN SEGUNDO PLANO
+
+'''encolar() guarda la tarea en la base. En los procesos del servidor (runserver,
+gunicorn, uvicorn...) el pool de hilos arranca al iniciar (TareasConfig.ready): la
+tarea se le entrega cuando la transacción del request se confirma y el request
+responde sin esperar. El pool además revisa la tabla periódicamente, así que si el
+proceso se reinicia las tareas pendientes se retoman.
+En los demás procesos (comandos de manage.py, o el servidor con TAREAS_EN_PROCESO
+= False) encolar() solo guarda la fila: la ejecuta el pool de algún servidor o el
+proceso dedicado "manage.py procesar_tareas".
+Mientras una tarea corre, su "actualizada" se renueva cada TAREAS_INTERVALO (latido):
+una tarea "en curso" sin latidos por TAREAS_MAXIMO_EN_CURSO quedó huérfana.
+
+Configuración (settings.py):
+- TAREAS_HILOS: tamaño del pool.
+- TAREAS_INTERVALO: segundos entre revisiones de tareas pendientes/reintentos.
+- TAREAS_SINCRONO: ejecutar en el momento, sin hilos (tests y desarrollo).
+- TAREAS_EN_PROCESO: False si las tareas las procesa solo "manage.py procesar_tareas".
+- TAREAS_MAXIMO_EN_CURSO: segundos sin latido para dar una tarea por huérfana.'''
+
+MAXIMO_INTENTOS = 5
+
+_pool = None
+_pid = None
+_lock = threading.Lock()
+# Tareas entregadas al pool de este proceso (en su cola o ejecutándose)
+_enviadas = set()
+# Tareas que se están ejecutando en este proceso (para el latido)
+_en_curso = set()
+# Funciones que corre el hilo de revisión en cada vuelta (ver cada_revision)
+_periodicas = []
+
+
+def ruta_de(funcion):
+    if isinstance(funcion, str):
+        return funcion
+    return f"{funcion.__module__}.{funcion.__qualname__}"
+
+
+def encolar(funcion, *argumentos):
+    '''Programa funcion(*argumentos) fuera del request. Los argumentos deben ser
+    serializables a JSON (ids, nombres de archivo...), nunca objetos del modelo.'''
+    if getattr(settings, "TAREAS_SINCRONO", False):
+        import_string(ruta_de(funcion))(*argumentos)
+        return None
+
+    tarea = Tarea.objects.create(funcion=ruta_de(funcion), argumentos=list(argumentos))
+    if pool_activo():
+        # Recién cuando se confirma la transacción: el trabajo ve los datos guardados
+        transaction.on_commit(lambda: enviar(tarea.pk))
+    return tarea
+
+
+def pool_activo():
+    '''True si este proceso ejecuta tareas (lo arrancó iniciar_en_proceso)'''
+    return _pid == os.getpid()
+
+
+def tiempo_maximo_en_curso():
+    return timedelta(seconds=getattr(settings, "TAREAS_MAXIMO_EN_CURSO", 600))
+
+
+def obtener_pool():
+    global _pool, _pid
+    with _lock:
+        # Después de un fork (ej: gunicorn --preload) los hilos del padre no existen
+        if _pool is None or _pid != os.getpid():
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, "TAREAS_HILOS", 2),
+                thread_name_prefix="tareas",
+            )
+            _pid = os.getpid()
+            _enviadas.clear()
+            _en_curso.clear()
+            hilo = threading.Thread(target=_revisar_periodicamente, name="tareas-revision", daemon=True)
+            hilo.start()
+    return _pool
+
+
+def es_proceso_servidor(argv=None):
+    '''False en los comandos de manage.py (migrate, test, shell...), salvo runserver'''
+    argv = sys.argv if argv is None else argv
+    programa = os.path.basename(argv[0]) if argv else ""
+    if programa in ("manage.py", "django-admin", "__main__.py"):
+        # Con autorecarga, runserver atiende los requests en el proceso hijo (RUN_MAIN)
+        return argv[1:2] == ["runserver"] and (
+            os.environ.get("RUN_MAIN") == "true" or "--noreload" in argv
+        )
+    return True
+
+
+def iniciar_en_proceso(**kwargs):
+    '''Arranca el pool (y la revisión de pendientes) si este proceso todavía no lo tiene'''
+    if _pid != os.getpid():
+        obtener_pool()
+
+
+def cada_revision(funcion):
+    '''Registra funcion() para que el hilo de revisión la llame cada TAREAS_INTERVALO'''
+    _periodicas.append(funcion)
+    return funcion
+
+
+def enviar(pk):
+    '''Entrega la tarea al pool, salvo que ya esté en su cola'''
+    with _lock:
+        if pk in _enviadas:
+            return
+        _enviadas.add(pk)
+    try:
+        obtener_pool().submit(_ejecutar_en_hilo, pk)
+    except RuntimeError:
+        # El proceso está terminando (ej: tareas encoladas desde atexit): la fila
+        # queda pendiente y la toma otro proceso
+        with _lock:
+            _enviadas.discard(pk)
+
+
+def _revisar_periodicamente():
+    evento = threading.Event()
+    while True:
+        for funcion in _periodicas:
+            try:
+                funcion()
+            except Exception:
+                logger.exception("Error en %s", ruta_de(funcion))
+        try:
+            latir()
+            recuperar_huerfanas()
+            for pk in pendientes():
+                enviar(pk)
+        except Exception:
+            logger.exception("Error revisando tareas pendientes")
+        finally:
+            connection.close()
+        evento.wait(getattr(settings, "TAREAS_INTERVALO", 30))
+
+
+def _ejecutar_en_hilo(pk):
+    try:
+        ejecutar(pk)
+    finally:
+        with _lock:
+            _enviadas.discard(pk)
+        # Cada hilo tiene su propia conexión: se cierra para no dejarla colgada
+        connection.close()
+
+
+def latir():
+    '''Renueva "actualizada" de las tareas que se están ejecutando en este proceso'''
+    with _lock:
+        pks = list(_en_curso)
+    if pks:
+        Tarea.objects.filter(pk__in=pks, estado=Tarea.EN_CURSO).update(actualizada=timezone.now())
+
+
+def iniciar_latidos():
+    '''Para procesos sin pool que ejecutan tareas (procesar_tareas): un hilo que solo late'''
+    def latir_periodicamente():
+        evento = threading.Event()
+        while True:
+            try:
+                latir()
+            except Exception:
+                logger.exception("Error renovando las tareas en curso")
+            finally:
+                connection.close()
+            evento.wait(getattr(settings, "TAREAS_INTERVALO", 30))
+    threading.Thread(target=latir_periodicamente, name="tareas-latidos", daemon=True).start()
+
+
+def pendientes(limite=100):
+    return list(
+        Tarea.objects
+        .filter(estado=Tarea.PENDIENTE, ejecutar_desde__lte=timezone.now())
+        .values_list("pk", flat=True)[:limite]
+    )
+
+
+def recuperar_huerfanas():
+    '''Devuelve a "pendiente" las tareas "en curso" que dejaron de latir (el proceso murió)'''
+    limite = timezone.now() - tiempo_maximo_en_curso()
+    return Tarea.objects.filter(estado=Tarea.EN_CURSO, actualizada__lt=limite).update(
+        estado=Tarea.PENDIENTE
+    )
+
+
+def ejecutar(pk):
+    """
+    Ejecuta una tarea si sigue pendiente. Devuelve True si se ejecutó con éxito.
+    - La tarea se "reserva" con un UPDATE condicional: si dos hilos o procesos
+      intentan tomar la misma, solo uno lo consigue.
+    - Si falla se reintenta más tarde (10 s, 20 s, 40 s...) hasta MAXIMO_INTENTOS.
+    - Las tareas exitosas se borran para que la tabla no crezca.
+    """
+    reservada = Tarea.objects.filter(
+        pk=pk, estado=Tarea.PENDIENTE, ejecutar_desde__lte=timezone.now()
+    ).update(estado=Tarea.EN_CURSO, intentos=F("intentos") + 1, actualizada=timezone.now())
+    if not reservada:
+        return False
+
+    tarea = Tarea.objects.get(pk=pk)
+    with _lock:
+        _en_curso.add(pk)
+    try:
+        import_string(tarea.funcion)(*tarea.argumentos)
+    except Exception:
+        logger.exception("Falló la tarea %s", tarea)
+        tarea.error = traceback.format_exc()
+        if tarea.intentos >= MAXIMO_INTENTOS:
+            tarea.estado = Tarea.FALLIDA
+        else:
+            tarea.estado = Tarea.PENDIENTE
+            tarea.ejecutar_desde = timezone.now() + timedelta(seconds=10 * 2 ** (tarea.intentos - 1))
+        tarea.save(update_fields=["estado", "error", "ejecutar_desde", "actualizada"])
+        return False
+    finally:
+        with _lock:
+            _en_curso.discard(pk)
+
+    tarea.delete()
+    return True
+
+
+def procesar_pendientes(limite=100):
+    '''Ejecuta en este hilo las tareas pendientes; devuelve cuántas terminaron bien'''
+    recuperar_huerfanas()
+    return sum(ejecutar(pk) for pk in pendientes(limite))
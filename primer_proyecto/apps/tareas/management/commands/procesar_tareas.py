@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.tareas.cola import iniciar_latidos, procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las tareas pendientes de la cola (como proceso dedicado o una sola vez)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--una-vez", action="store_true", help="Procesa lo pendiente y termina")
+        parser.add_argument("--intervalo", type=float, default=5, help="Segundos entre revisiones")
+
+    def handle(self, *args, **options):
+        # Mientras ejecuta una tarea larga, otro proceso no debe darla por huérfana
+        iniciar_latidos()
+        while True:
+            terminadas = procesar_pendientes()
+            if terminadas:
+                self.stdout.write(f"{terminadas} tareas terminadas.")
+            if options["una_vez"]:
+                break
+            time.sleep(options["intervalo"])
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 21:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('funcion', models.CharField(max_length=200)),
+                ('argumentos', models.JSONField(blank=True, default=list)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('fallida', 'Fallida')], default='pendiente', max_length=10)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('ejecutar_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('actualizada', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('ejecutar_desde',),
+                'indexes': [models.Index(fields=['estado', 'ejecutar_desde'], name='tarea_estado_ejecutar_idx')],
+            },
+        ),
+    ]
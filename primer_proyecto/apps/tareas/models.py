@@ -0,0 +1,53 @@
+from django.db import models
+from django.utils import timezone
+
+
+# MODELO: TAREA (COLA DE TRABAJOS EN SEGUNDO PLANO)
+# MODELO: TAREA (COLA DE TRABAJOS EN SEGUNDO PLANO)
+# MODELO: TAREA (COLA DE TRABAJOS EN SEGUNDO PLANO)
+
+'''Cada fila es un trabajo lento (procesar una imagen, borrar archivos, reindexar)
+que se ejecuta fuera del request. Como vive en la base de datos, las tareas
+pendientes sobreviven a un reinicio del servidor y no hace falta un broker externo.'''
+
+
+class Tarea(models.Model):
+
+    PENDIENTE = "pendiente"
+    EN_CURSO = "en_curso"
+    FALLIDA = "fallida"
+
+    ESTADOS = [
+        (PENDIENTE, "Pendiente"),
+        (EN_CURSO, "En curso"),
+        (FALLIDA, "Fallida"),
+    ]
+
+    funcion = models.CharField(max_length=200)
+    ''' Ruta de la función a ejecutar, ej: "apps.posts.imagenes.procesar_imagen"'''
+
+    argumentos = models.JSONField(default=list, blank=True)
+
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDIENTE)
+
+    intentos = models.PositiveSmallIntegerField(default=0)
+
+    error = models.TextField(blank=True)
+    ''' Traza del último error (si falló)'''
+
+    ejecutar_desde = models.DateTimeField(default=timezone.now)
+    ''' Los reintentos se postergan (espera exponencial)'''
+
+    creada = models.DateTimeField(auto_now_add=True)
+
+    actualizada = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('ejecutar_desde',)
+        indexes = [
+            # Próximas tareas a ejecutar
+            models.Index(fields=['estado', 'ejecutar_desde'], name='tarea_estado_ejecutar_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.funcion} ({self.get_estado_display()})"
@@ -0,0 +1,142 @@
+import os
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import cola
+from .cola import (
+    encolar, ejecutar, enviar, es_proceso_servidor, latir, obtener_pool, procesar_pendientes,
+    recuperar_huerfanas,
+)
+from .models import Tarea
+
+EJECUTADAS = []
+
+
+def tarea_de_prueba(valor):
+    EJECUTADAS.append(valor)
+
+
+def tarea_que_falla():
+    raise RuntimeError("falla")
+
+
+# COLA DE TAREAS
+
+
+class ColaTest(TestCase):
+
+    def setUp(self):
+        EJECUTADAS.clear()
+
+    def test_encolar_guarda_y_despacha_al_confirmar(self):
+        with mock.patch.object(cola, "_pid", os.getpid()):
+            with self.captureOnCommitCallbacks() as callbacks:
+                tarea = encolar(tarea_de_prueba, 1)
+        self.assertEqual(tarea.funcion, "apps.tareas.tests.tarea_de_prueba")
+        self.assertEqual(tarea.argumentos, [1])
+        self.assertEqual(len(callbacks), 1)
+
+    def test_sin_pool_en_el_proceso_solo_guarda(self):
+        # Comandos de manage.py o servidor con TAREAS_EN_PROCESO = False: no arranca hilos
+        with mock.patch.object(cola, "_pid", None), mock.patch.object(cola, "obtener_pool") as pool:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                encolar(tarea_de_prueba, 1)
+        self.assertEqual(callbacks, [])
+        pool.assert_not_called()
+        self.assertTrue(Tarea.objects.filter(estado=Tarea.PENDIENTE).exists())
+
+    def test_no_se_entrega_dos_veces_al_pool(self):
+        with mock.patch.object(cola, "obtener_pool") as pool, mock.patch.object(cola, "_enviadas", set()):
+            enviar(7)
+            enviar(7)
+            self.assertEqual(pool.return_value.submit.call_count, 1)
+            # Cuando el hilo termina se puede volver a entregar (ej: un reintento)
+            with mock.patch.object(cola, "ejecutar"), mock.patch.object(cola, "connection"):
+                cola._ejecutar_en_hilo(7)
+            enviar(7)
+            self.assertEqual(pool.return_value.submit.call_count, 2)
+
+    def test_entregar_con_el_pool_cerrado_deja_la_tarea_pendiente(self):
+        with mock.patch.object(cola, "obtener_pool") as pool, mock.patch.object(cola, "_enviadas", set()):
+            pool.return_value.submit.side_effect = RuntimeError("cannot schedule new futures after shutdown")
+            enviar(8)
+            self.assertEqual(cola._enviadas, set())
+
+    def test_ejecutar_borra_la_tarea_terminada(self):
+        tarea = Tarea.objects.create(funcion="apps.tareas.tests.tarea_de_prueba", argumentos=["a"])
+        self.assertTrue(ejecutar(tarea.pk))
+        self.assertEqual(EJECUTADAS, ["a"])
+        self.assertFalse(Tarea.objects.exists())
+        # Una tarea ya tomada no se vuelve a ejecutar
+        self.assertFalse(ejecutar(tarea.pk))
+
+    def test_reintento_con_espera_y_falla_definitiva(self):
+        tarea = Tarea.objects.create(funcion="apps.tareas.tests.tarea_que_falla")
+        with self.assertLogs("apps.tareas.cola", "ERROR"):
+            self.assertFalse(ejecutar(tarea.pk))
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.PENDIENTE)
+        self.assertGreater(tarea.ejecutar_desde, timezone.now())
+        self.assertIn("RuntimeError", tarea.error)
+
+        Tarea.objects.filter(pk=tarea.pk).update(intentos=4, ejecutar_desde=timezone.now())
+        with self.assertLogs("apps.tareas.cola", "ERROR"):
+            ejecutar(tarea.pk)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.FALLIDA)
+
+    def test_recuperar_tareas_huerfanas(self):
+        Tarea.objects.create(funcion="apps.tareas.tests.tarea_de_prueba", argumentos=[2], estado=Tarea.EN_CURSO)
+        Tarea.objects.update(actualizada=timezone.now() - timedelta(hours=1))
+        self.assertEqual(recuperar_huerfanas(), 1)
+        self.assertEqual(procesar_pendientes(), 1)
+        self.assertEqual(EJECUTADAS, [2])
+
+    def test_latido_evita_recuperar_una_tarea_que_sigue_corriendo(self):
+        tarea = Tarea.objects.create(funcion="apps.tareas.tests.tarea_de_prueba", estado=Tarea.EN_CURSO)
+        Tarea.objects.update(actualizada=timezone.now() - timedelta(hours=1))
+        with mock.patch.object(cola, "_en_curso", {tarea.pk}):
+            latir()
+        self.assertEqual(recuperar_huerfanas(), 0)
+
+    @override_settings(TAREAS_MAXIMO_EN_CURSO=2 * 3600)
+    def test_tiempo_maximo_en_curso_configurable(self):
+        Tarea.objects.create(funcion="apps.tareas.tests.tarea_de_prueba", estado=Tarea.EN_CURSO)
+        Tarea.objects.update(actualizada=timezone.now() - timedelta(hours=1))
+        self.assertEqual(recuperar_huerfanas(), 0)
+
+    @override_settings(TAREAS_SINCRONO=True)
+    def test_modo_sincrono(self):
+        self.assertIsNone(encolar(tarea_de_prueba, 3))
+        self.assertEqual(EJECUTADAS, [3])
+        self.assertFalse(Tarea.objects.exists())
+
+
+class ProcesoServidorTest(TestCase):
+    """El pool arranca al iniciar en los servidores, no en los comandos de manage.py"""
+
+    def test_comandos_y_servidores(self):
+        self.assertFalse(es_proceso_servidor(["manage.py", "migrate"]))
+        self.assertFalse(es_proceso_servidor(["manage.py", "test"]))
+        self.assertFalse(es_proceso_servidor(["/usr/bin/django-admin", "shell"]))
+        self.assertTrue(es_proceso_servidor(["manage.py", "runserver", "--noreload"]))
+        self.assertTrue(es_proceso_servidor(["/venv/bin/gunicorn", "primer_proyecto.wsgi"]))
+        self.assertTrue(es_proceso_servidor(["/venv/bin/uvicorn", "primer_proyecto.asgi:application"]))
+
+
+class PoolTest(TransactionTestCase):
+    """El pool de hilos ejecuta la tarea después del commit, fuera del request"""
+
+    def test_ejecucion_en_segundo_plano(self):
+        EJECUTADAS.clear()
+        # Lo que hace TareasConfig.ready en un proceso del servidor
+        obtener_pool()
+        encolar(tarea_de_prueba, "hilo")
+        limite = time.monotonic() + 5
+        while not EJECUTADAS and time.monotonic() < limite:
+            time.sleep(0.05)
+        self.assertEqual(EJECUTADAS, ["hilo"])
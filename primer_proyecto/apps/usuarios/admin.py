@@ -1,4 +1,10 @@
 from django.contrib import admin
 from .models import Usuario
 
-admin.site.register(Usuario)
\ No newline at end of file
+
+@admin.register(Usuario)
+class UsuarioAdmin(admin.ModelAdmin):
+    list_display = ("username", "nombre", "apellido", "email", "num_posts")
+    # Los usa el autocompletar de autor en posts y comentarios
+    search_fields = ("username", "nombre", "apellido", "email")
+    filter_horizontal = ("groups", "user_permissions")
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class UsuariosConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "apps.usuarios"
\ No newline at end of file
+    name = "apps.usuarios"
+
+    def ready(self):
+        from . import signals  # noqa: F401 (registra las señales)
@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+
+from .roles import es_colaborador
+
+
+def rol_usuario(request):
+    # Se evalúa solo si el template lo usa, y como mucho una vez por request
+    return {
+        "es_colaborador": SimpleLazyObject(lambda: es_colaborador(request.user))
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='num_posts',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
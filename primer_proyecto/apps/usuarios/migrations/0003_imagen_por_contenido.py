@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-17 21:14
+
+import apps.posts.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_usuario_num_posts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usuario',
+            name='imagen',
+            field=models.ImageField(blank=True, db_index=True, default='usuarios/user_default.png', null=True, storage=apps.posts.almacenamiento.AlmacenamientoPorContenido(), upload_to='usuarios'),
+        ),
+    ]
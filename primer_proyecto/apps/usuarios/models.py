@@ -2,13 +2,24 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.urls import reverse
 
-class Usuario(AbstractUser):
+from apps.posts.almacenamiento import AlmacenamientoPorContenido, ArchivosPorContenidoMixin
+from apps.posts.contadores import ContadoresMixin
+
+class Usuario(ContadoresMixin, ArchivosPorContenidoMixin, AbstractUser):
     nombre = models.CharField(max_length=100)
     apellido = models.CharField(max_length=100)
     email = models.EmailField()
     fecha_nacimiento = models.DateField("Fecha nacimiento", default='2000-1-1')
     es_colaborador = models.BooleanField("Es colaborador", default=False)
-    imagen = models.ImageField(null=True, blank=True, upload_to='usuarios', default='usuarios/user_default.png')
+    # Imagen guardada por contenido (sin duplicados, ver apps/posts/almacenamiento.py)
+    imagen = models.ImageField(
+        null=True, blank=True, upload_to='usuarios', default='usuarios/user_default.png',
+        storage=AlmacenamientoPorContenido(), db_index=True,
+    )
+    # Cantidad de posts del autor (la mantienen las señales de apps.posts)
+    num_posts = models.PositiveIntegerField(default=0, editable=False)
+
+    campos_contadores = ('num_posts',)
 
     class Meta:
         ordering = ('-nombre',)
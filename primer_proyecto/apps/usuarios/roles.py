@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+# ROLES DE USUARIO (CACHEADOS)
+
+'''El rol de un usuario es el grupo al que pertenece ("Colaborador" o "Miembro").
+Se resuelve una sola vez por request (queda guardado en el propio objeto usuario)
+y entre requests se guarda en el cache de Django, por id de usuario.
+Las señales de signals.py borran la entrada cuando cambian los grupos.'''
+
+GRUPO_COLABORADOR = "Colaborador"
+GRUPO_MIEMBRO = "Miembro"
+
+# Red de seguridad para caches locales (locmem) en varios procesos
+ROLES_CACHE_TIMEOUT = getattr(settings, "ROLES_CACHE_TIMEOUT", 300)
+
+
+def clave_rol(user_id):
+    return f"usuarios:rol:{user_id}"
+
+
+def obtener_rol(user):
+    '''Devuelve el nombre del grupo principal del usuario, "" si no tiene grupo
+    o None si es anónimo'''
+    if not user.is_authenticated:
+        return None
+
+    # 1. Ya resuelto en este request
+    rol = getattr(user, "_rol", None)
+    if rol is not None:
+        return rol
+
+    # 2. Cache compartido entre requests
+    rol = cache.get(clave_rol(user.pk))
+    if rol is None:
+        # 3. Base de datos: una sola consulta por los nombres de grupo
+        rol = rol_de(list(user.groups.values_list("name", flat=True)))
+        cache.set(clave_rol(user.pk), rol, ROLES_CACHE_TIMEOUT)
+
+    user._rol = rol
+    return rol
+
+
+def rol_de(nombres_grupos):
+    if GRUPO_COLABORADOR in nombres_grupos:
+        return GRUPO_COLABORADOR
+    return nombres_grupos[0] if nombres_grupos else ""
+
+
+def es_colaborador(user):
+    return obtener_rol(user) == GRUPO_COLABORADOR
+
+
+async def aobtener_rol(user):
+    '''Igual que obtener_rol(), para vistas async (cache y ORM asíncronos)'''
+    if not user.is_authenticated:
+        return None
+    rol = getattr(user, "_rol", None)
+    if rol is None:
+        rol = await cache.aget(clave_rol(user.pk))
+    if rol is None:
+        rol = rol_de([nombre async for nombre in user.groups.values_list("name", flat=True)])
+        await cache.aset(clave_rol(user.pk), rol, ROLES_CACHE_TIMEOUT)
+    user._rol = rol
+    return rol
+
+
+async def aes_colaborador(user):
+    return await aobtener_rol(user) == GRUPO_COLABORADOR
+
+
+def invalidar_roles(user_ids):
+    cache.delete_many([clave_rol(user_id) for user_id in user_ids])
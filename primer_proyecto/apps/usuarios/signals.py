@@ -1,7 +1,15 @@
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, m2m_changed, post_save, post_delete, pre_delete
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
 from django.dispatch import receiver
 
+from apps.posts import almacenamiento
+from apps.posts.imagenes import imagen_subida
+from apps.posts.paginacion import invalidar_conteos
+from .roles import invalidar_roles
+
+Usuario = get_user_model()
+
 @receiver(post_migrate)
 def crear_roles(sender, **kwargs):
     
@@ -25,3 +33,61 @@ def crear_roles(sender, **kwargs):
             colaborador.permissions.add(permiso)
         except Permission.DoesNotExist:
             pass  # se creará cuando migraciones estén completas
+
+
+# INVALIDACIÓN DEL CACHE DE ROLES
+
+
+@receiver(m2m_changed, sender=Usuario.groups.through)
+def grupos_modificados(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Se dispara con usuario.groups.add/remove/clear y con grupo.user_set.*'''
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        # usuario.groups.*: el afectado es el usuario
+        invalidar_roles([instance.pk])
+    elif action == "pre_clear":
+        # grupo.user_set.clear(): todavía se pueden leer los miembros
+        invalidar_roles(instance.user_set.values_list("pk", flat=True))
+    else:
+        # grupo.user_set.add/remove: pk_set son los usuarios
+        invalidar_roles(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def grupo_modificado(sender, instance, **kwargs):
+    # Renombrar o borrar un grupo cambia el rol de todos sus miembros
+    invalidar_roles(Usuario.objects.filter(groups=instance).values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Usuario)
+def usuario_eliminado(sender, instance, **kwargs):
+    invalidar_roles([instance.pk])
+
+
+# CONTEO DEL PANEL DE USUARIOS
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def usuarios_contados(sender, created=None, **kwargs):
+    # La lista no tiene filtros: el total solo cambia con altas y bajas (no con el
+    # last_login de cada inicio de sesión ni con otras ediciones)
+    if created is None or created:
+        invalidar_conteos(Usuario)
+
+
+# IMAGEN DE PERFIL (ALMACENAMIENTO POR CONTENIDO) Y SUS MINIATURAS
+
+
+@receiver(post_save, sender=Usuario)
+def usuario_guardado_archivos(sender, instance, raw=False, **kwargs):
+    if not raw:
+        for nombre in almacenamiento.archivos_guardados(instance):
+            imagen_subida(nombre)
+
+
+@receiver(post_delete, sender=Usuario)
+def usuario_eliminado_archivos(sender, instance, **kwargs):
+    almacenamiento.archivos_eliminados(instance)
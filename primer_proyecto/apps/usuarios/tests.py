@@ -1,3 +1,100 @@
-from django.test import TestCase
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import Usuario
+from .roles import obtener_rol, es_colaborador
+
+
+# CACHE DE ROLES
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), TAREAS_SINCRONO=True)
+class RolesCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.colaboradores, _ = Group.objects.get_or_create(name="Colaborador")
+        self.usuario = Usuario.objects.create_user(username="usuario", password="clave")
+
+    def recargar(self):
+        # Simula un request nuevo: otro objeto usuario, mismo cache compartido
+        return Usuario.objects.get(pk=self.usuario.pk)
+
+    def test_una_consulta_por_request(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(obtener_rol(self.usuario), "")
+            self.assertFalse(es_colaborador(self.usuario))
+
+    def test_cacheado_entre_requests(self):
+        obtener_rol(self.usuario)
+        usuario = self.recargar()
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_rol(usuario), "")
+
+    def test_invalidado_al_cambiar_grupos(self):
+        self.assertFalse(es_colaborador(self.recargar()))
+        self.usuario.groups.add(self.colaboradores)
+        self.assertTrue(es_colaborador(self.recargar()))
+        self.colaboradores.user_set.remove(self.usuario)
+        self.assertFalse(es_colaborador(self.recargar()))
+
+
+# LISTA DE USUARIOS
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), TAREAS_SINCRONO=True)
+class ListaUsuariosTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.colaboradores, _ = Group.objects.get_or_create(name="Colaborador")
+        self.miembros, _ = Group.objects.get_or_create(name="Miembro")
+        self.admin = Usuario.objects.create_superuser(username="admin", password="clave")
+        self.colaborador = Usuario.objects.create_user(username="colaborador", password="clave")
+        # En varios grupos: no debe aparecer duplicado al ordenar por tipo
+        self.colaborador.groups.add(self.colaboradores, self.miembros)
+        for i in range(5):
+            usuario = Usuario.objects.create_user(username=f"miembro{i}", password="clave")
+            usuario.groups.add(self.miembros)
+        self.client.force_login(self.admin)
+
+    def usuarios_de(self, orden="username"):
+        respuesta = self.client.get(reverse("usuarios:lista_usuarios"), {"orden": orden})
+        self.assertEqual(respuesta.status_code, 200)
+        return {u.username: u for u in respuesta.context["usuarios"]}
+
+    def test_roles_y_permisos_calculados_en_sql(self):
+        usuarios = self.usuarios_de()
+        self.assertEqual(usuarios["colaborador"].rol, "Colaborador")
+        self.assertFalse(usuarios["colaborador"].puede_ser_eliminado)
+        self.assertEqual(usuarios["miembro0"].rol, "Miembro")
+        self.assertTrue(usuarios["miembro0"].puede_ser_eliminado)
+
+    def test_consultas_no_crecen_con_los_usuarios(self):
+        self.usuarios_de()
+        with self.assertNumQueries(3):
+            self.usuarios_de()
+        for i in range(5, 9):
+            Usuario.objects.create_user(username=f"miembro{i}", password="clave")
+        self.usuarios_de()   # Vuelve a contar: el total cambió
+        with self.assertNumQueries(3):
+            self.usuarios_de()
+
+    def test_iniciar_sesion_no_invalida_el_conteo(self):
+        self.usuarios_de()
+        self.client.login(username="miembro0", password="clave")   # Guarda last_login
+        self.colaborador.nombre = "Otro nombre"
+        self.colaborador.save()
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(3):
+            self.usuarios_de()
+
+    def test_orden_por_tipo_sin_duplicados(self):
+        respuesta = self.client.get(reverse("usuarios:lista_usuarios"), {"orden": "-groups__name"})
+        nombres = [u.username for u in respuesta.context["usuarios"]]
+        self.assertEqual(len(nombres), len(set(nombres)))
+        self.assertEqual(respuesta.context["paginator"].count, 6)
@@ -7,8 +7,13 @@ from django.views.generic import CreateView, ListView, DeleteView
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models import BooleanField, Case, Exists, OuterRef, Subquery, Value, When
 
+from apps.posts.eliminacion import eliminar_usuario
+from apps.posts.paginacion import PaginadorCacheado
 from .forms import RegistroUsuarioForm, LoginForm
+from .roles import GRUPO_COLABORADOR, es_colaborador
 Usuario = get_user_model() 
 
 
@@ -33,7 +38,7 @@ class ColaboradorPuedeEliminarMiembroMixin(UserPassesTestMixin):
             return True
 
         # 2. Si el solicitante NO es Superusuario, debe ser un Colaborador para operar
-        if not solicitante.groups.filter(name='Colaborador').exists():
+        if not es_colaborador(solicitante):
             return False
 
         # 3. Lógica de seguridad para Colaboradores
@@ -47,7 +52,7 @@ class ColaboradorPuedeEliminarMiembroMixin(UserPassesTestMixin):
             return False
 
         # Un Colaborador NO puede eliminar a otro Colaborador (solo a Miembros)
-        if usuario_a_eliminar.groups.filter(name='Colaborador').exists():
+        if es_colaborador(usuario_a_eliminar):
             return False
             
         # Si pasó todas las comprobaciones, es un Colaborador eliminando un Miembro
@@ -110,20 +115,54 @@ class UsuarioListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     template_name = 'usuarios/lista_usuarios.html'
     context_object_name = 'usuarios'
     paginate_by = 10 
+    paginator_class = PaginadorCacheado
 
     def test_func(self):
         user = self.request.user
         # Permite acceso si es superusuario o pertenece al grupo 'Colaborador'
-        return user.is_superuser or user.groups.filter(name='Colaborador').exists()
+        return user.is_superuser or es_colaborador(user)
     
     def handle_no_permission(self):
         messages.error(self.request, "No tenés permisos para administrar usuarios.")
         return redirect("index")
 
+    # Orden por "Tipo de Usuario": se mantiene el parámetro de la URL, pero se
+    # ordena por el rol anotado (un usuario en varios grupos no se duplica)
+    ordenes_por_rol = {'groups__name': 'rol', '-groups__name': '-rol'}
+
     def get_queryset(self):
         # Excluir al usuario actual de la lista para prevenir auto-eliminación accidental
         queryset = super().get_queryset().exclude(pk=self.request.user.pk) 
-        
+
+        # 1. Rol de cada usuario calculado en SQL (sin una consulta por usuario)
+        en_grupo_colaborador = Exists(
+            Usuario.groups.through.objects.filter(
+                usuario_id=OuterRef('pk'), group__name=GRUPO_COLABORADOR
+            )
+        )
+        primer_grupo = Group.objects.filter(user=OuterRef('pk')).order_by('name').values('name')[:1]
+        queryset = queryset.annotate(
+            en_grupo_colaborador=en_grupo_colaborador,
+            rol=Case(
+                When(en_grupo_colaborador=True, then=Value(GRUPO_COLABORADOR)),
+                default=Subquery(primer_grupo),
+            ),
+        )
+
+        # 2. Bandera de permiso para la plantilla: un Colaborador/Admin puede eliminar
+        # si el usuario no es Superusuario y no es otro Colaborador
+        solicitante = self.request.user
+        if solicitante.is_superuser or es_colaborador(solicitante):
+            puede_ser_eliminado = Case(
+                When(is_superuser=False, en_grupo_colaborador=False, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        else:
+            puede_ser_eliminado = Value(False, output_field=BooleanField())
+        queryset = queryset.annotate(puede_ser_eliminado=puede_ser_eliminado)
+
+        # 3. Ordenamiento
         orden = self.request.GET.get('orden', 'username') 
         
         campos_permitidos = [
@@ -135,30 +174,10 @@ class UsuarioListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         ]
 
         if orden in campos_permitidos:
-            queryset = queryset.order_by(orden)
+            queryset = queryset.order_by(self.ordenes_por_rol.get(orden, orden), 'pk')
 
-        # Usar prefetch_related para grupos y optimizar la consulta
-        usuarios_list = queryset.prefetch_related('groups')
-        
-        # OBTENER EL USUARIO SOLICITANTE PARA CHEQUEAR PERMISOS
-        solicitante = self.request.user
-        es_super_o_colaborador = solicitante.is_superuser or solicitante.groups.filter(name='Colaborador').exists()
-        
-        # Iterar para adjuntar la bandera de permiso
-        for user in usuarios_list:
-            # Bandera que usaremos en la plantilla
-            user.puede_ser_eliminado = False 
-            
-            # Solo si el solicitante tiene permisos de Colaborador/Admin, chequeamos la eliminación
-            if es_super_o_colaborador:
-                es_colaborador_a_eliminar = user.groups.filter(name='Colaborador').exists()
-                
-                # Un Colaborador/Admin puede eliminar si el usuario no es Superusuario y no es otro Colaborador
-                # Como ya excluimos al usuario actual en el queryset, solo chequeamos Superusuario/Colaborador
-                if not user.is_superuser and not es_colaborador_a_eliminar:
-                    user.puede_ser_eliminado = True
-                    
-        return usuarios_list # Retorna la lista con la nueva propiedad 'puede_ser_eliminado'
+        # Las anotaciones se calculan solo para las filas de la página (LIMIT de paginate_by)
+        return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -167,16 +186,17 @@ class UsuarioListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
 
 
 class UsuarioDeleteView(LoginRequiredMixin, ColaboradorPuedeEliminarMiembroMixin, DeleteView):
-    # ... (Esta vista se mantiene intacta) ...
     model = Usuario
     template_name = 'usuarios/eliminar_usuario.html'
     success_url = reverse_lazy('usuarios:lista_usuarios')
 
-    def delete(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        # Verificar permisos antes de eliminar
-        if not self.test_func():
-            return self.handle_no_permission()
-
-        messages.success(self.request, f"Usuario '{self.object.username}' eliminado exitosamente.")
-        return super().delete(request, *args, **kwargs)
\ No newline at end of file
+    def form_valid(self, form):
+        # Los permisos ya los verificó test_func() en dispatch
+        # Sus posts y comentarios se borran por lotes (ver apps/posts/eliminacion.py)
+        posts, comentarios = eliminar_usuario(self.object)
+        messages.success(
+            self.request,
+            f"Usuario '{self.object.username}' eliminado exitosamente "
+            f"({posts} posts y {comentarios} comentarios).",
+        )
+        return redirect(self.get_success_url())
\ No newline at end of file
@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'primer_proyecto.settings')
+# Páginas públicas con vistas async (primer_proyecto/urls_async.py); VISTAS_ASYNC=0 las desactiva
+os.environ.setdefault('VISTAS_ASYNC', '1')
+# Conexiones a la base para ASGI: pool en lugar de conexiones persistentes (ver base_de_datos.py)
+os.environ['BLOG_ASGI'] = '1'
 
 application = get_asgi_application()
@@ -0,0 +1,91 @@
+import copy
+import os
+
+
+# CONFIGURACIÓN DE LA BASE DE DATOS (DATABASES)
+
+'''Se arma desde variables de entorno para no tocar settings.py en cada servidor.
+BLOG_DB elige el motor:
+- mysql (por defecto): MySQL con mysql.connector. Datos de acceso en DB_NOMBRE,
+  DB_USUARIO, DB_PASSWORD, DB_HOST y DB_PUERTO.
+- sqlite: un archivo local (BLOG_DB_NOMBRE), para benchmarks y pruebas de carga.
+- dummy: sin base, para comandos que no la usan (collectstatic, check).
+Si se corren los tests y mysql.connector no está instalado, se usa SQLite.
+
+Conexiones en MySQL:
+- DB_CONN_MAX_AGE: segundos que una conexión se reusa entre requests del mismo hilo
+  (por defecto 60 con WSGI sin pool). Con ASGI Django cierra la conexión al terminar
+  cada request, y con pool cada hilo retendría una conexión del pool: en esos casos
+  el valor por defecto es 0 y el reuso lo da el pool.
+- DB_POOL_TAMANIO: conexiones del pool de mysql.connector por proceso (por defecto 0
+  con WSGI y 5 con ASGI; máximo 32). Con pool, "cerrar" devuelve la conexión al pool
+  en lugar de cortarla, así que abrir una por request cuesta casi nada.
+- DB_CONN_HEALTH_CHECKS: antes de reusar una conexión persistente se verifica que siga
+  viva (un ping por request); si el servidor la cortó se abre otra (1 por defecto).
+
+Réplicas de lectura: DB_REPLICAS, separadas por coma (hosts "host[:puerto]" en MySQL,
+archivos en SQLite). Se agregan como "replica1", "replica2"... con la misma
+configuración que "default" (ver replicas.py). En los tests son espejos de "default".'''
+
+POOL_MAXIMO = 32   # Límite de mysql.connector
+
+
+def entero(entorno, nombre, por_defecto):
+    valor = entorno.get(nombre, "")
+    return int(valor) if valor.strip() else por_defecto
+
+
+def mysql_disponible():
+    try:
+        import mysql.connector   # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def configurar(base_dir, entorno=os.environ, asgi=False, tests=False):
+    '''Devuelve DATABASES según las variables de entorno'''
+    motor = entorno.get("BLOG_DB") or ("sqlite" if tests and not mysql_disponible() else "mysql")
+
+    if motor == "sqlite":
+        return con_replicas({
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": entorno.get("BLOG_DB_NOMBRE", base_dir / "blog.sqlite3"),
+        }, entorno)
+    if motor == "dummy":
+        return {"default": {"ENGINE": "django.db.backends.dummy"}}
+
+    opciones = {"sql_mode": "STRICT_TRANS_TABLES"}
+    tamanio_pool = min(entero(entorno, "DB_POOL_TAMANIO", 5 if asgi else 0), POOL_MAXIMO)
+    if tamanio_pool > 0:
+        # mysql.connector.connect() recibe OPTIONS: con pool_name devuelve una conexión del pool
+        opciones.update(pool_name="primer_proyecto", pool_size=tamanio_pool, pool_reset_session=True)
+    return con_replicas({
+        "ENGINE": "mysql.connector.django",
+        "NAME": entorno.get("DB_NOMBRE", "primer_proyecto"),
+        "USER": entorno.get("DB_USUARIO", "root"),
+        "PASSWORD": entorno.get("DB_PASSWORD", "root"),
+        "HOST": entorno.get("DB_HOST", "127.0.0.1"),
+        "PORT": entorno.get("DB_PUERTO", "3306"),
+        "CONN_MAX_AGE": entero(entorno, "DB_CONN_MAX_AGE", 0 if asgi or tamanio_pool else 60),
+        "CONN_HEALTH_CHECKS": entorno.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        "OPTIONS": opciones,
+    }, entorno)
+
+
+def con_replicas(default, entorno):
+    bases = {"default": default}
+    destinos = [valor.strip() for valor in entorno.get("DB_REPLICAS", "").split(",") if valor.strip()]
+    for numero, destino in enumerate(destinos, start=1):
+        alias = f"replica{numero}"
+        replica = copy.deepcopy(default)
+        if default["ENGINE"] == "django.db.backends.sqlite3":
+            replica["NAME"] = destino
+        else:
+            replica["HOST"], _, puerto = destino.partition(":")
+            replica["PORT"] = puerto or default["PORT"]
+            if "pool_name" in replica["OPTIONS"]:
+                replica["OPTIONS"]["pool_name"] = f"primer_proyecto_{alias}"
+        replica["TEST"] = {"MIRROR": "default"}
+        bases[alias] = replica
+    return bases
@@ -0,0 +1,173 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+# INSTRUMENTACIÓN DE REQUESTS (SQL Y TIEMPOS)
+
+'''Middleware opcional (INSTRUMENTACION = True en settings.py o la variable de entorno
+INSTRUMENTACION=1). Por cada request mide:
+- tiempo total, tiempo de render del template y tiempo en la base,
+- cantidad de consultas y consultas repetidas (misma forma, distintos valores: el
+  síntoma típico de un N+1).
+Lo informa en el header Server-Timing (visible en las herramientas del navegador) y en
+el log "primer_proyecto.instrumentacion" como JSON. Los requests y consultas que superan
+los umbrales se registran como warning con el SQL y el nombre de la vista.
+Funciona con WSGI y con ASGI. Las conexiones a la base son de cada hilo: en las vistas
+async la medición se instala en el hilo donde sync_to_async corre el ORM (uno por
+request), así que esas consultas también se cuentan.'''
+
+# Se guarda el SQL de a lo sumo esta cantidad de consultas por request
+MAXIMO_CONSULTAS_GUARDADAS = 200
+
+PATRON_CADENA = re.compile(r"'(?:[^']|'')*'")
+PATRON_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+PATRON_LISTA = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+
+
+def huella(sql):
+    '''Forma de la consulta sin los valores: "WHERE id = 3" y "WHERE id = 7" coinciden'''
+    sql = PATRON_CADENA.sub("?", sql)
+    sql = PATRON_NUMERO.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    return PATRON_LISTA.sub("(...)", sql)
+
+
+class Medicion:
+    '''Acumula lo que pasa durante un request; se instala con connection.execute_wrapper()'''
+
+    def __init__(self):
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.consultas = 0
+        self.huellas = Counter()
+        self.detalle = []   # (ms, sql) de las primeras consultas
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            self.db_ms += ms
+            self.consultas += 1
+            self.huellas[huella(sql)] += 1
+            if len(self.detalle) < MAXIMO_CONSULTAS_GUARDADAS:
+                self.detalle.append((ms, sql))
+
+    def repetidas(self):
+        return {sql: veces for sql, veces in self.huellas.most_common() if veces > 1}
+
+    def instalar(self):
+        '''Context manager: mide las consultas de todas las conexiones mientras dura'''
+        pila = ExitStack()
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(self))
+        return pila
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada request. Si INSTRUMENTACION es False, Django lo quita de la cadena
+    (MiddlewareNotUsed) y no tiene ningún costo. Funciona con WSGI y con ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "INSTRUMENTACION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.request_lento_ms = getattr(settings, "INSTRUMENTACION_REQUEST_LENTO_MS", 500)
+        self.consulta_lenta_ms = getattr(settings, "INSTRUMENTACION_CONSULTA_LENTA_MS", 100)
+        self.repeticiones_sospechosas = getattr(settings, "INSTRUMENTACION_REPETICIONES", 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion()
+        request._medicion = medicion
+        inicio = time.perf_counter()
+        with medicion.instalar():
+            response = self.get_response(request)
+        return self.terminar(request, response, medicion, inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        request._medicion = medicion
+        inicio = time.perf_counter()
+        pila = await sync_to_async(medicion.instalar)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pila.close)()
+        return self.terminar(request, response, medicion, inicio)
+
+    def terminar(self, request, response, medicion, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        response["Server-Timing"] = ", ".join([
+            f"total;dur={total_ms:.1f}",
+            f'db;dur={medicion.db_ms:.1f};desc="{medicion.consultas} consultas"',
+            f"tpl;dur={medicion.template_ms:.1f}",
+        ])
+        self.registrar(request, response, medicion, total_ms)
+        return response
+
+    def process_template_response(self, request, response):
+        # Este middleware es el primero de la lista, así que es el último en pasar por
+        # aquí: Django renderiza el template justo después. El tiempo incluye las
+        # consultas que se disparan desde el template.
+        medicion = getattr(request, "_medicion", None)
+        if medicion is not None:
+            inicio = time.perf_counter()
+
+            def render_terminado(response):
+                medicion.template_ms += (time.perf_counter() - inicio) * 1000
+
+            response.add_post_render_callback(render_terminado)
+        return response
+
+    def registrar(self, request, response, medicion, total_ms):
+        coincidencia = getattr(request, "resolver_match", None)
+        vista = coincidencia.view_name if coincidencia else None
+        repetidas = medicion.repetidas()
+        datos = {
+            "metodo": request.method,
+            "ruta": request.path,
+            "vista": vista,
+            "estado": response.status_code,
+            "total_ms": round(total_ms, 2),
+            "db_ms": round(medicion.db_ms, 2),
+            "template_ms": round(medicion.template_ms, 2),
+            "consultas": medicion.consultas,
+            "repetidas": repetidas,
+        }
+        logger.info(json.dumps(datos, ensure_ascii=False))
+
+        for ms, sql in medicion.detalle:
+            if ms >= self.consulta_lenta_ms:
+                logger.warning("Consulta lenta (%.1f ms) en %s: %s", ms, vista, sql)
+        sospechosas = {sql: veces for sql, veces in repetidas.items() if veces >= self.repeticiones_sospechosas}
+        if sospechosas:
+            logger.warning(
+                "Consultas repetidas en %s (¿N+1?): %s", vista, json.dumps(sospechosas, ensure_ascii=False),
+            )
+        if total_ms >= self.request_lento_ms:
+            logger.warning(
+                "Request lento (%.1f ms) %s %s [%s], %d consultas:\n%s",
+                total_ms, request.method, request.path, vista, medicion.consultas,
+                "\n".join(f"{ms:8.1f} ms  {sql}" for ms, sql in medicion.detalle),
+            )
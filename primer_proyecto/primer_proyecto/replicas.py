@@ -0,0 +1,136 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+# LECTURAS PÚBLICAS EN RÉPLICAS
+
+'''Las réplicas se configuran con DB_REPLICAS (ver base_de_datos.py) y quedan en
+settings.REPLICAS_LECTURA. Solo leen de una réplica las vistas públicas marcadas con
+lectura_en_replica = True (portada, detalle, posts por categoría, búsqueda) y el menú
+de categorías, y solo para el contenido (modelos de apps.posts): la sesión, el usuario,
+la administración, los formularios y todas las escrituras van a "default".
+Lectura de lo propio: un request con método de escritura (POST...) que guardó algo
+deja la cookie "primaria" por REPLICAS_FIJAR_SEGUNDOS. Mientras está, ese navegador
+lee de la primaria, así que después de comentar y volver al detalle del post el
+comentario aparece aunque la réplica venga atrasada.
+Lo que se cachea sin vencimiento (páginas de anónimos y fragmentos) y se armó con datos
+de una réplica vence a los REPLICAS_FIJAR_SEGUNDOS: si la réplica estaba atrasada
+respecto de la versión nueva, la copia vieja no queda guardada para siempre.'''
+
+APPS_EN_REPLICA = {"posts"}
+COOKIE_PRIMARIA = "primaria"
+METODOS_SEGUROS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class EstadoReplicas:
+    '''Estado del request actual (mutable: se comparte con los hilos de sync_to_async)'''
+
+    def __init__(self, primaria=False):
+        self.replica = False     # la vista permite leer de una réplica
+        self.primaria = primaria # fijado a la primaria por una escritura reciente
+        self.escribio = False
+
+
+_estado = ContextVar("estado_replicas", default=None)
+
+
+def lee_de_replica():
+    '''True si las lecturas de contenido de este request van a una réplica'''
+    estado = _estado.get()
+    return bool(estado and estado.replica and not estado.primaria and settings.REPLICAS_LECTURA)
+
+
+def elegir_replica():
+    return random.choice(settings.REPLICAS_LECTURA) if lee_de_replica() else None
+
+
+def timeout_cache(por_defecto=None):
+    '''Vencimiento para lo que se cachea en este request (ver arriba)'''
+    return settings.REPLICAS_FIJAR_SEGUNDOS if lee_de_replica() else por_defecto
+
+
+def en_replica(funcion):
+    '''Envuelve funcion para que sus lecturas vayan a una réplica (si el request lo permite)'''
+    def envuelta(*args, **kwargs):
+        estado = _estado.get()
+        if estado is None:
+            return funcion(*args, **kwargs)
+        anterior, estado.replica = estado.replica, True
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            estado.replica = anterior
+    return envuelta
+
+
+class RouterReplicas:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in APPS_EN_REPLICA:
+            return None
+        return elegir_replica()
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.escribio = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas son copias de la primaria: los objetos se pueden relacionar
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Las tablas de las réplicas las crea la replicación
+        return db == "default"
+
+
+class ReplicasMiddleware:
+    """
+    Habilita las réplicas en las vistas con lectura_en_replica = True y fija a la
+    primaria a quien acaba de escribir. Funciona con WSGI y con ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.fijar_segundos = getattr(settings, "REPLICAS_FIJAR_SEGUNDOS", 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        estado = EstadoReplicas(primaria=COOKIE_PRIMARIA in request.COOKIES)
+        token = _estado.set(estado)
+        try:
+            response = self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self.terminar(request, response, estado)
+
+    async def __acall__(self, request):
+        estado = EstadoReplicas(primaria=COOKIE_PRIMARIA in request.COOKIES)
+        token = _estado.set(estado)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self.terminar(request, response, estado)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        vista = getattr(view_func, "view_class", view_func)
+        estado = _estado.get()
+        if estado is not None and getattr(vista, "lectura_en_replica", False):
+            estado.replica = True
+
+    def terminar(self, request, response, estado):
+        if estado.escribio and request.method not in METODOS_SEGUROS:
+            response.set_cookie(
+                COOKIE_PRIMARIA, "1", max_age=self.fijar_segundos, httponly=True, samesite="Lax",
+            )
+        return response
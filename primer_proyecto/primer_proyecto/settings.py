@@ -14,8 +14,12 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 Django settings for primer_proyecto project.
 """
 
+import os
+import sys
 from pathlib import Path
 
+from .base_de_datos import configurar as configurar_base_de_datos
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -61,6 +65,7 @@ INSTALLED_APPS = [
     # Apps propias
     'apps.usuarios',
     'apps.posts',
+    'apps.tareas',
 ]
 
 
@@ -69,6 +74,10 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # Primero, para medir el request completo (no hace nada si INSTRUMENTACION es False)
+    'primer_proyecto.instrumentacion.InstrumentacionMiddleware',
+    # Réplicas de lectura y "lectura de lo propio" (antes de la sesión, que también escribe)
+    'primer_proyecto.replicas.ReplicasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,8 +87,27 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Instrumentación de requests (primer_proyecto/instrumentacion.py): Server-Timing y
+# log de tiempos, consultas y consultas repetidas. Se activa con INSTRUMENTACION=1
+INSTRUMENTACION = os.environ.get('INSTRUMENTACION') == '1'
+INSTRUMENTACION_REQUEST_LENTO_MS = int(os.environ.get('INSTRUMENTACION_REQUEST_LENTO_MS', 500))
+INSTRUMENTACION_CONSULTA_LENTA_MS = int(os.environ.get('INSTRUMENTACION_CONSULTA_LENTA_MS', 100))
+INSTRUMENTACION_REPETICIONES = 5 # Misma consulta 5 veces en un request: posible N+1
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'primer_proyecto.instrumentacion': {'handlers': ['consola'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 
-ROOT_URLCONF = 'primer_proyecto.urls'
+# Con ASGI (VISTAS_ASYNC=1, ver asgi.py) las páginas públicas usan vistas async
+ROOT_URLCONF = 'primer_proyecto.urls_async' if os.environ.get('VISTAS_ASYNC') == '1' else 'primer_proyecto.urls'
 
 
 
@@ -99,6 +127,9 @@ TEMPLATES = [
 
                 # ⭐ Nuestro context processor para categorías
                 'apps.posts.context_processors.categorias_nav',
+                'apps.posts.context_processors.version_contenido',
+                # Rol del usuario (Colaborador / Miembro), cacheado
+                'apps.usuarios.context_processors.rol_usuario',
             ],
         },
     },
@@ -109,22 +140,60 @@ WSGI_APPLICATION = 'primer_proyecto.wsgi.application'
 
 
 
-# BASE DE DATOS
-
+# CACHE
 
-DATABASES = {
+# Por defecto en la memoria del proceso. Se puede cambiar por uno compartido
+# (ej: django.core.cache.backends.redis.RedisCache) sin tocar el código.
+CACHES = {
     'default': {
-        'ENGINE': 'mysql.connector.django',
-        'NAME': 'primer_proyecto',
-        'USER': 'root',
-        'PASSWORD': 'root',
-        'HOST': '127.0.0.1',
-        'PORT': '3306',
-        'OPTIONS': {
-            'sql_mode': 'STRICT_TRANS_TABLES',
-        }
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'teobits'),
     }
 }
+# Segundos que duran las páginas, fragmentos y el menú cacheados (apps/posts/cache.py).
+# Lo que decide si algo está al día son las versiones en el cache (se invalidan al
+# editar); el vencimiento es solo una red de seguridad: libera las entradas de versiones
+# viejas, que nadie vuelve a pedir. En producción, con un cache compartido (ver el
+# chequeo posts.W001 de "check --deploy")
+CACHE_CONTENIDO_TIMEOUT = int(os.environ.get('CACHE_CONTENIDO_TIMEOUT', 24 * 60 * 60))
+
+
+
+# COLA DE TAREAS EN SEGUNDO PLANO (apps.tareas)
+
+TAREAS_HILOS = 2
+TAREAS_INTERVALO = 30 # segundos entre revisiones de pendientes y reintentos
+TAREAS_SINCRONO = False # True: se ejecutan en el momento (útil en tests)
+# False: el servidor no revisa la tabla (las procesa un "manage.py procesar_tareas" aparte)
+TAREAS_EN_PROCESO = os.environ.get('TAREAS_EN_PROCESO', '1') == '1'
+# Segundos sin latido (se renueva cada TAREAS_INTERVALO) para dar una tarea en curso por huérfana
+TAREAS_MAXIMO_EN_CURSO = 600
+
+# Visitas a los posts (apps/posts/visitas.py): segundos que cada proceso acumula en
+# memoria antes de volcarlas a la base
+VISITAS_INTERVALO = int(os.environ.get('VISITAS_INTERVALO', 60))
+
+# Paginadores (apps/posts/paginacion.py): en MySQL, los listados sin filtros de tablas
+# con al menos esta cantidad de filas usan el total estimado en lugar de COUNT(*).
+# None: siempre se cuenta (el resultado igual se cachea)
+PAGINACION_ESTIMAR_DESDE = None
+
+
+# BASE DE DATOS
+
+
+# Conexiones persistentes, pool y motores alternativos: ver base_de_datos.py
+DATABASES = configurar_base_de_datos(
+    BASE_DIR,
+    asgi=os.environ.get('BLOG_ASGI') == '1',
+    tests=len(sys.argv) > 1 and sys.argv[1] == 'test',
+)
+
+# Réplicas de lectura para las páginas públicas (primer_proyecto/replicas.py)
+DATABASE_ROUTERS = ['primer_proyecto.replicas.RouterReplicas']
+REPLICAS_LECTURA = [alias for alias in DATABASES if alias != 'default']
+# Segundos que quien escribió sigue leyendo de la primaria (atraso tolerado de las réplicas)
+REPLICAS_FIJAR_SEGUNDOS = int(os.environ.get('DB_REPLICAS_FIJAR_SEGUNDOS', 10))
 
 
 
@@ -156,6 +225,9 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Segundos que un archivo recién subido o reutilizado no se borra aunque ninguna fila
+# lo referencie todavía (la fila que lo usa puede no haberse confirmado)
+MEDIA_GRACIA_HUERFANOS = 600
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -16,31 +16,50 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from .views import HomeView, AcercaDeView, contacto # Importamos las nuevas vistas
+from .views import HomeView, HomeAsyncView, AcercaDeView, contacto # Importamos las nuevas vistas
 from django.conf import settings
 from django.conf.urls.static import static
+from apps.posts.urls import patrones as patrones_posts
+from apps.posts.feeds import (
+    feed_cacheado, PostsFeed, PostsAtomFeed, PostsJSONFeed, CategoriaFeed, CategoriaAtomFeed, CategoriaJSONFeed,
+)
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-
-    # Página principal
-    path('', HomeView.as_view(), name='index'),
-
-    # NUEVAS RUTAS
-    path('acerca-de/', AcercaDeView.as_view(), name='acerca_de'),
-    path('contacto/', contacto, name='contacto'),
-
-    # Apps existentes
-    path(
-        'posts/',
-        include(('apps.posts.urls', 'posts'), namespace='posts')
-    ),
-    path('usuarios/', include('apps.usuarios.urls')),
-]
-
-# Archivos media en desarrollo
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
\ No newline at end of file
+
+def patrones(asincronas=False):
+    # asincronas=True: páginas públicas con vistas async (ver urls_async.py)
+    urlpatterns = [
+        path('admin/', admin.site.urls),
+
+        # Página principal
+        path('', (HomeAsyncView if asincronas else HomeView).as_view(), name='index'),
+
+        # NUEVAS RUTAS
+        path('acerca-de/', AcercaDeView.as_view(), name='acerca_de'),
+        path('contacto/', contacto, name='contacto'),
+
+        # Feeds (RSS, Atom y JSON), del sitio y por categoría
+        path('feed/', feed_cacheado(PostsFeed()), name='feed'),
+        path('feed/atom/', feed_cacheado(PostsAtomFeed()), name='feed_atom'),
+        path('feed/json/', feed_cacheado(PostsJSONFeed()), name='feed_json'),
+        path('feed/categoria/<int:pk>/', feed_cacheado(CategoriaFeed()), name='feed_categoria'),
+        path('feed/categoria/<int:pk>/atom/', feed_cacheado(CategoriaAtomFeed()), name='feed_categoria_atom'),
+        path('feed/categoria/<int:pk>/json/', feed_cacheado(CategoriaJSONFeed()), name='feed_categoria_json'),
+
+        # Apps existentes
+        path(
+            'posts/',
+            include((patrones_posts(asincronas), 'posts'), namespace='posts')
+        ),
+        path('usuarios/', include('apps.usuarios.urls')),
+    ]
+
+    # Archivos media en desarrollo
+    if settings.DEBUG:
+        urlpatterns += static(
+            settings.MEDIA_URL,
+            document_root=settings.MEDIA_ROOT
+        )
+    return urlpatterns
+
+
+urlpatterns = patrones()
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""
+URLs con las páginas públicas de lectura servidas por vistas async
+(apps/posts/vistas_async.py). Se usa con VISTAS_ASYNC=1, que asgi.py pone por defecto.
+"""
+from .urls import patrones
+
+urlpatterns = patrones(asincronas=True)
@@ -2,7 +2,12 @@ from django.views.generic import TemplateView
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django import forms
+from apps.posts.cache import CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, CacheAnonimoMixin
 from apps.posts.models import Post
+from apps.posts.imagenes import aprecalentar_derivados
+from apps.posts.paginacion import apaginar_por_cursor, paginar_por_cursor
+from apps.posts.visitas import CLAVE_VERSION_MAS_LEIDOS, aobtener_mas_leidos, obtener_mas_leidos
+from apps.posts.vistas_async import VistaAsync
 
 # Definimos el formulario aquí mismo para no crear más archivos
 class ContactoForm(forms.Form):
@@ -25,21 +30,60 @@ class ContactoForm(forms.Form):
         widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 4})
     )
 
-class HomeView(TemplateView):
+def posts_portada():
+    # Mostrar posts activos, más recientes primero.
+    # Solo se traen las columnas que usa la tarjeta (extracto guardado, sin el texto)
+    return (
+        Post.objects
+        .filter(activo=True)
+        .select_related("categoria")
+        .only("titulo", "extracto", "imagen", "publicado", "categoria__nombre")
+    )
+
+
+class HomeView(CacheAnonimoMixin, TemplateView):
     template_name = "index.html"
+    posts_por_pagina = 9 # 3 filas de 3 tarjetas
+    lectura_en_replica = True # Ver primer_proyecto/replicas.py
+
+    def get_claves_version(self):
+        # Muestra los últimos posts y los más leídos del sitio
+        return [CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, CLAVE_VERSION_MAS_LEIDOS]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Mostrar posts activos, más recientes primero
-        context["posts"] = (
-            Post.objects
-            .filter(activo=True)
-            .order_by("-publicado")
+        # Paginación por cursor (publicado, id) en lugar de OFFSET
+        pagina = paginar_por_cursor(
+            posts_portada(),
+            despues=self.request.GET.get("despues"),
+            antes=self.request.GET.get("antes"),
+            por_pagina=self.posts_por_pagina,
         )
+        context["posts"] = pagina.objetos
+        context["pagina"] = pagina
+        context["mas_leidos"] = obtener_mas_leidos()
         return context
 
+class HomeAsyncView(VistaAsync):
+    '''HomeView para ASGI (ver apps/posts/vistas_async.py)'''
+    template_name = "index.html"
+    posts_por_pagina = HomeView.posts_por_pagina
+
+    def get_claves_version(self):
+        return [CLAVE_VERSION_CONTENIDO, CLAVE_VERSION_LISTADOS, CLAVE_VERSION_MAS_LEIDOS]
+
+    async def obtener_contexto(self):
+        pagina = await apaginar_por_cursor(
+            posts_portada(),
+            despues=self.request.GET.get("despues"),
+            antes=self.request.GET.get("antes"),
+            por_pagina=self.posts_por_pagina,
+        )
+        await aprecalentar_derivados(post.imagen.name for post in pagina)
+        return {"posts": pagina.objetos, "pagina": pagina, "mas_leidos": await aobtener_mas_leidos()}
+
 # Nueva vista para Acerca de
-class AcercaDeView(TemplateView):
+class AcercaDeView(CacheAnonimoMixin, TemplateView):
     template_name = "acercaDe.html"
 
 # Nueva vista para el formulario de Contacto
@@ -12,5 +12,6 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'primer_proyecto.settings')
+# Conexiones a la base persistentes por hilo (DB_CONN_MAX_AGE, ver base_de_datos.py)
 
 application = get_wsgi_application()